@@ -0,0 +1,66 @@
+"""
+Per-request TripCrew construction cost: wall time and allocated memory.
+
+Builds what one /plan-trip request builds (feasibility crew, logistics graph,
+budget crew, each from its own TripCrew) without calling any LLM.
+
+    cd ai_engine
+    python benchmarks/bench_crew_construction.py --iterations 50
+"""
+import argparse
+import gc
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+os.environ.setdefault("GROQ_API_KEY", "gsk_benchmark")
+os.environ.setdefault("CREWAI_TRACING_ENABLED", "false")
+
+
+def build_request_crews(TripCrew):
+    TripCrew().feasibility_crew()
+    graph = TripCrew().logistics_graph()
+    TripCrew().budget_crew()
+    return graph
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=30)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    from src.ringmaster_ai.crews.trip_crew.trip_crew import TripCrew
+    import_s = time.perf_counter() - start
+
+    # First request pays for one-off setup (registry, clients); report it apart.
+    start = time.perf_counter()
+    build_request_crews(TripCrew)
+    first_ms = (time.perf_counter() - start) * 1000
+
+    timings = []
+    for _ in range(args.iterations):
+        start = time.perf_counter()
+        build_request_crews(TripCrew)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    build_request_crews(TripCrew)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings.sort()
+    print(f"import trip_crew:        {import_s * 1000:8.1f} ms")
+    print(f"first request:           {first_ms:8.1f} ms")
+    print(f"per request (median):    {statistics.median(timings):8.1f} ms")
+    print(f"per request (p95):       {timings[int(len(timings) * 0.95) - 1]:8.1f} ms")
+    print(f"allocated per request:   {(peak - before) / 1024:8.1f} KiB (tracemalloc peak)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""
+End-to-end /plan-trip benchmark against local fake Groq and Serper services.
+
+Starts the fakes (see fake_services.py) and the FastAPI app under uvicorn,
+waits for /ready, then drives background plan jobs at each concurrency level.
+Reports per-stage latency percentiles, throughput, 429s and how evenly the
+Groq keys were used, and writes everything to a JSON file; pass --baseline
+with an earlier file to print the change.
+
+    cd ai_engine
+    python benchmarks/bench_e2e.py --concurrency 1 4 8 --requests 16 --llm-latency 0.3
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from fake_services import FakeLLMServer, FakeSerperServer
+
+ENGINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+STAGES = ("feasibility", "logistics", "budget")
+PERCENTILES = (50, 90, 99)
+
+# Delhi -> Jaipur resolves from the bundled feasibility tables, so the
+# feasibility stage stays local unless --destination says otherwise.
+DEFAULT_TRIP = {
+    "destination": "Jaipur",
+    "origin": "Delhi",
+    "days": 3,
+    "travel_style": "Leisure",
+    "budget": "50000",
+    "travelers": 2,
+    "current_date": "2025-02-10",
+}
+
+
+def percentiles(values):
+    if not values:
+        return None
+    ordered = sorted(values)
+    summary = {"min": round(ordered[0], 3), "mean": round(statistics.fmean(ordered), 3), "max": round(ordered[-1], 3)}
+    for p in PERCENTILES:
+        index = min(len(ordered) - 1, max(0, int(round(p / 100.0 * len(ordered) + 0.5)) - 1))
+        summary[f"p{p}"] = round(ordered[index], 3)
+    return summary
+
+
+def http_json(method, url, payload=None, timeout=30):
+    data = json.dumps(payload).encode("utf-8") if payload is not None else None
+    request = urllib.request.Request(url, data=data, method=method, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status, json.loads(response.read() or b"null")
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"null")
+
+
+class App:
+    """The AI engine under uvicorn in a child process, wired to the fakes."""
+
+    def __init__(self, port, env, log_path):
+        self.port = port
+        self.url = f"http://127.0.0.1:{port}"
+        self.log = open(log_path, "w", encoding="utf-8")
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "src.ringmaster_ai.main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=ENGINE_DIR, env=env, stdout=self.log, stderr=subprocess.STDOUT,
+        )
+
+    def wait_ready(self, timeout):
+        """Seconds until /ready answered 200."""
+        started = time.monotonic()
+        while time.monotonic() - started < timeout:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"app exited with {self.process.returncode}; see {self.log.name}")
+            try:
+                status, _ = http_json("GET", f"{self.url}/ready", timeout=2)
+                if status == 200:
+                    return time.monotonic() - started
+            except OSError:
+                pass
+            time.sleep(0.2)
+        raise TimeoutError(f"app not ready after {timeout}s; see {self.log.name}")
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self.log.close()
+
+
+def run_job(app_url, trip, poll_interval, timeout):
+    """Submit one background plan and poll it to completion; returns its timings."""
+    started = time.time()
+    status, job = http_json("POST", f"{app_url}/plan-trip/jobs", trip)
+    if status != 202:
+        return {"status": "rejected", "http_status": status, "total_s": time.time() - started}
+    while time.time() - started < timeout:
+        time.sleep(poll_interval)
+        _, snapshot = http_json("GET", f"{app_url}{job['status_url']}")
+        if snapshot["status"] in ("completed", "failed"):
+            break
+    else:
+        return {"status": "timeout", "total_s": time.time() - started}
+
+    result = {"status": snapshot["status"], "total_s": snapshot["finished_at"] - snapshot["created_at"]}
+    first_started = min((s["started_at"] for s in snapshot["stages"].values() if "started_at" in s), default=None)
+    if first_started is not None:
+        result["queue_s"] = first_started - snapshot["created_at"]
+    for name, stage in snapshot["stages"].items():
+        if "duration_s" in stage:
+            result[f"{name}_s"] = stage["duration_s"]
+    if snapshot["status"] == "failed":
+        result["error"] = str(snapshot.get("error"))[:300]
+    return result
+
+
+def key_report(stats, elapsed, rpm_limit):
+    per_key = {}
+    for index, (key, counts) in enumerate(sorted(stats.items())):
+        ok = counts.get("ok", 0)
+        per_key[f"key{index + 1}"] = {
+            "requests": counts.get("requests", 0),
+            "ok": ok,
+            "rate_limited": counts.get("rate_limited", 0),
+            "tokens": counts.get("prompt_tokens", 0) + counts.get("completion_tokens", 0),
+            # Share of the key's request budget the run actually used
+            "rpm_utilization": round(ok / (rpm_limit * elapsed / 60.0), 3) if rpm_limit and elapsed else None,
+        }
+    oks = [k["ok"] for k in per_key.values()]
+    return {
+        "requests": sum(k["requests"] for k in per_key.values()),
+        "rate_limited": sum(k["rate_limited"] for k in per_key.values()),
+        # 1.0 means every key served the same number of calls
+        "balance": round(min(oks) / max(oks), 3) if oks and max(oks) else None,
+        "per_key": per_key,
+    }
+
+
+def run_level(app, llm, serper, concurrency, requests, trip, args):
+    llm.reset_stats()
+    serper.reset_stats()
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: run_job(app.url, trip, args.poll_interval, args.job_timeout), range(requests)))
+    elapsed = time.monotonic() - started
+
+    completed = [r for r in results if r["status"] == "completed"]
+    latency = {"total": percentiles([r["total_s"] for r in completed]),
+               "queue": percentiles([r["queue_s"] for r in completed if "queue_s" in r])}
+    for stage in STAGES:
+        latency[stage] = percentiles([r[f"{stage}_s"] for r in completed if f"{stage}_s" in r])
+    serper_stats = serper.stats()
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "completed": len(completed),
+        "failed": len(results) - len(completed),
+        "errors": sorted({r.get("error") or r["status"] for r in results if r["status"] != "completed"}),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_per_min": round(len(completed) / elapsed * 60.0, 2) if elapsed else 0.0,
+        "latency_s": latency,
+        "llm": key_report(llm.stats(), elapsed, args.key_rpm),
+        "serper_requests": sum(c.get("requests", 0) for c in serper_stats.values()),
+    }
+
+
+def print_level(level):
+    total = level["latency_s"]["total"] or {}
+    print(f"c={level['concurrency']:<3} {level['completed']}/{level['requests']} ok  "
+          f"{level['throughput_per_min']:>7} plans/min  total p50 {total.get('p50')}s p90 {total.get('p90')}s  "
+          f"LLM calls {level['llm']['requests']} (429: {level['llm']['rate_limited']}, balance {level['llm']['balance']})")
+    for stage in ("queue",) + STAGES:
+        summary = level["latency_s"].get(stage)
+        if summary:
+            print(f"      {stage:<12} p50 {summary['p50']:>7}s  p90 {summary['p90']:>7}s  p99 {summary['p99']:>7}s")
+    for error in level["errors"]:
+        print(f"      ! {error}")
+
+
+def print_comparison(current, baseline_path):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {lvl["concurrency"]: lvl for lvl in json.load(f)["levels"]}
+    print(f"\nChange vs {baseline_path}:")
+    matched = [lvl for lvl in current["levels"] if lvl["concurrency"] in baseline]
+    if not matched:
+        print("  no concurrency level in common")
+    for level in matched:
+        old = baseline[level["concurrency"]]
+        def delta(new_value, old_value):
+            if not new_value or not old_value:
+                return "n/a"
+            return f"{(new_value - old_value) / old_value * 100:+.1f}%"
+        new_total, old_total = level["latency_s"]["total"] or {}, old["latency_s"]["total"] or {}
+        print(f"c={level['concurrency']:<3} throughput {delta(level['throughput_per_min'], old['throughput_per_min'])}  "
+              f"p50 {delta(new_total.get('p50'), old_total.get('p50'))}  p90 {delta(new_total.get('p90'), old_total.get('p90'))}")
+
+
+def app_env(args, llm, serper):
+    env = dict(os.environ)
+    for name in [n for n in env if n.startswith("GROQ_")]:
+        del env[name]
+    env.update({
+        "GROQ_API_BASE": f"{llm.url}/openai/v1",
+        "SERPER_IMAGES_URL": f"{serper.url}/images",
+        "SERPER_API_KEY": "serper_benchmark",
+        "GROQ_RPM_LIMIT": str(args.key_rpm),
+        "GROQ_TPM_LIMIT": str(args.key_tpm),
+        # Pipelines the app runs at once: admission's ceiling, or the job pool without admission
+        "ADMISSION_MAX_CONCURRENCY": str(args.app_workers or max(args.concurrency)),
+        "PLAN_TRIP_WORKERS": str(args.app_workers or max(args.concurrency)),
+        # Every request must reach the crews and the image lookups
+        "PLAN_CACHE_DISABLED": "1",
+        "TOOL_CACHE_DISABLED": "1",
+        "LLM_CACHE_MODE": "passthrough",
+        "AI_ENGINE_WARMUP": "1",
+        "CREWAI_TRACING_ENABLED": "false",
+        "LITELLM_LOCAL_MODEL_COST_MAP": "True",
+        "PYTHONUNBUFFERED": "1",
+    })
+    for i in range(1, args.keys + 1):
+        env[f"GROQ_API_KEY_{i}"] = f"gsk_benchmark_{i}"
+    return env
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--requests", type=int, default=None, help="plans per level (default: 2 x concurrency)")
+    parser.add_argument("--keys", type=int, default=4, help="fake Groq keys handed to the app")
+    parser.add_argument("--key-rpm", type=int, default=1000, help="per-key RPM the app's scheduler assumes")
+    parser.add_argument("--key-tpm", type=int, default=1_000_000, help="per-key TPM the app's scheduler assumes")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="seconds per fake completion")
+    parser.add_argument("--serper-latency", type=float, default=0.05)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of LLM calls answered with 429")
+    parser.add_argument("--rpm-limit", type=int, default=0, help="per-key RPM the fake Groq enforces with 429s")
+    parser.add_argument("--destination", default=DEFAULT_TRIP["destination"])
+    parser.add_argument("--days", type=int, default=DEFAULT_TRIP["days"])
+    parser.add_argument("--app-port", type=int, default=8411)
+    parser.add_argument("--app-workers", type=int, default=None, help="ADMISSION_MAX_CONCURRENCY and PLAN_TRIP_WORKERS (default: max concurrency)")
+    parser.add_argument("--poll-interval", type=float, default=0.05)
+    parser.add_argument("--job-timeout", type=float, default=600)
+    parser.add_argument("--ready-timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default=None, help="results JSON (default: benchmarks/results/e2e-<time>.json)")
+    parser.add_argument("--baseline", default=None, help="earlier results JSON to compare against")
+    args = parser.parse_args()
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    output = args.output or os.path.join(RESULTS_DIR, f"e2e-{stamp}.json")
+    trip = dict(DEFAULT_TRIP, destination=args.destination, days=args.days)
+
+    llm = FakeLLMServer(0, args.llm_latency, args.jitter, args.rate_limit_rate, args.rpm_limit, seed=args.seed).start()
+    serper = FakeSerperServer(0, args.serper_latency, args.jitter, seed=args.seed).start()
+    app = App(args.app_port, app_env(args, llm, serper), os.path.splitext(output)[0] + ".log")
+    report = {"started_at": stamp, "config": dict(vars(args), trip=trip), "levels": []}
+    try:
+        report["ready_s"] = round(app.wait_ready(args.ready_timeout), 2)
+        print(f"App ready in {report['ready_s']}s (logs: {app.log.name})")
+        for concurrency in args.concurrency:
+            level = run_level(app, llm, serper, concurrency, args.requests or 2 * concurrency, trip, args)
+            report["levels"].append(level)
+            print_level(level)
+    finally:
+        app.stop()
+        llm.stop()
+        serper.stop()
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {output}")
+    if args.baseline:
+        print_comparison(report, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Cold-start import time of the AI engine, measured with `python -X importtime`.
+
+Imports the FastAPI app in a fresh interpreter (best of --runs), prints the
+slowest modules and fails if the total exceeds --max-ms or if any module in
+--forbid got imported eagerly. Run from ai_engine/:
+
+    python benchmarks/bench_import_time.py
+    python benchmarks/bench_import_time.py --max-ms 1500 --top 25
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ENGINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+DEFAULT_MODULE = "src.ringmaster_ai.main"
+# Loaded on the warm-up thread, never on the import path.
+DEFAULT_FORBIDDEN = ("crewai", "litellm", "langchain_groq", "langchain_core")
+
+
+def import_profile(module):
+    """{module: (self_us, cumulative_us)} for one cold import of `module`."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ENGINE_DIR, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    profile = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        profile[name.strip()] = (int(self_us), int(cumulative_us))
+    return profile
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default=DEFAULT_MODULE)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--max-ms", type=float, default=float(os.getenv("IMPORT_TIME_BUDGET_MS", "2000")))
+    parser.add_argument("--forbid", nargs="*", default=list(DEFAULT_FORBIDDEN))
+    args = parser.parse_args()
+
+    # The first run also warms the OS file cache; keep the fastest.
+    profiles = [import_profile(args.module) for _ in range(args.runs)]
+    profile = min(profiles, key=lambda p: p[args.module][1])
+    total_ms = profile[args.module][1] / 1000
+
+    print(f"{args.module}: {total_ms:.1f} ms cumulative (best of {args.runs})")
+    print(f"{'self ms':>9} {'cum ms':>9}  module")
+    slowest = sorted(profile.items(), key=lambda kv: kv[1][0], reverse=True)[:args.top]
+    for name, (self_us, cumulative_us) in slowest:
+        print(f"{self_us / 1000:9.1f} {cumulative_us / 1000:9.1f}  {name}")
+
+    failures = []
+    if total_ms > args.max_ms:
+        failures.append(f"import took {total_ms:.1f} ms, budget is {args.max_ms:.0f} ms")
+    eager = sorted(m for m in profile if m in args.forbid)
+    if eager:
+        failures.append(f"eagerly imported: {', '.join(eager)}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
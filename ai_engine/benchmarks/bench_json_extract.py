@@ -0,0 +1,89 @@
+"""
+Micro-benchmark for src.ringmaster_ai.json_extract on large itineraries.
+
+Builds synthetic budget-crew answers (prose + fenced JSON) of a few hundred
+KB and times the old regex/find-rfind extraction against parse_json(), plus
+streaming through StreamingJSONParser in token-sized chunks. Run from
+ai_engine/:
+
+    python benchmarks/bench_json_extract.py --days 60 90 120
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.ringmaster_ai.json_extract import StreamingJSONParser, parse_json
+
+
+def legacy_extract(text):
+    # The extraction pipeline.py used before json_extract.py
+    match = re.search(r'```json\s*(\{.*?\})\s*```', text, re.DOTALL)
+    if match:
+        return match.group(1)
+    start = text.find('{')
+    end = text.rfind('}') + 1
+    if start != -1 and end != -1:
+        return text[start:end]
+    return text
+
+
+def make_answer(days):
+    activity = {
+        "time": "09:00 AM", "activity": "Walk through the old city {bazaar}",
+        "description": "Spice stalls, \"hidden\" courtyards and a rooftop chai stop. " * 6,
+        "cost": "450 INR", "image_url": "LEAVE_EMPTY",
+        "coordinates": {"lat": 26.9239, "lng": 75.8267},
+    }
+    plan = {
+        "destination": "Jaipur, Udaipur", "total_cost": "95,000 INR",
+        "hotels": [{"name": f"Haveli {i}", "price": "4,000 INR", "image_url": "LEAVE_EMPTY"} for i in range(10)],
+        "itinerary": [{"day": d + 1, "title": f"Day {d + 1}", "activities": [dict(activity) for _ in range(8)]}
+                      for d in range(days)],
+    }
+    body = json.dumps(plan, indent=2)
+    return f"Thought: I now know the final answer for {{destination}}.\n```json\n{body}\n```\nEnjoy the trip!"
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def stream(text, chunk_size):
+    parser = StreamingJSONParser()
+    for i in range(0, len(text), chunk_size):
+        parser.feed(text[i:i + chunk_size])
+    return parser.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--days", type=int, nargs="+", default=[30, 90, 150])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--chunk", type=int, default=16, help="characters per streamed token")
+    args = parser.parse_args()
+
+    print(f"{'size KB':>8} {'legacy ms':>10} {'parse_json ms':>14} {'stream ms':>10} {'truncated ms':>13}")
+    for days in args.days:
+        text = make_answer(days)
+        truncated = text[: int(len(text) * 0.8)]
+        assert parse_json(text) == json.loads(legacy_extract(text))
+        assert parse_json(truncated)["itinerary"]
+        legacy = best_of(lambda: json.loads(legacy_extract(text)), args.repeat)
+        single = best_of(lambda: parse_json(text), args.repeat)
+        streamed = best_of(lambda: stream(text, args.chunk), args.repeat)
+        repaired = best_of(lambda: parse_json(truncated), args.repeat)
+        print(f"{len(text) / 1024:8.0f} {legacy:10.1f} {single:14.1f} {streamed:10.1f} {repaired:13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Local stand-ins for Groq (OpenAI-compatible chat completions) and Serper images.
+
+Both answer after a configurable latency and can inject 429s, either at random
+or by enforcing a per-key requests-per-minute cap. The LLM fake recognises the
+TripCrew task from its expected-output schema and answers with a small valid
+JSON, so the pipeline runs end to end without network or quota.
+
+    cd ai_engine
+    python benchmarks/fake_services.py --llm-port 8401 --serper-port 8402
+    GROQ_API_BASE=http://127.0.0.1:8401/openai/v1 SERPER_IMAGES_URL=http://127.0.0.1:8402/images ...
+"""
+import argparse
+import collections
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+class FakeService:
+    """Threaded HTTP server with latency, 429 injection and per-key counters."""
+
+    def __init__(self, port=0, latency=0.0, jitter=0.0, rate_limit_rate=0.0, rpm_limit=0,
+                 retry_after=1.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit_rate = rate_limit_rate
+        self.rpm_limit = rpm_limit
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._windows = collections.defaultdict(collections.deque)
+        self.reset_stats()
+
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                status, payload, headers = service.handle(self.path, self.headers, body)
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    # --- accounting -----------------------------------------------------
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = collections.defaultdict(lambda: collections.Counter())
+
+    def stats(self):
+        """{key: {"requests", "ok", "rate_limited", ...}} since the last reset."""
+        with self._lock:
+            return {key: dict(counter) for key, counter in self._stats.items()}
+
+    def _count(self, key, **amounts):
+        with self._lock:
+            self._stats[key].update(amounts)
+
+    def _should_rate_limit(self, key):
+        now = time.monotonic()
+        with self._lock:
+            if self.rate_limit_rate and self._random.random() < self.rate_limit_rate:
+                return True
+            if not self.rpm_limit:
+                return False
+            window = self._windows[key]
+            while window and now - window[0] > 60.0:
+                window.popleft()
+            if len(window) >= self.rpm_limit:
+                return True
+            window.append(now)
+            return False
+
+    def _sleep(self):
+        delay = self.latency + (self._random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def handle(self, path, headers, body):
+        key = self.request_key(headers)
+        self._count(key, requests=1)
+        if self._should_rate_limit(key):
+            self._count(key, rate_limited=1)
+            return 429, self.rate_limit_payload(), {"retry-after": f"{self.retry_after:g}"}
+        self._sleep()
+        try:
+            payload = self.respond(path, json.loads(body or b"{}"), key)
+        except Exception as e:
+            self._count(key, errors=1)
+            return 500, {"error": {"message": f"fake service error: {e}"}}, {}
+        self._count(key, ok=1)
+        return 200, payload, {}
+
+    # --- overridden per service -----------------------------------------
+
+    def request_key(self, headers):
+        return "-"
+
+    def rate_limit_payload(self):
+        return {"message": "Too many requests"}
+
+    def respond(self, path, request, key):
+        raise NotImplementedError
+
+
+def _days(text):
+    match = re.search(r"EXACTLY (\d+) DAYS", text, re.IGNORECASE)
+    return max(1, int(match.group(1))) if match else 2
+
+
+def _destination(text):
+    match = re.search(r'"destination": "([^"{}]+)"', text) or re.search(r"Destination: ([^,\n]+)", text)
+    return match.group(1).strip() if match else "Jaipur"
+
+
+def trip_task_answer(text):
+    """A minimal valid answer for whichever TripCrew task `text` describes."""
+    days = _days(text)
+    city = _destination(text)
+    if '"trip_name"' in text:
+        return {
+            "trip_name": f"Trip to {city}",
+            "destination": city,
+            "travel_style": "Leisure",
+            "total_budget_estimated": "40000",
+            "currency": "INR",
+            "flights": [{"route": f"Delhi to {city}", "price_estimate": "6000", "duration": "1h 10m",
+                         "airline_options": ["IndiGo"]}],
+            "hotels": [{"name": f"{city} Palace Hotel", "price_per_night": "4000", "rating": "4.4/5",
+                        "features": ["Wifi"], "image_url": "LEAVE_EMPTY_FOR_BACKEND",
+                        "coordinates": [26.9, 75.8], "address": "MI Road"}],
+            "itinerary": [
+                {"day": d, "theme": "Exploration", "activities": [
+                    {"time": "10:00 AM", "activity": f"{city} Fort visit {d}", "description": "Old fort.",
+                     "cost_estimate": "500", "image_url": "LEAVE_EMPTY_FOR_BACKEND", "coordinates": [26.9, 75.8],
+                     "details": {"famous_for": "History", "opening_hours": "09:00 - 17:00",
+                                 "best_time_to_visit": "Morning"}}]}
+                for d in range(1, days + 1)
+            ],
+        }
+    if '"is_feasible": boolean' in text:
+        return {"is_feasible": True, "reason": "Budget covers the trip", "estimated_travel_cost": 6000,
+                "daily_spend_per_person": 3000, "message": "Your trip is feasible.", "minimum_suggested_budget": 20000}
+    if '{"flights": [' in text:
+        return {"flights": [{"route": f"Delhi to {city}", "airlines": ["IndiGo", "Air India"],
+                             "price_estimate": "6000", "duration": "1h 10m"}]}
+    if '{"hotels": [' in text:
+        return {"hotels": [{"name": f"{city} Palace Hotel", "city": city, "address": "MI Road", "rating": "4.4/5",
+                            "price_per_night": "4000", "amenities": ["Wifi", "Pool"]}]}
+    if '{"days": [' in text:
+        return {"days": [{"day": d, "city": city, "theme": "Exploration", "transport": "Cab",
+                          "activities": [{"time": "10:00 AM", "name": f"{city} Fort visit {d}",
+                                          "place": f"{city} Fort", "description": "Old fort."}]}
+                         for d in range(1, days + 1)]}
+    if '{"order":' in text:
+        return {"order": [city], "nights": {city: days}, "rationale": "Single city."}
+    return {"answer": "ok"}
+
+
+class FakeLLMServer(FakeService):
+    """OpenAI-compatible /chat/completions (any path prefix), keyed by bearer token."""
+
+    def request_key(self, headers):
+        auth = headers.get("Authorization") or ""
+        return auth[len("Bearer "):] if auth.startswith("Bearer ") else auth or "-"
+
+    def rate_limit_payload(self):
+        return {"error": {
+            "message": f"Rate limit reached for model on tokens per minute (TPM). Please try again in {self.retry_after:g}s.",
+            "type": "tokens", "code": "rate_limit_exceeded",
+        }}
+
+    def respond(self, path, request, key):
+        if not path.rstrip("/").endswith("/chat/completions"):
+            raise ValueError(f"unexpected path {path}")
+        messages = request.get("messages") or []
+        text = "\n".join(str(m.get("content") or "") for m in messages)
+        answer = json.dumps(trip_task_answer(text))
+        content = f"Thought: I now know the final answer\nFinal Answer: {answer}"
+        usage = {"prompt_tokens": _estimate_tokens(text), "completion_tokens": _estimate_tokens(content)}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        self._count(key, prompt_tokens=usage["prompt_tokens"], completion_tokens=usage["completion_tokens"])
+        return {
+            "id": f"chatcmpl-fake-{time.monotonic_ns()}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage,
+            # Groq sends these; litellm's response conversion expects them
+            "system_fingerprint": "fp_fake",
+            "service_tier": "on_demand",
+        }
+
+
+class FakeSerperServer(FakeService):
+    """Serper /images: one deterministic image URL per query."""
+
+    def request_key(self, headers):
+        return headers.get("X-API-KEY") or "-"
+
+    def respond(self, path, request, key):
+        slug = re.sub(r"[^a-z0-9]+", "-", str(request.get("q", "")).lower()).strip("-") or "image"
+        return {"images": [{"title": request.get("q"), "imageUrl": f"https://images.example.test/{slug}.jpg"}]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--llm-port", type=int, default=8401)
+    parser.add_argument("--serper-port", type=int, default=8402)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds per completion")
+    parser.add_argument("--serper-latency", type=float, default=0.1)
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- seconds added to every latency")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of LLM calls answered with 429")
+    parser.add_argument("--rpm-limit", type=int, default=0, help="per-key LLM requests per minute (0: unlimited)")
+    args = parser.parse_args()
+
+    llm = FakeLLMServer(args.llm_port, args.llm_latency, args.jitter, args.rate_limit_rate, args.rpm_limit).start()
+    serper = FakeSerperServer(args.serper_port, args.serper_latency, args.jitter).start()
+    print(f"GROQ_API_BASE={llm.url}/openai/v1")
+    print(f"SERPER_IMAGES_URL={serper.url}/images")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        llm.stop()
+        serper.stop()
+
+
+if __name__ == "__main__":
+    main()
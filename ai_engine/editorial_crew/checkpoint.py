@@ -0,0 +1,75 @@
+import json
+import os
+import threading
+import time
+
+
+def city_key(region, category, city):
+    return f"{region}/{category}/{city}"
+
+
+class CheckpointManifest:
+    """
+    On-disk record of one editorial refresh.
+
+    Holds the trend list the run works through and the outcome of every
+    city, rewritten atomically after each update, so a crashed or
+    interrupted run resumes with the same cities and skips finished ones.
+    A run that settled every city archives its manifest (complete()), and
+    one older than `max_age` seconds is not resumed, so later refreshes
+    spot new trends instead of finding everything done.
+    """
+
+    def __init__(self, path, max_age=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self.data = {"created_at": time.time(), "trends": None, "cities": {}}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.data = json.load(f)
+        self.expired = bool(max_age) and time.time() - self.data.get("created_at", 0) > max_age
+
+    @property
+    def trends(self):
+        return self.data.get("trends")
+
+    def set_trends(self, trends):
+        with self._lock:
+            self.data["trends"] = trends
+            self._save()
+
+    def status(self, key):
+        return self.data["cities"].get(key, {}).get("status")
+
+    def is_done(self, key):
+        # Spooled records are delivered by the next run's replay, not re-enriched
+        return self.status(key) in ("done", "spooled")
+
+    def mark(self, key, status, **info):
+        with self._lock:
+            entry = self.data["cities"].setdefault(key, {})
+            entry.update(info, status=status, updated_at=time.time())
+            self._save()
+
+    def settled(self, keys):
+        """True when every city in `keys` was saved or permanently rejected (none failed or spooled)."""
+        return all(self.status(key) in ("done", "rejected") for key in keys)
+
+    def complete(self):
+        """Archive the finished run to `<path>.last` and start the next one empty."""
+        with self._lock:
+            self._save()
+            os.replace(self.path, f"{self.path}.last")
+            self.data = {"created_at": time.time(), "trends": None, "cities": {}}
+
+    def reset(self):
+        with self._lock:
+            self.data = {"created_at": time.time(), "trends": None, "cities": {}}
+            self._save()
+
+    def _save(self):
+        # Caller holds self._lock
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp_path, self.path)
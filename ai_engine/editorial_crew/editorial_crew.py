@@ -1,35 +1,65 @@
 import os
-import json
-import requests
+import sys
+import argparse
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from crewai import Agent, Task, Crew, Process
-from langchain_groq import ChatGroq
 from dotenv import load_dotenv
 
+# Share the engine's JSON extractor (ai_engine/ is the parent directory)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from src.ringmaster_ai.json_extract import parse_json
+from src.ringmaster_ai.key_scheduler import load_groq_keys
+from src.ringmaster_ai.scheduled_llm import ScheduledLLM
+
+from checkpoint import CheckpointManifest, city_key
+from upsert_client import BufferedUpsertClient
+
 # Load environment variables
 load_dotenv()
 
 # Set dummy OpenAI Key to bypass CrewAI validation
 os.environ["OPENAI_API_KEY"] = "NA"
 
-# Groq LLM Configuration
-llm = ChatGroq(
-    api_key=os.getenv("GROQ_API_KEY"),
-    model="llama-3.3-70b-versatile",
+# Groq LLM Configuration: one shared client, each call leases the Groq key
+# with the most headroom, so parallel cities spread across all keys
+llm = ScheduledLLM(
+    model="groq/llama-3.3-70b-versatile",
     temperature=0.8,
-    model_kwargs={"frequency_penalty": 0.9, "presence_penalty": 0.7} # Strict repetition blocking
+    frequency_penalty=0.9, # Strict repetition blocking
+    presence_penalty=0.7
 )
 
 API_URL = "http://localhost:5000/api/explore/save-trip" # Backend endpoint
+BULK_API_URL = "http://localhost:5000/api/explore/save-trips" # Batched upserts
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MANIFEST_PATH = os.getenv("EDITORIAL_MANIFEST", os.path.join(BASE_DIR, ".cache", "editorial_manifest.json"))
+# Records the backend could not take; replayed at the start of the next run
+SPOOL_PATH = os.getenv("EDITORIAL_SPOOL", os.path.join(BASE_DIR, ".cache", "upsert_spool.jsonl"))
+# Concurrent cities per Groq key, seconds one city may take, and extra attempts
+WORKERS_PER_KEY = int(os.getenv("EDITORIAL_WORKERS_PER_KEY", "2"))
+CITY_TIMEOUT = int(os.getenv("EDITORIAL_CITY_TIMEOUT", "180"))
+CITY_RETRIES = int(os.getenv("EDITORIAL_CITY_RETRIES", "2"))
+# An interrupted run older than this (hours) is not resumed; the next one starts fresh
+MANIFEST_MAX_AGE_H = float(os.getenv("EDITORIAL_MANIFEST_MAX_AGE_H", "12"))
+
+_print_lock = threading.Lock()
+
+def log(message):
+    with _print_lock:
+        print(message, flush=True)
 
-def create_agent(role, goal, backstory):
+def create_agent(role, goal, backstory, verbose=True, max_execution_time=None):
     return Agent(
         role=role,
         goal=goal,
         backstory=backstory,
-        verbose=True,
+        verbose=verbose,
         allow_delegation=False,
-        llm=llm
+        llm=llm,
+        max_execution_time=max_execution_time
     )
 
 def create_task(description, expected_output, agent):
@@ -41,16 +71,13 @@ def create_task(description, expected_output, agent):
 
 def load_config(file_path):
     import yaml
-    with open(file_path, 'r') as file:
+    with open(os.path.join(BASE_DIR, file_path), 'r') as file:
         return yaml.safe_load(file)
 
-def run_isolation_loop():
-    print("🚀 Starting Trend Spotter Stage...")
-    
-    # Load Configs
-    agents_config = load_config('config/agents.yaml')
-    tasks_config = load_config('config/tasks.yaml')
+def default_workers():
+    return max(1, len(load_groq_keys()) * WORKERS_PER_KEY)
 
+def generate_trends(agents_config, tasks_config):
     # --- STAGE 1: TREND SPOTTER ---
     trend_spotter = create_agent(
         role=agents_config['trend_spotter']['role'],
@@ -58,7 +85,7 @@ def run_isolation_loop():
         backstory=agents_config['trend_spotter']['backstory']
     )
 
-    generate_trends = create_task(
+    generate_trends_task = create_task(
         description=tasks_config['generate_trends_task']['description'],
         expected_output=tasks_config['generate_trends_task']['expected_output'],
         agent=trend_spotter
@@ -67,96 +94,188 @@ def run_isolation_loop():
     # Crew for Trend Spotter
     trend_crew = Crew(
         agents=[trend_spotter],
-        tasks=[generate_trends],
+        tasks=[generate_trends_task],
         verbose=True,
         process=Process.sequential
     )
 
     result = trend_crew.kickoff()
-    
+
     try:
-        # Parse the JSON output (CrewAI output might be a string wrapped in code blocks)
-        # Clean up code blocks if present
-        json_str = str(result)
-        if "```json" in json_str:
-            json_str = json_str.split("```json")[1].split("```")[0]
-        elif "```" in json_str:
-             json_str = json_str.split("```")[1].split("```")[0]
-        
-        trends_data = json.loads(json_str.strip())
+        # Parse the JSON output (CrewAI output might be wrapped in code blocks or prose)
+        trends_data = parse_json(str(result))
         print(f"✅ Generated Trends: {len(trends_data.get('India', {})) + len(trends_data.get('World', {}))} Categories found.")
-        
+        return trends_data
     except Exception as e:
         print(f"❌ Error parsing Trend Spotter output: {e}")
         print(f"Raw Output: {result}")
-        return
+        return None
 
-    # --- STAGE 2 & 3: ISOLATED ENRICHMENT LOOP ---
-    
-    regions = ["India", "World"]
-    
-    for region in regions:
+def iter_cities(trends_data):
+    for region in ["India", "World"]:
         categories = trends_data.get(region, {})
         for category, cities in categories.items():
-            print(f"\n🌍 Processing {region} - {category}...")
-            
             for city in cities:
-                print(f"  🔍 Enriching City: {city}...")
-                
-                # ISOLATION: Create FRESH Agent & Task for EACH city
-                event_hunter = create_agent(
-                    role=agents_config['event_hunter']['role'],
-                    goal=agents_config['event_hunter']['goal'],
-                    backstory=agents_config['event_hunter']['backstory']
-                )
-
-                enrich_task_desc = tasks_config['enrich_city_task']['description'].format(
-                    city=city, region=region, category=category
-                )
-                
-                enrich_city = create_task(
-                    description=enrich_task_desc,
-                    expected_output=tasks_config['enrich_city_task']['expected_output'],
-                    agent=event_hunter
-                )
-
-                # FRESH Crew per City
-                city_crew = Crew(
-                    agents=[event_hunter],
-                    tasks=[enrich_city],
-                    verbose=True,
-                )
-
-                city_result = city_crew.kickoff()
-                
-                # --- UPSERT TO BACKEND ---
-                try:
-                    # Clean/Parse JSON
-                    city_json_str = str(city_result)
-                    if "```json" in city_json_str:
-                        city_json_str = city_json_str.split("```json")[1].split("```")[0]
-                    elif "```" in city_json_str:
-                         city_json_str = city_json_str.split("```")[1].split("```")[0]
-
-                    city_data = json.loads(city_json_str.strip())
-                    
-                    # Add missing fields if needed (sanity check)
-                    city_data['destination'] = city
-                    city_data['region'] = region
-                    city_data['category'] = category
-                    
-                    # POST to Backend
-                    response = requests.post(API_URL, json=city_data)
-                    if response.status_code == 200:
-                         print(f"    ✅ Saved {city} to Database.")
-                    else:
-                         print(f"    ⚠️ Failed to save {city}: {response.text}")
-
-                except Exception as e:
-                    print(f"    ❌ Error processing/saving {city}: {e}")
-                
-                # Sleep briefly to respect rate limits if needed, though Loop Isolation helps.
-                time.sleep(1)
+                yield region, category, city
+
+def enrich_city(city, region, category, agents_config, tasks_config, verbose=True, timeout=CITY_TIMEOUT):
+    # ISOLATION: Create FRESH Agent & Task for EACH city
+    event_hunter = create_agent(
+        role=agents_config['event_hunter']['role'],
+        goal=agents_config['event_hunter']['goal'],
+        backstory=agents_config['event_hunter']['backstory'],
+        verbose=verbose,
+        max_execution_time=timeout
+    )
+
+    enrich_task_desc = tasks_config['enrich_city_task']['description'].format(
+        city=city, region=region, category=category
+    )
+
+    enrich_city_task = create_task(
+        description=enrich_task_desc,
+        expected_output=tasks_config['enrich_city_task']['expected_output'],
+        agent=event_hunter
+    )
+
+    # FRESH Crew per City
+    city_crew = Crew(
+        agents=[event_hunter],
+        tasks=[enrich_city_task],
+        verbose=verbose,
+    )
+
+    city_data = parse_json(str(city_crew.kickoff()))
+
+    # Add missing fields if needed (sanity check)
+    city_data['destination'] = city
+    city_data['region'] = region
+    city_data['category'] = category
+    return city_data
+
+def process_city(region, category, city, agents_config, tasks_config, manifest, writer, verbose, timeout, retries):
+    """Enrich one city, retrying with backoff, and queue it for upsert; records the outcome in the manifest."""
+    key = city_key(region, category, city)
+    started = time.time()
+    error = None
+    for attempt in range(1, retries + 2):
+        log(f"  🔍 Enriching City: {city} ({region} - {category}), attempt {attempt}...")
+        try:
+            city_data = enrich_city(city, region, category, agents_config, tasks_config, verbose, timeout)
+            duration = round(time.time() - started, 2)
+            # "enriched" until the writer reports the upsert as saved/spooled
+            manifest.mark(key, "enriched", attempts=attempt, duration_s=duration, error=None)
+            writer.add(city_data)
+            log(f"    ✅ Enriched {city} ({duration}s), queued for upsert.")
+            return True, duration
+        except Exception as e:
+            error = str(e)
+            log(f"    ❌ Error processing {city}: {error}")
+            if attempt <= retries:
+                time.sleep(min(30, 2 ** attempt))
+    duration = round(time.time() - started, 2)
+    manifest.mark(key, "failed", attempts=retries + 1, duration_s=duration, error=error)
+    return False, duration
+
+def run_isolation_loop(workers=None, manifest_path=MANIFEST_PATH, fresh=False, timeout=CITY_TIMEOUT,
+                       retries=CITY_RETRIES, spool_path=SPOOL_PATH, bulk=True):
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    os.makedirs(os.path.dirname(spool_path), exist_ok=True)
+    manifest = CheckpointManifest(manifest_path, max_age=MANIFEST_MAX_AGE_H * 3600)
+    if manifest.expired and manifest.trends:
+        print(f"⌛ Checkpoint older than {MANIFEST_MAX_AGE_H:g}h; starting a fresh run")
+    if fresh or manifest.expired:
+        manifest.reset()
+
+    def record_upsert(record, status):
+        key = city_key(record.get('region'), record.get('category'), record.get('destination'))
+        manifest.mark(key, "done" if status == "saved" else status)
+
+    # --- UPSERT TO BACKEND (batched, in the background) ---
+    writer = BufferedUpsertClient(API_URL, BULK_API_URL if bulk else None, spool_path, on_result=record_upsert)
+    replayed = writer.replay_spool()
+    if replayed:
+        print(f"📤 Replaying {replayed} spooled record(s) from the last run")
+
+    # Load Configs
+    agents_config = load_config('config/agents.yaml')
+    tasks_config = load_config('config/tasks.yaml')
+
+    # A resumed run keeps the city list it started with
+    trends_data = manifest.trends
+    if trends_data:
+        print(f"♻️  Resuming run from {manifest_path}")
+    else:
+        print("🚀 Starting Trend Spotter Stage...")
+        trends_data = generate_trends(agents_config, tasks_config)
+        if not trends_data:
+            writer.close() # still deliver anything replayed from the spool
+            return None
+        manifest.set_trends(trends_data)
+
+    # --- STAGE 2 & 3: ISOLATED ENRICHMENT (bounded pool) ---
+    cities = list(iter_cities(trends_data))
+    pending = [c for c in cities if not manifest.is_done(city_key(*c))]
+    workers = max(1, min(workers or default_workers(), len(pending) or 1))
+    print(f"\n🌍 {len(pending)}/{len(cities)} cities to enrich with {workers} worker(s)...")
+
+    started = time.time()
+    results = {}
+    # Interleaved verbose crew logs are unreadable; only a single worker shows them
+    verbose = workers == 1
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="editorial") as pool:
+        futures = {
+            pool.submit(process_city, region, category, city, agents_config, tasks_config,
+                        manifest, writer, verbose, timeout, retries): (region, category, city)
+            for region, category, city in pending
+        }
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+    upserts = writer.close()
+    elapsed = time.time() - started
+
+    summary = {
+        "cities": len(cities),
+        "skipped": len(cities) - len(pending),
+        "enriched": sum(1 for ok, _ in results.values() if ok),
+        "failed": [city_key(*c) for c, (ok, _) in results.items() if not ok],
+        "elapsed_s": round(elapsed, 1),
+        "cities_per_min": round(len(results) / elapsed * 60, 2) if elapsed > 0 and results else 0.0,
+        "avg_city_s": round(sum(d for _, d in results.values()) / len(results), 1) if results else 0.0,
+        "workers": workers,
+        "upserts": upserts,
+    }
+    print("\n📊 Editorial refresh summary")
+    print(f"   Enriched {summary['enriched']}, skipped {summary['skipped']} (checkpoint), failed {len(summary['failed'])} of {summary['cities']}")
+    print(f"   {summary['elapsed_s']}s total, {summary['cities_per_min']} cities/min, {summary['avg_city_s']}s per city, {workers} worker(s)")
+    print(f"   Upserts: {upserts['saved']} saved, {upserts['spooled']} spooled, {upserts['rejected']} rejected in {upserts['requests']} request(s)")
+    for key in summary["failed"]:
+        print(f"   ⚠️ {key}: {manifest.data['cities'][key].get('error')}")
+    if manifest.settled(city_key(*c) for c in cities):
+        # Nothing left to resume: the next run spots new trends and refreshes every record's TTL
+        manifest.complete()
+        print(f"   Run complete; checkpoint archived to {manifest_path}.last")
+    return summary
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Refresh trending destinations and their events.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help=f"parallel cities (default: {WORKERS_PER_KEY} per Groq key)")
+    parser.add_argument("--sequential", action="store_true", help="one city at a time, with verbose crew logs")
+    parser.add_argument("--fresh", action="store_true", help="ignore the checkpoint and spot new trends")
+    parser.add_argument("--manifest", default=MANIFEST_PATH)
+    parser.add_argument("--timeout", type=int, default=CITY_TIMEOUT, help="seconds per city attempt")
+    parser.add_argument("--retries", type=int, default=CITY_RETRIES, help="extra attempts per city")
+    parser.add_argument("--no-bulk", action="store_true", help="upsert one record per request")
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    run_isolation_loop()
+    args = parse_args()
+    run_isolation_loop(
+        workers=1 if args.sequential else args.workers,
+        manifest_path=args.manifest,
+        fresh=args.fresh,
+        timeout=args.timeout,
+        retries=args.retries,
+        bulk=not args.no_bulk
+    )
@@ -0,0 +1,251 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+BATCH_SIZE = int(os.getenv("EDITORIAL_UPSERT_BATCH", "10"))
+# Seconds a partial batch may wait before it is flushed anyway.
+FLUSH_INTERVAL = float(os.getenv("EDITORIAL_UPSERT_FLUSH_INTERVAL", "2"))
+MAX_RETRIES = int(os.getenv("EDITORIAL_UPSERT_RETRIES", "4"))
+REQUEST_TIMEOUT = float(os.getenv("EDITORIAL_UPSERT_TIMEOUT", "15"))
+# Single-record requests in flight when the backend has no bulk endpoint.
+FALLBACK_CONCURRENCY = 4
+
+
+class PermanentUpsertError(Exception):
+    """The backend rejected the record itself (4xx); retrying will not help."""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class BufferedUpsertClient:
+    """
+    Collects enriched city records and writes them to the backend in batches.
+
+    add() only queues the record; a background thread flushes whenever
+    `batch_size` records are waiting or `flush_interval` has passed, so the
+    enrichment workers never wait on the backend. Batches go to the bulk
+    endpoint over one keep-alive session; if that endpoint is missing (404)
+    the client falls back to concurrent single-record upserts, and a batch
+    the endpoint refuses as a whole (e.g. 400, 413) is resent record by
+    record so only the bad ones are rejected. Transient failures are
+    retried with exponential backoff. Records that still fail are appended
+    to a JSONL spool that the next run replays first; records the backend
+    rejects as invalid go to `<spool>.rejected` instead.
+    """
+
+    def __init__(self, api_url, bulk_url=None, spool_path=None, batch_size=BATCH_SIZE,
+                 flush_interval=FLUSH_INTERVAL, max_retries=MAX_RETRIES, on_result=None):
+        self.api_url = api_url
+        self.bulk_url = bulk_url
+        self.spool_path = spool_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        # on_result(record, status) with status "saved", "spooled" or "rejected"
+        self.on_result = on_result
+        self.stats = {"saved": 0, "spooled": 0, "rejected": 0, "requests": 0, "replayed": 0}
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=FALLBACK_CONCURRENCY)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._replay_path = None
+        self._buffer = []
+        self._first_added = None
+        self._cond = threading.Condition()
+        self._closed = False
+        self._stats_lock = threading.Lock()
+        self._fallback_pool = ThreadPoolExecutor(max_workers=FALLBACK_CONCURRENCY, thread_name_prefix="upsert")
+        self._thread = threading.Thread(target=self._flush_loop, name="upsert-flusher", daemon=True)
+        self._thread.start()
+
+    # --- queueing -------------------------------------------------------
+
+    def add(self, record):
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("upsert client is closed")
+            self._buffer.append(record)
+            if self._first_added is None:
+                self._first_added = time.monotonic()
+            if len(self._buffer) >= self.batch_size:
+                self._cond.notify()
+
+    def replay_spool(self):
+        """
+        Queue records a previous run could not deliver; returns how many.
+
+        The spool is claimed as `<spool>.replay` so failures during this run
+        start a new one; that file is only deleted by close(), once every
+        replayed record is saved, rejected or spooled again. A `.replay`
+        still present means the run that claimed it died first, so it is
+        replayed again (upserts are idempotent).
+        """
+        if not self.spool_path:
+            return 0
+        replay_path = f"{self.spool_path}.replay"
+        if os.path.exists(self.spool_path):
+            if os.path.exists(replay_path):
+                with open(self.spool_path, "r", encoding="utf-8") as f:
+                    spooled = f.read()
+                with open(replay_path, "a", encoding="utf-8") as f:
+                    f.write(spooled)
+                os.remove(self.spool_path)
+            else:
+                os.replace(self.spool_path, replay_path)
+        if not os.path.exists(replay_path):
+            return 0
+        records = []
+        with open(replay_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    records.append(json.loads(line))
+        self._replay_path = replay_path
+        for record in records:
+            self.add(record)
+        self._count("replayed", len(records))
+        return len(records)
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                while not self._closed and not self._due():
+                    timeout = None
+                    if self._first_added is not None:
+                        timeout = max(0.0, self._first_added + self.flush_interval - time.monotonic())
+                    self._cond.wait(timeout)
+                batch = self._buffer[:self.batch_size]
+                del self._buffer[:self.batch_size]
+                self._first_added = time.monotonic() if self._buffer else None
+                if not batch and self._closed:
+                    return
+            if batch:
+                self._send_batch(batch)
+
+    def _due(self):
+        # Caller holds self._cond
+        if len(self._buffer) >= self.batch_size:
+            return True
+        return self._first_added is not None and time.monotonic() - self._first_added >= self.flush_interval
+
+    # --- delivery -------------------------------------------------------
+
+    def _send_batch(self, batch):
+        if self.bulk_url:
+            try:
+                # Parsed outside the retries: a 2xx has written the batch, whatever its body
+                response = self._with_retries(self._post_bulk, batch)
+            except PermanentUpsertError as e:
+                if e.status_code == 404:
+                    print(f"Bulk endpoint {self.bulk_url} not found; falling back to single upserts.")
+                    self.bulk_url = None
+                else:
+                    print(f"Bulk upsert refused ({e}); sending the batch record by record.")
+            except Exception as e:
+                for record in batch:
+                    self._finish(record, "spooled", str(e))
+                return
+            else:
+                rejected = self._bulk_rejections(response)
+                for index, record in enumerate(batch):
+                    message = rejected.get(index)
+                    self._finish(record, "rejected" if message else "saved", message)
+                return
+        list(self._fallback_pool.map(self._send_one, batch))
+
+    def _send_one(self, record):
+        try:
+            self._with_retries(self._post_one, record)
+            self._finish(record, "saved")
+        except PermanentUpsertError as e:
+            self._finish(record, "rejected", str(e))
+        except Exception as e:
+            self._finish(record, "spooled", str(e))
+
+    def _with_retries(self, send, payload):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return send(payload)
+            except PermanentUpsertError:
+                raise
+            except Exception:
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(min(30, 0.5 * 2 ** attempt))
+
+    def _post(self, url, payload):
+        self._count("requests")
+        response = self.session.post(url, json=payload, timeout=REQUEST_TIMEOUT)
+        if response.status_code == 429 or response.status_code >= 500:
+            raise RuntimeError(f"backend answered {response.status_code}: {response.text[:200]}")
+        if response.status_code >= 400:
+            raise PermanentUpsertError(f"backend answered {response.status_code}: {response.text[:200]}",
+                                       response.status_code)
+        return response
+
+    def _post_one(self, record):
+        self._post(self.api_url, record)
+
+    def _post_bulk(self, batch):
+        return self._post(self.bulk_url, {"trips": batch})
+
+    def _bulk_rejections(self, response):
+        """{index: message} for records the backend rejected."""
+        try:
+            return {r["index"]: r.get("message", "rejected") for r in response.json().get("rejected", [])}
+        except (ValueError, AttributeError, KeyError, TypeError):
+            print(f"Bulk endpoint answered {response.status_code} with an unreadable body; counting the batch as saved.")
+            return {}
+
+    def _finish(self, record, status, error=None):
+        if status == "spooled":
+            self._append(self.spool_path, record)
+            print(f"    ⚠️ Spooled {record.get('destination')} for the next run: {error}")
+        elif status == "rejected":
+            self._append(f"{self.spool_path}.rejected" if self.spool_path else None, dict(record, _error=error))
+            print(f"    ❌ Backend rejected {record.get('destination')}: {error}")
+        self._count(status)
+        if self.on_result:
+            self.on_result(record, status)
+
+    def _append(self, path, record):
+        if not path:
+            return
+        with self._stats_lock:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+
+    def _count(self, name, n=1):
+        with self._stats_lock:
+            self.stats[name] += n
+
+    # --- shutdown -------------------------------------------------------
+
+    def close(self):
+        """Flush everything still queued, then stop the background thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self._fallback_pool.shutdown(wait=True)
+        self.session.close()
+        # Every replayed record is settled (failures are in the new spool)
+        if self._replay_path and os.path.exists(self._replay_path):
+            os.remove(self._replay_path)
+        self._replay_path = None
+        return dict(self.stats)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -6,6 +6,8 @@ import traceback
 # Load env vars
 load_dotenv()
 
+# Offline: LLM_CACHE_MODE=replay serves a run captured with LLM_CACHE_MODE=record
+
 try:
     print("Importing TripCrew...")
     from src.ringmaster_ai.crews.trip_crew.trip_crew import TripCrew
@@ -31,9 +33,10 @@ try:
     print("Feasibility Result:", feasibility_result)
 
     # Simplified check for reproduction
-    print("--- STAGE 2: Planning ---")
-    planning_result = crew_instance.planning_crew().kickoff(inputs=inputs)
-    print("Planning Result:", planning_result)
+    print("--- STAGE 2: Logistics ---")
+    from src.ringmaster_ai.pipeline import logistics_inputs
+    logistics_result = crew_instance.logistics_graph().kickoff(inputs=logistics_inputs(inputs))
+    print("Logistics Result:", logistics_result)
 
 except Exception as e:
     print("Exception occurred:")
@@ -0,0 +1,261 @@
+import bisect
+import itertools
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from src.ringmaster_ai.key_scheduler import get_key_scheduler
+from src.ringmaster_ai.metrics import PLAN_ADMISSION_REJECTED, PLAN_ADMISSION_WAIT, REGISTRY
+
+ADMISSION_DISABLED = os.getenv("ADMISSION_DISABLED", "").lower() in ("1", "true", "yes")
+# Pipelines allowed to run per Groq key that is not cooling down or tripped.
+PIPELINES_PER_KEY = float(os.getenv("ADMISSION_PIPELINES_PER_KEY", "1"))
+MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "16"))
+MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "32"))
+# Longest a request may wait in the queue, per priority (seconds); also the
+# budget an estimated wait is checked against on arrival.
+QUEUE_DEADLINES = {
+    "interactive": float(os.getenv("ADMISSION_INTERACTIVE_DEADLINE", "45")),
+    "batch": float(os.getenv("ADMISSION_BATCH_DEADLINE", "900")),
+}
+# Pipeline run time assumed until some have finished; then an EWMA of real runs.
+INITIAL_RUN_SECONDS = float(os.getenv("ADMISSION_INITIAL_RUN_SECONDS", "30"))
+RUN_EWMA_ALPHA = 0.2
+# Queued requests re-check the limit this often, since key health changes without notice.
+RECHECK_SECONDS = 1.0
+
+# Lower rank is admitted first.
+PRIORITIES = {"interactive": 0, "batch": 1}
+
+
+class AdmissionRejected(Exception):
+    """Not admitted: `reason` is queue_full, over_budget or deadline; retry after `retry_after` seconds."""
+
+    def __init__(self, reason, retry_after, priority):
+        super().__init__(f"Plan queue is busy ({reason.replace('_', ' ')}); retry in {retry_after}s")
+        self.reason = reason
+        self.retry_after = retry_after
+        self.priority = priority
+
+
+class _Ticket:
+    """A request queued through enqueue(): nothing blocks on it, callbacks report the outcome."""
+
+    def __init__(self, priority, deadline, on_admit, on_reject):
+        self.priority = priority
+        self.arrived = time.monotonic()
+        self.deadline = deadline
+        self.on_admit = on_admit
+        self.on_reject = on_reject
+
+
+def live_key_capacity():
+    """Pipelines the live Groq keys can carry at once."""
+    return max(1, min(MAX_CONCURRENCY, math.floor(get_key_scheduler().live_keys() * PIPELINES_PER_KEY)))
+
+
+class AdmissionController:
+    """
+    Bounded, priority-ordered admission for plan pipelines.
+
+    At most capacity() pipelines run at once; the rest wait in one queue,
+    interactive requests ahead of batch ones and FIFO within a priority.
+    A request is turned away on arrival when the queue is full or its
+    estimated wait (queued requests ahead of it, divided by the limit, times
+    the average run time) exceeds its priority's deadline, and later if it
+    is still queued at that deadline. Rejections carry a Retry-After hint.
+
+    Callers either block in admit() or, to avoid parking a thread per
+    queued request, enqueue() callbacks that run once a slot is theirs;
+    tick() must then be called about every RECHECK_SECONDS to expire them
+    and to pick up a capacity that grew without a slot being released.
+    Both kinds share one queue and one order.
+    """
+
+    def __init__(self, capacity=live_key_capacity, max_queue=MAX_QUEUE, deadlines=None):
+        self.capacity = capacity
+        self.max_queue = max_queue
+        self.deadlines = dict(QUEUE_DEADLINES, **(deadlines or {}))
+        self._cond = threading.Condition()
+        self._queue = []  # sorted (rank, seq)
+        self._tickets = {}  # queue entry -> _Ticket, for enqueue()d requests
+        self._seq = itertools.count()
+        self._running = 0
+        self._avg_run = INITIAL_RUN_SECONDS
+
+    def _estimated_wait(self, rank, limit):
+        # Caller holds self._cond
+        ahead = sum(1 for r, _ in self._queue if r <= rank)
+        free = limit - self._running
+        if free > ahead:
+            return 0.0
+        # Slots free up at about limit / avg_run per second
+        return (ahead - free + 1) * self._avg_run / limit
+
+    def _rejection(self, reason, priority, wait):
+        PLAN_ADMISSION_REJECTED.inc(priority, reason)
+        retry_after = max(1, math.ceil(wait or self._avg_run))
+        print(f"--- Admission: {priority} request rejected ({reason}, retry after {retry_after}s) ---")
+        return AdmissionRejected(reason, retry_after, priority)
+
+    def _reject(self, reason, priority, wait):
+        raise self._rejection(reason, priority, wait)
+
+    def _grant(self):
+        # Caller holds self._cond. Admits enqueue()d requests at the head of
+        # the queue while slots are free; a blocked admit() at the head is
+        # left to wake up by itself.
+        limit = self.capacity()
+        while self._queue and self._queue[0] in self._tickets and self._running < limit:
+            ticket = self._tickets.pop(self._queue.pop(0))
+            self._running += 1
+            PLAN_ADMISSION_WAIT.observe(ticket.priority, value=time.monotonic() - ticket.arrived)
+            started = time.monotonic()
+            ticket.on_admit(lambda started=started: self._release(started))
+        self._cond.notify_all()
+
+    def _release(self, started):
+        with self._cond:
+            self._running -= 1
+            self._avg_run += RUN_EWMA_ALPHA * (time.monotonic() - started - self._avg_run)
+            self._grant()
+
+    def _check(self, rank, priority, limit):
+        # Caller holds self._cond
+        wait = self._estimated_wait(rank, limit)
+        if len(self._queue) >= self.max_queue:
+            self._reject("queue_full", priority, wait)
+        if wait > self.deadlines[priority]:
+            self._reject("over_budget", priority, wait)
+
+    def check(self, priority="interactive"):
+        """Raise AdmissionRejected now if a `priority` request arriving now would be."""
+        with self._cond:
+            limit = self.capacity()
+            if self._queue or self._running >= limit:
+                self._check(PRIORITIES[priority], priority, limit)
+
+    @contextmanager
+    def admit(self, priority="interactive"):
+        """Hold a pipeline slot for the block; raises AdmissionRejected instead of waiting too long."""
+        rank = PRIORITIES[priority]
+        arrived = time.monotonic()
+        deadline = arrived + self.deadlines[priority]
+        with self._cond:
+            limit = self.capacity()
+            if self._queue or self._running >= limit:
+                self._check(rank, priority, limit)
+                entry = (rank, next(self._seq))
+                bisect.insort(self._queue, entry)
+                while self._queue[0] != entry or self._running >= self.capacity():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._queue.remove(entry)
+                        self._grant()
+                        self._reject("deadline", priority, self._estimated_wait(rank, self.capacity()))
+                    self._cond.wait(min(remaining, RECHECK_SECONDS))
+                self._queue.pop(0)
+            self._running += 1
+            # The next in line may fit too if the limit grew
+            self._grant()
+        PLAN_ADMISSION_WAIT.observe(priority, value=time.monotonic() - arrived)
+
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(started)
+
+    def enqueue(self, priority, on_admit, on_reject):
+        """
+        Queue a request without blocking: on_admit(release) runs once it
+        holds a slot, and it must call release() when done; on_reject(error)
+        runs if its deadline passes first. Raises AdmissionRejected at once
+        when admit() would reject on arrival. Callbacks run under the
+        controller's lock and must not block. Returns a handle for cancel().
+        """
+        rank = PRIORITIES[priority]
+        with self._cond:
+            limit = self.capacity()
+            if self._queue or self._running >= limit:
+                self._check(rank, priority, limit)
+            entry = (rank, next(self._seq))
+            bisect.insort(self._queue, entry)
+            self._tickets[entry] = _Ticket(priority, time.monotonic() + self.deadlines[priority], on_admit, on_reject)
+            self._grant()
+            return entry
+
+    def cancel(self, handle):
+        """Drop an enqueue()d request that is still queued; True if it was."""
+        with self._cond:
+            if self._tickets.pop(handle, None) is None:
+                return False
+            self._queue.remove(handle)
+            self._grant()
+            return True
+
+    def tick(self):
+        """Reject enqueue()d requests past their deadline and admit those that now fit."""
+        now = time.monotonic()
+        with self._cond:
+            for entry, ticket in [(e, t) for e, t in self._tickets.items() if t.deadline <= now]:
+                del self._tickets[entry]
+                self._queue.remove(entry)
+                ticket.on_reject(self._rejection(
+                    "deadline", ticket.priority, self._estimated_wait(entry[0], self.capacity())))
+            self._grant()
+
+    def snapshot(self):
+        with self._cond:
+            limit = self.capacity()
+            depth = {name: sum(1 for r, _ in self._queue if r == rank) for name, rank in PRIORITIES.items()}
+            return {
+                "limit": limit,
+                "running": self._running,
+                "queued": depth,
+                "avg_run_s": round(self._avg_run, 2),
+                "estimated_wait_s": {
+                    name: round(self._estimated_wait(rank, limit), 1) for name, rank in PRIORITIES.items()
+                },
+            }
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller():
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = AdmissionController()
+        return _controller
+
+
+@contextmanager
+def admitted(priority="interactive"):
+    """Run the block under the process-wide admission controller."""
+    if ADMISSION_DISABLED:
+        yield
+        return
+    with get_admission_controller().admit(priority):
+        yield
+
+
+def _collect_admission_metrics():
+    if _controller is None:
+        return []
+    state = _controller.snapshot()
+    return [
+        ("plan_admission_queue_depth", "gauge", "Plan requests waiting for admission, by priority.",
+         [({"priority": p}, n) for p, n in state["queued"].items()]),
+        ("plan_admission_running", "gauge", "Plan pipelines currently admitted.", [({}, state["running"])]),
+        ("plan_admission_limit", "gauge", "Concurrent pipelines the live Groq keys allow.", [({}, state["limit"])]),
+        ("plan_admission_estimated_wait_seconds", "gauge", "Estimated queue wait for a new request, by priority.",
+         [({"priority": p}, w) for p, w in state["estimated_wait_s"].items()]),
+    ]
+
+
+REGISTRY.register_collector(_collect_admission_metrics)
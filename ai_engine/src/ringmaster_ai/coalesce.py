@@ -0,0 +1,110 @@
+import copy
+import os
+import threading
+
+from src.ringmaster_ai.metrics import PLAN_COALESCED, PLAN_COALESCED_LLM_CALLS_SAVED, REGISTRY, count_llm_calls
+from src.ringmaster_ai.plan_cache import exact_request
+from src.ringmaster_ai.tools.cache import cache_key
+
+PLAN_COALESCE_DISABLED = os.getenv("PLAN_COALESCE_DISABLED", "").lower() in ("1", "true", "yes")
+
+
+class SharedFlightError(Exception):
+    """The in-flight pipeline a request joined failed; `__cause__` is its error."""
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.abandoned = False
+        self.followers = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key onto one execution.
+
+    The first caller for a key runs `fn`; callers arriving while it runs
+    wait and receive a copy of its result, or a SharedFlightError if it
+    raised. A flight is forgotten as soon as it finishes, so nothing is
+    cached here (and errors are never reused). If the running caller is
+    cancelled (a BaseException such as KeyboardInterrupt or
+    CancelledError), waiters are woken and the next of them runs `fn`
+    itself instead of inheriting the cancellation.
+    """
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """(result, shared): shared is True when another caller's run produced it."""
+        while True:
+            with self._lock:
+                flight = self._flights.get(key)
+                if flight is None:
+                    flight = self._flights[key] = _Flight()
+                    leader = True
+                else:
+                    flight.followers += 1
+                    leader = False
+            if leader:
+                return self._lead(key, flight, fn), False
+            flight.done.wait()
+            if flight.abandoned:
+                continue
+            if flight.error is not None:
+                PLAN_COALESCED.inc("failed")
+                raise SharedFlightError(str(flight.error)) from flight.error
+            PLAN_COALESCED.inc("completed")
+            # Callers post-process and serialise plans; each gets its own
+            return copy.deepcopy(flight.result), True
+
+    def _lead(self, key, flight, fn):
+        tally = None
+        try:
+            with count_llm_calls() as tally:
+                flight.result = fn()
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        except BaseException:
+            flight.abandoned = True
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+                followers = flight.followers
+            if followers and not flight.abandoned:
+                PLAN_COALESCED_LLM_CALLS_SAVED.inc(amount=tally.calls * followers)
+            flight.done.set()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._flights)
+
+
+def plan_key(inputs):
+    """Requests with the same key would run identical pipelines."""
+    return cache_key(exact_request(inputs))
+
+
+_plan_flights = SingleFlight()
+
+
+def plan_once(inputs, run):
+    """run(inputs), shared with any identical request already in flight; returns (result, shared)."""
+    if PLAN_COALESCE_DISABLED:
+        return run(inputs), False
+    return _plan_flights.do(plan_key(inputs), lambda: run(inputs))
+
+
+def _collect_coalesce_metrics():
+    samples = [({}, _plan_flights.in_flight())]
+    return [("plan_coalesce_in_flight", "gauge", "Distinct /plan-trip pipelines currently running.", samples)]
+
+
+REGISTRY.register_collector(_collect_coalesce_metrics)
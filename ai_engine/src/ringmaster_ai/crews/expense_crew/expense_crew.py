@@ -1,6 +1,8 @@
 from crewai import Agent, Crew, Process, Task
 from crewai.project import CrewBase, agent, crew, task
 
+from src.ringmaster_ai.crews.trip_crew.registry import get_trip_registry
+
 @CrewBase
 class ExpenseCrew():
     """ExpenseCrew crew"""
@@ -11,6 +13,7 @@ class ExpenseCrew():
     def accountant(self) -> Agent:
         return Agent(
             config=self.agents_config['accountant'],
+            llm=get_trip_registry().llm(),
             verbose=True
         )
 
@@ -0,0 +1,104 @@
+import contextvars
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from crewai import Crew, Process
+
+# Upper bound on tasks of one graph running at the same time.
+MAX_PARALLEL_TASKS = int(os.getenv("TASK_GRAPH_WORKERS", "4"))
+
+
+class TaskGraphOutput:
+    """Crew-like result: `raw` is the last task's output, as with Process.sequential."""
+
+    def __init__(self, tasks_output):
+        self.tasks_output = tasks_output
+        self.raw = tasks_output[-1].raw if tasks_output else ""
+
+    def __str__(self):
+        return self.raw
+
+
+class TaskGraph:
+    """
+    Runs a crew's tasks as a DAG built from their declared `context` edges.
+
+    A task starts as soon as every task in its context has finished, in a
+    one-task Crew of its own, so independent chains overlap instead of
+    queueing behind each other. Tasks without a context list depend on
+    nothing. Outputs are returned in the crew's original task order.
+    """
+
+    def __init__(self, tasks, verbose=True, max_workers=MAX_PARALLEL_TASKS, crew_kwargs=None):
+        self.tasks = list(tasks)
+        self.verbose = verbose
+        self.max_workers = max_workers
+        self.crew_kwargs = crew_kwargs or {}
+        index = {id(task): i for i, task in enumerate(self.tasks)}
+        self.deps = []
+        for task in self.tasks:
+            context = task.context if isinstance(task.context, list) else []
+            self.deps.append({index[id(t)] for t in context if id(t) in index})
+
+    @classmethod
+    def from_crew(cls, crew, **kwargs):
+        crew_kwargs = {"memory": crew.memory, "planning": crew.planning}
+        return cls(crew.tasks, verbose=crew.verbose, crew_kwargs=crew_kwargs, **kwargs)
+
+    def critical_path(self):
+        """Length (in tasks) of the longest dependency chain."""
+        depth = []
+        for i in range(len(self.tasks)):
+            depth.append(1 + max((depth[d] for d in self.deps[i]), default=0))
+        return max(depth, default=0)
+
+    def kickoff(self, inputs=None, task_inputs=None):
+        """
+        Run every task; `task_inputs` (aligned with the tasks, entries may be
+        None) adds per-task inputs on top of `inputs`, so one graph can hold
+        several copies of a task template, each filled in differently.
+        """
+        inputs = inputs or {}
+        per_task = [dict(inputs, **extra) if extra else inputs for extra in (task_inputs or [None] * len(self.tasks))]
+        outputs = [None] * len(self.tasks)
+        remaining = [set(d) for d in self.deps]
+        started = set()
+        print(f"--- Task graph: {len(self.tasks)} tasks, critical path {self.critical_path()} ---")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="task-graph") as pool:
+            running = {}
+
+            def submit_ready():
+                for i, deps in enumerate(remaining):
+                    if i not in started and not deps:
+                        started.add(i)
+                        # Carry the caller's context vars into the worker thread
+                        ctx = contextvars.copy_context()
+                        running[pool.submit(ctx.run, self._run_task, self.tasks[i], per_task[i])] = i
+
+            submit_ready()
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i = running.pop(future)
+                    try:
+                        outputs[i] = future.result()
+                    except Exception:
+                        for other in running:
+                            other.cancel()
+                        raise
+                    for deps in remaining:
+                        deps.discard(i)
+                submit_ready()
+
+        return TaskGraphOutput(outputs)
+
+    def _run_task(self, task, inputs):
+        crew = Crew(
+            agents=[task.agent],
+            tasks=[task],
+            process=Process.sequential,
+            verbose=self.verbose,
+            **self.crew_kwargs
+        )
+        return crew.kickoff(inputs=inputs).tasks_output[0]
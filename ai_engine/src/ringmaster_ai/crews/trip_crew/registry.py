@@ -0,0 +1,123 @@
+import copy
+import os
+import threading
+
+import yaml
+
+from src.ringmaster_ai.key_scheduler import get_key_scheduler
+from src.ringmaster_ai.model_router import TIERS, RoutedLLM
+from src.ringmaster_ai.scheduled_llm import ScheduledLLM
+
+CONFIG_DIR = os.path.join(os.path.dirname(__file__), "config")
+DEFAULT_MODEL = os.getenv("TRIP_CREW_MODEL", "groq/llama-3.3-70b-versatile")
+SMALL_MODEL = os.getenv("TRIP_CREW_SMALL_MODEL", "groq/llama-3.1-8b-instant")
+# Model per routing tier; agents pick a tier in agents.yaml (`tier`, `task_tiers`).
+MODEL_TIERS = {"small": SMALL_MODEL, "large": DEFAULT_MODEL}
+
+REQUIRED_AGENT_FIELDS = ("role", "goal", "backstory")
+REQUIRED_TASK_FIELDS = ("description", "expected_output", "agent")
+
+
+def _load_yaml(path):
+    with open(path, "r", encoding="utf-8") as f:
+        content = yaml.safe_load(f)
+    return content if isinstance(content, dict) else {}
+
+
+def validate_configs(agents_config, tasks_config):
+    """Raise ValueError listing every broken agent/task definition."""
+    problems = []
+    for name, spec in agents_config.items():
+        spec = spec or {}
+        missing = [f for f in REQUIRED_AGENT_FIELDS if not spec.get(f)]
+        if missing:
+            problems.append(f"agent '{name}' is missing {', '.join(missing)}")
+        if spec.get("tier", "large") not in TIERS:
+            problems.append(f"agent '{name}' has unknown tier '{spec['tier']}'")
+        for task_name, tier in (spec.get("task_tiers") or {}).items():
+            if task_name not in tasks_config:
+                problems.append(f"agent '{name}' routes unknown task '{task_name}'")
+            if tier not in TIERS:
+                problems.append(f"agent '{name}' has unknown tier '{tier}' for '{task_name}'")
+    for name, spec in tasks_config.items():
+        spec = spec or {}
+        missing = [f for f in REQUIRED_TASK_FIELDS if not spec.get(f)]
+        if missing:
+            problems.append(f"task '{name}' is missing {', '.join(missing)}")
+        if spec.get("agent") and spec["agent"] not in agents_config:
+            problems.append(f"task '{name}' uses unknown agent '{spec['agent']}'")
+        for dep in spec.get("context") or []:
+            if dep not in tasks_config:
+                problems.append(f"task '{name}' has unknown context task '{dep}'")
+    if problems:
+        raise ValueError("Invalid TripCrew config: " + "; ".join(problems))
+
+
+class TripCrewRegistry:
+    """
+    Process-wide artifacts every TripCrew instance would otherwise rebuild.
+
+    The YAML configs are parsed and validated once and handed out as deep
+    copies (crewai rewrites them in place while wiring agents and tasks).
+    LLM clients are pooled per model and per agent route: ScheduledLLM leases
+    a key per call, so one client safely serves the agents of every
+    concurrent request. Agents and Tasks stay per request since they carry
+    execution state.
+    """
+
+    def __init__(self, config_dir=CONFIG_DIR):
+        self.config_dir = config_dir
+        self.agents_config = _load_yaml(os.path.join(config_dir, "agents.yaml"))
+        self.tasks_config = _load_yaml(os.path.join(config_dir, "tasks.yaml"))
+        validate_configs(self.agents_config, self.tasks_config)
+        self._llms = {}
+        self._agent_llms = {}
+        self._lock = threading.Lock()
+
+        if not os.getenv("OPENAI_API_KEY"):
+            os.environ["OPENAI_API_KEY"] = "NA"
+            print("Set dummy OPENAI_API_KEY to bypass validation.")
+        print(f"Loaded Groq Keys: {len(get_key_scheduler())}")
+
+    def configs(self):
+        """Fresh (agents_config, tasks_config) copies for one crew instance."""
+        return copy.deepcopy(self.agents_config), copy.deepcopy(self.tasks_config)
+
+    def llm(self, model=DEFAULT_MODEL):
+        with self._lock:
+            client = self._llms.get(model)
+            if client is None:
+                client = self._llms[model] = ScheduledLLM(model=model)
+            return client
+
+    def agent_llm(self, agent):
+        """Client for `agent`, routed per task to the tiers its agents.yaml entry names."""
+        spec = self.agents_config.get(agent) or {}
+        with self._lock:
+            client = self._agent_llms.get(agent)
+            if client is None:
+                client = self._agent_llms[agent] = RoutedLLM(
+                    model=DEFAULT_MODEL,
+                    tier_models=MODEL_TIERS,
+                    tier=spec.get("tier", "large"),
+                    task_tiers=spec.get("task_tiers") or {},
+                )
+            return client
+
+    def warm(self):
+        """Create every agent's client up front so the first request does not pay for it."""
+        for agent in self.agents_config:
+            self.agent_llm(agent)
+        return self
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_trip_registry():
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = TripCrewRegistry()
+        return _registry
@@ -1,35 +1,10 @@
-from crewai import Agent, Crew, Process, Task, LLM
-from langchain_groq import ChatGroq
+from crewai import Agent, Crew, Process, Task
 from crewai.project import CrewBase, agent, crew, task
-import os
-import itertools
 
+from src.ringmaster_ai.crews.task_graph import MAX_PARALLEL_TASKS, TaskGraph
+from src.ringmaster_ai.crews.trip_crew.registry import get_trip_registry
+from src.ringmaster_ai.key_scheduler import get_key_scheduler
 
-class GroqRoundRobinManager:
-    def __init__(self):
-        self.keys = []
-        # Check standard GROQ_API_KEY
-        if os.getenv("GROQ_API_KEY"):
-            self.keys.append(os.getenv("GROQ_API_KEY"))
-        
-        # Check GROQ_1 through GROQ_20 (and GROQ_KEY_x for backward compatibility)
-        for i in range(1, 21):
-            key = os.getenv(f"GROQ_{i}") or os.getenv(f"GROQ_KEY_{i}")
-            if key:
-                self.keys.append(key)
-        
-        if not self.keys:
-            print("WARNING: No Groq API keys found in environment variables!")
-            # Fallback to empty string to avoid immediate crash, though calls will fail
-            self.keys.append("")
-        
-        self.key_cycle = itertools.cycle(self.keys)
-
-    def get_next_key(self):
-        return next(self.key_cycle)
-
-# Global Manager Instance to persist across multiple requests
-_global_key_manager = GroqRoundRobinManager()
 
 @CrewBase
 class TripCrew():
@@ -38,108 +13,20 @@ class TripCrew():
     tasks_config = 'config/tasks.yaml'
     
     def __init__(self):
-        # Load keys into a dict for easy access by index {1: "k1", 2: "k2"...}
-        self.keys_dict = {}
-        for i in range(1, 21):
-            val = os.getenv(f"GROQ_{i}") or os.getenv(f"GROQ_API_KEY_{i}") or os.getenv(f"GROQ_KEY_{i}")
-            if val:
-                self.keys_dict[i] = val
-        
-        # Helper to get key with specific fallback logic: Preferred -> Backup (4-9) -> Any
-        def get_agent_key(preferred_index):
-            # Dynamic Load Balancing: Randomly select a key to distribute load
-            import random
-            if self.keys_dict:
-                return random.choice(list(self.keys_dict.values()))
-            
-            # Fallback
-            return os.getenv("GROQ_API_KEY", "")
-
-        if not os.getenv("OPENAI_API_KEY"):
-            os.environ["OPENAI_API_KEY"] = "NA"
-            print("Set dummy OPENAI_API_KEY to bypass validation.")
-
-        print(f"Loaded Groq Keys: {list(self.keys_dict.keys())} (Count: {len(self.keys_dict)})")
-
-        if not self.keys_dict:
-             print("CRITICAL WARNING: No Groq keys loaded!")
-
-        # Assign unique keys using Global Round Robin Manager
-        key_route = _global_key_manager.get_next_key()
-        key_hotel = _global_key_manager.get_next_key()
-        key_flight = _global_key_manager.get_next_key()
-        key_guide = _global_key_manager.get_next_key()
-        key_budget = _global_key_manager.get_next_key()
-        
-        # Route Planner LLM (Switching to Mixtral for better limits)
-        self.llm_route_planner = LLM(
-            model="groq/llama-3.3-70b-versatile",
-            api_key=key_route
-        )
-        
-        # Hotel Scout LLM
-        self.llm_hotel_scout = LLM(
-            model="groq/llama-3.3-70b-versatile",
-            api_key=key_hotel
-        )
-
-        # Flight Expert LLM
-        self.llm_flight_expert = LLM(
-            model="groq/llama-3.3-70b-versatile",
-            api_key=key_flight
-        )
-
-        # Local Guide LLM
-        self.llm_local_guide = LLM(
-            model="groq/llama-3.3-70b-versatile",
-            api_key=key_guide
-        )
-        
-        # Budget Guardian LLM
-        self.llm_budget_guardian = LLM(
-            model="groq/llama-3.3-70b-versatile",
-            api_key=key_budget
-        )
-        
-        # Additional Agents (Switching to Mixtral)
-        self.llm_local_guide_8b = LLM(
-            model="groq/llama-3.3-70b-versatile",
-            api_key=_global_key_manager.get_next_key()
-        )
-        self.llm_hotel_scout_8b = LLM(
-            model="groq/llama-3.3-70b-versatile",
-            api_key=_global_key_manager.get_next_key()
-        )
-        self.llm_flight_expert_8b = LLM(
-            model="groq/llama-3.3-70b-versatile",
-            api_key=_global_key_manager.get_next_key()
-        )
-        self.llm_travel_coordinator_8b = LLM(
-            model="groq/llama-3.3-70b-versatile",
-            api_key=_global_key_manager.get_next_key()
-        )
-        
-        # Manually load configs if they are still strings (Fix for CrewBase issue)
-        import yaml
-        if isinstance(self.agents_config, str):
-            config_path = os.path.join(os.path.dirname(__file__), self.agents_config)
-            with open(config_path, 'r') as f:
-                self.agents_config = yaml.safe_load(f)
-                
-        if isinstance(self.tasks_config, str):
-            config_path = os.path.join(os.path.dirname(__file__), self.tasks_config)
-            with open(config_path, 'r') as f:
-                self.tasks_config = yaml.safe_load(f)
-
-        # Travel Coordinator LLM
-        # Already initialized above as self.llm_travel_coordinator_8b
-        pass
-
-        # Itinerary Specialist LLM
-        self.llm_itinerary_specialist = LLM(
-             model="groq/llama-3.3-70b-versatile",
-             api_key=_global_key_manager.get_next_key()
-        )
+        # Configs and LLM clients come from the process-wide registry; only the
+        # Agents and Tasks built from them belong to this instance.
+        registry = get_trip_registry()
+
+        # No key is pinned here: each ScheduledLLM leases the key with the most
+        # RPM/TPM headroom from the global scheduler on every call, and the
+        # model tier is picked per task from agents.yaml (see model_router).
+        self.llm_route_planner = registry.agent_llm("route_planner")
+        self.llm_hotel_scout = registry.agent_llm("hotel_scout")
+        self.llm_flight_expert = registry.agent_llm("flight_expert")
+        self.llm_local_guide = registry.agent_llm("local_guide")
+        self.llm_budget_guardian = registry.agent_llm("budget_guardian")
+        self.llm_travel_coordinator = registry.agent_llm("travel_coordinator_agent")
+        self.llm_itinerary_specialist = registry.agent_llm("itinerary_specialist_agent")
 
     @agent
     def route_planner(self) -> Agent:
@@ -147,8 +34,7 @@ class TripCrew():
             config=self.agents_config['route_planner'],
             verbose=True,
             allow_delegation=False,
-            llm=self.llm_route_planner,
-            max_rpm=1 # Heavy task, strict limit
+            llm=self.llm_route_planner
         )
 
     @agent
@@ -158,8 +44,7 @@ class TripCrew():
             verbose=True,
             allow_delegation=False,
             # Tools disabled for stability with Groq
-            llm=self.llm_local_guide_8b, # Unique 8b instance
-            max_rpm=2
+            llm=self.llm_local_guide
         )
 
     @agent
@@ -168,8 +53,7 @@ class TripCrew():
             config=self.agents_config['hotel_scout'],
             verbose=True,
             allow_delegation=False,
-            llm=self.llm_hotel_scout_8b, # Unique 8b instance
-            max_rpm=2
+            llm=self.llm_hotel_scout
         )
 
     @agent
@@ -178,8 +62,7 @@ class TripCrew():
             config=self.agents_config['flight_expert'],
             verbose=True,
             allow_delegation=False,
-            llm=self.llm_flight_expert_8b, # Unique 8b instance
-            max_rpm=2
+            llm=self.llm_flight_expert
         )
 
     @agent
@@ -189,8 +72,7 @@ class TripCrew():
             verbose=True,
             allow_delegation=False,
             # Tools disabled for stability with Groq
-            llm=self.llm_budget_guardian,
-            max_rpm=2
+            llm=self.llm_budget_guardian
         )
 
     @agent
@@ -199,8 +81,7 @@ class TripCrew():
             config=self.agents_config['travel_coordinator_agent'],
             verbose=True,
             allow_delegation=False,
-            llm=self.llm_travel_coordinator_8b, # Unique 8b instance
-            max_rpm=2
+            llm=self.llm_travel_coordinator
         )
 
     @agent
@@ -209,8 +90,7 @@ class TripCrew():
             config=self.agents_config['itinerary_specialist_agent'],
             verbose=True,
             allow_delegation=False,
-            llm=self.llm_itinerary_specialist,
-            max_rpm=1 # Heavy task, strict limit
+            llm=self.llm_itinerary_specialist
         )
 
     @task
@@ -239,16 +119,25 @@ class TripCrew():
             context=[self.plan_multi_city_itinerary_task()]
         )
 
+    @task
+    def city_days_task(self) -> Task:
+        return Task(
+            config=self.tasks_config['city_days_task'],
+            context=[] # One window of days from its own inputs; see logistics_windows_graph
+        )
+
     @task
     def hotel_task(self) -> Task:
         return Task(
-            config=self.tasks_config['hotel_task']
+            config=self.tasks_config['hotel_task'],
+            context=[] # Request inputs only, so it can run alongside the route chain
         )
 
     @task
     def flight_task(self) -> Task:
         return Task(
-            config=self.tasks_config['flight_task']
+            config=self.tasks_config['flight_task'],
+            context=[] # Request inputs only, so it can run alongside the route chain
         )
 
     @task
@@ -292,6 +181,23 @@ class TripCrew():
             planning=False
         )
 
+    def logistics_graph(self) -> TaskGraph:
+        # Same tasks as logistics_crew, scheduled by their context edges:
+        # route -> itinerary -> enrichment runs alongside hotels and flights
+        return TaskGraph.from_crew(self.logistics_crew())
+
+    def logistics_windows_graph(self, windows, with_shared_tasks=True) -> TaskGraph:
+        # Chunked plans: one city_days_task per day window (plus hotels and
+        # flights on the first pass), all independent. Each window's task
+        # comes from its own TripCrew so no Task object is shared between
+        # threads; ScheduledLLM leases a key per call, so concurrent windows
+        # spread over the Groq keys and wait only when none has headroom.
+        tasks = [TripCrew().city_days_task() for _ in range(windows)]
+        if with_shared_tasks:
+            tasks += [self.hotel_task(), self.flight_task()]
+        workers = min(len(tasks), max(MAX_PARALLEL_TASKS, len(get_key_scheduler())))
+        return TaskGraph(tasks, max_workers=workers, crew_kwargs={"memory": False, "planning": False})
+
     @crew
     def budget_crew(self) -> Crew:
         return Crew(
@@ -301,3 +207,12 @@ class TripCrew():
             verbose=True,
             manager_llm=self.llm_route_planner
         )
+
+
+def _load_registry_configurations(self):
+    self.agents_config, self.tasks_config = get_trip_registry().configs()
+
+
+# CrewBase injects a loader that re-parses both YAML files on every
+# instantiation; serve the registry's validated copies instead.
+TripCrew.load_configurations = _load_registry_configurations
@@ -0,0 +1,219 @@
+import os
+import re
+from datetime import timedelta
+
+from src.ringmaster_ai.feasibility import GROUND_MAX_KM, haversine_km
+from src.ringmaster_ai.gazetteer import get_gazetteer
+from src.ringmaster_ai.json_extract import JSONExtractionError, parse_json
+from src.ringmaster_ai.logistics_ir import Activity, DayPlan, LogisticsIR, RoutePlan
+from src.ringmaster_ai.tools.weather import parse_trip_date
+
+PLAN_FANOUT_DISABLED = os.getenv("PLAN_FANOUT_DISABLED", "").lower() in ("1", "true", "yes")
+# Trips with at least this many cities are planned in per-city day windows.
+FANOUT_MIN_CITIES = int(os.getenv("PLAN_FANOUT_MIN_CITIES", "2"))
+# Longer trips are chunked even with a single city.
+CHUNK_MIN_DAYS = int(os.getenv("PLAN_CHUNK_MIN_DAYS", "6"))
+# Most days one sub-crew writes in a single output.
+DAY_WINDOW = int(os.getenv("PLAN_DAY_WINDOW", "4"))
+# Known sights of a city suggested to each of its windows, so windows do not repeat each other.
+FOCUS_PER_WINDOW = 3
+# Door-to-door speeds for the transit-day estimate (km/h), flights include airport time.
+GROUND_KMH, FLIGHT_KMH, FLIGHT_OVERHEAD_H = 55, 700, 3
+TRANSIT_TIME = "08:00 AM"
+
+
+def allocate_days(order, days):
+    """
+    Days per city in visiting order: an even split, the remainder going to
+    the earliest cities. None if there are fewer days than cities.
+    """
+    if not order or days < len(order):
+        return None
+    base, extra = divmod(days, len(order))
+    return [base + (1 if i < extra else 0) for i in range(len(order))]
+
+
+def transit(from_city, to_city):
+    """(mode, km, hours) between two cities; km and hours are None for unknown places."""
+    gazetteer = get_gazetteer()
+    a, b = gazetteer.lookup(from_city, kind="city"), gazetteer.lookup(to_city, kind="city")
+    if a is None or b is None:
+        return "Train or flight", None, None
+    km = haversine_km(a[0]["lat"], a[0]["lon"], b[0]["lat"], b[0]["lon"])
+    if km <= GROUND_MAX_KM:
+        return "Train or road", round(km), max(1, round(km / GROUND_KMH))
+    return "Flight", round(km), round(FLIGHT_OVERHEAD_H + km / FLIGHT_KMH)
+
+
+def _city_sights(city):
+    found = get_gazetteer().lookup(city, kind="city")
+    if found is None:
+        return []
+    return [p["name"] for p in get_gazetteer().places if p["kind"] == "poi" and p["city"] == found[0]["name"]]
+
+
+def plan_windows(route, inputs):
+    """
+    Day windows to generate independently, in trip order, or None when the
+    trip is planned in one pass (disabled, a single short city, or fewer
+    days than cities).
+
+    The days are split over the cities in route order, and each city's
+    share into windows of at most DAY_WINDOW days. A window carries its
+    global day range, start date, the city it is reached from (first window
+    of a city only) and a few of the city's known sights to focus on, so
+    windows in the same city do not repeat each other.
+    """
+    order = route.get("order") or []
+    match = re.search(r"\d+", str(inputs.get("days", "")))
+    if PLAN_FANOUT_DISABLED or not order or not match:
+        return None
+    total = int(match.group())
+    if len(order) < FANOUT_MIN_CITIES and total <= CHUNK_MIN_DAYS:
+        return None
+    split = allocate_days(order, total)
+    if split is None:
+        return None
+
+    start = parse_trip_date(inputs.get("current_date"))
+    windows, first = [], 1
+    for i, (city, days) in enumerate(zip(order, split)):
+        count = -(-days // DAY_WINDOW)
+        sizes = allocate_days(list(range(count)), days)
+        sights = _city_sights(city)
+        for w, size in enumerate(sizes):
+            windows.append({
+                "city": city,
+                "days": size,
+                "first_day": first,
+                "last_day": first + size - 1,
+                "start_date": (start + timedelta(days=first - 1)).isoformat(),
+                "from_city": order[i - 1] if i and w == 0 else None,
+                "focus": sights[w::count][:FOCUS_PER_WINDOW],
+                "shares_city": count > 1,
+            })
+            first += size
+    return windows
+
+
+def window_inputs(window, weather, previous_place=None):
+    """Per-task inputs for one city_days_task: the window plus its small shared context."""
+    if window["from_city"]:
+        mode, km, hours = transit(window["from_city"], window["city"])
+        trip = f"{mode.lower()}, about {hours}h" if hours else mode.lower()
+        lead_in = (f"Day {window['first_day']} starts with travel from {window['from_city']} ({trip}); "
+                   f"keep that day light and start after arrival.")
+    elif window["first_day"] > 1:
+        lead_in = f"Day {window['first_day'] - 1} ends at {previous_place or window['city']}; continue from there."
+    else:
+        lead_in = f"Day 1 is the first day of the trip in {window['city']}."
+    if window["focus"]:
+        lead_in += f" Make room for: {', '.join(window['focus'])}."
+    if window["shares_city"]:
+        lead_in += f" Other days cover the rest of {window['city']}; do not repeat their sights."
+    return {
+        "city": window["city"],
+        "city_days": str(window["days"]),
+        "first_day": str(window["first_day"]),
+        "last_day": str(window["last_day"]),
+        "lead_in": lead_in,
+        "city_weather": weather,
+    }
+
+
+def _transit_activity(from_city, to_city):
+    mode, km, hours = transit(from_city, to_city)
+    description = f"{mode}, about {km} km (~{hours}h)." if km is not None else f"{mode}."
+    return mode, Activity(time=TRANSIT_TIME, name=f"Travel from {from_city} to {to_city}",
+                          place=to_city, description=description)
+
+
+def collect_days(windows, raws, planned=None):
+    """
+    Add each window's parsed days to `planned` ({day number: DayPlan}) and return it.
+
+    Days are matched by global day number, or renumbered when the model
+    counted from 1; days outside the window and unparseable outputs are
+    dropped (their days show up in missing_days()).
+    """
+    planned = {} if planned is None else planned
+    for window, raw in zip(windows, raws):
+        wanted = range(window["first_day"], window["last_day"] + 1)
+        try:
+            days = [DayPlan.model_validate(d) for d in parse_json(raw)["days"]]
+        except (JSONExtractionError, ValueError, KeyError, TypeError) as e:
+            print(f"Chunked plan: could not parse days {wanted.start}-{wanted.stop - 1} "
+                  f"in {window['city']} ({type(e).__name__}).")
+            continue
+        if days and not any(d.day in wanted for d in days):
+            for offset, day in enumerate(sorted(days, key=lambda d: d.day)):
+                day.day = window["first_day"] + offset
+        for day in days:
+            if day.day in wanted and day.activities:
+                planned.setdefault(day.day, day)
+    return planned
+
+
+def missing_days(windows, planned):
+    return [n for w in windows for n in range(w["first_day"], w["last_day"] + 1) if n not in planned]
+
+
+def _ending_place(day):
+    for activity in reversed(day.activities if day else []):
+        if activity.place or activity.name:
+            return activity.place or activity.name
+    return None
+
+
+def repair_windows(windows, missing, planned):
+    """
+    Windows covering only the `missing` days (contiguous runs within one
+    window), each told where the day before actually ended.
+    """
+    missing = set(missing)
+    repairs = []
+    for window in windows:
+        run = None
+        for n in range(window["first_day"], window["last_day"] + 1):
+            if n not in missing:
+                run = None
+                continue
+            if run is None:
+                run = dict(window, first_day=n, last_day=n, days=1,
+                           from_city=window["from_city"] if n == window["first_day"] else None)
+                repairs.append(run)
+            else:
+                run["last_day"], run["days"] = n, run["days"] + 1
+    for repair in repairs:
+        repair["previous_place"] = _ending_place(planned.get(repair["first_day"] - 1))
+    return repairs
+
+
+def assemble_days(windows, planned):
+    """
+    One DayPlan per trip day in order, with transit stitched in: the first
+    day in every city after the first opens with the travel leg from the
+    previous one. Days still missing become an empty day in their city.
+    """
+    days = []
+    for window in windows:
+        for number in range(window["first_day"], window["last_day"] + 1):
+            day = planned.get(number) or DayPlan(day=number, theme=f"Explore {window['city']}")
+            day.city = window["city"]
+            if number == window["first_day"] and window["from_city"]:
+                mode, travel = _transit_activity(window["from_city"], window["city"])
+                day.transport = f"{mode} from {window['from_city']}"
+                day.activities = [travel] + [a for a in day.activities if a.name != travel.name]
+            days.append(day)
+    return days
+
+
+def chunked_ir(route, windows, planned, shared_outputs):
+    """LogisticsIR from the assembled windows plus the hotel and flight task outputs."""
+    ir = LogisticsIR.from_tasks_output(shared_outputs)
+    ir.days = assemble_days(windows, planned)
+    nights = {}
+    for window in windows:
+        nights[window["city"]] = nights.get(window["city"], 0) + window["days"]
+    ir.route = RoutePlan(order=list(nights), nights=nights, rationale=route.get("text"))
+    return ir
@@ -0,0 +1,122 @@
+import json
+import math
+import os
+import re
+
+from src.ringmaster_ai.plan_cache import normalize_place, parse_amount, split_destinations
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+# Same rule the feasibility_check task gives the LLM.
+MIN_DAILY_SPEND = 500
+# "Be lenient. If it's close, mark as FEASIBLE": accept up to 10% below the floor.
+LENIENCY = 0.9
+# Below this distance a train/bus is assumed, above it a flight (one-way INR).
+GROUND_MAX_KM = 800
+GROUND_BASE, GROUND_PER_KM = 300, 1.5
+FLIGHT_BASE, FLIGHT_PER_KM = 2000, 3.5
+# Budgets in another currency are left to the LLM crew.
+_FOREIGN_CURRENCY = re.compile(r"\$|€|£|usd|eur|gbp|dollar|euro|pound", re.IGNORECASE)
+
+
+def _load_tables():
+    with open(os.path.join(DATA_DIR, "cities.json"), encoding="utf-8") as f:
+        cities = json.load(f)["cities"]
+    with open(os.path.join(DATA_DIR, "fares.json"), encoding="utf-8") as f:
+        fare_rows = json.load(f)["fares"]
+    by_name = {}
+    for city in cities:
+        for name in [city["name"]] + city.get("aliases", []):
+            by_name[normalize_place(name)] = city
+    fares = {}
+    for a, b, fare in fare_rows:
+        fares[frozenset((normalize_place(a), normalize_place(b)))] = fare
+    return by_name, fares
+
+
+CITIES, FARES = _load_tables()
+
+
+def resolve_city(name):
+    """Bundled city record for a name or alias ('Bombay' -> Mumbai), else None."""
+    return CITIES.get(normalize_place(name))
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 6371.0 * 2 * math.asin(math.sqrt(a))
+
+
+def leg_fare(a, b):
+    """Estimated round-trip fare per person between two resolved cities."""
+    if a is b:
+        return 0
+    fare = FARES.get(frozenset((normalize_place(a["name"]), normalize_place(b["name"]))))
+    if fare is not None:
+        return fare
+    km = haversine_km(a["lat"], a["lon"], b["lat"], b["lon"])
+    if km <= GROUND_MAX_KM:
+        one_way = GROUND_BASE + km * GROUND_PER_KM
+    else:
+        one_way = FLIGHT_BASE + km * FLIGHT_PER_KM
+    return round(one_way * 2)
+
+
+def estimate_travel_cost(origin, destinations):
+    """
+    Per-person travel cost for origin -> each city in order -> origin.
+
+    Each leg costs half its round-trip fare. Returns None if any place is
+    not in the bundled table.
+    """
+    stops = [resolve_city(origin)] + [resolve_city(d) for d in destinations] + [resolve_city(origin)]
+    if not destinations or any(s is None for s in stops):
+        return None
+    return round(sum(leg_fare(a, b) / 2 for a, b in zip(stops, stops[1:])))
+
+
+def _round_up(amount, step=500):
+    return int(math.ceil(amount / step) * step)
+
+
+def evaluate_feasibility(inputs):
+    """
+    Local version of the feasibility_check task, in the same JSON shape.
+
+    Returns None when the trip cannot be judged locally (unknown place,
+    non-INR budget, unparseable numbers); the caller then runs the LLM crew.
+    """
+    if _FOREIGN_CURRENCY.search(str(inputs.get("budget", ""))):
+        return None
+    budget = parse_amount(inputs.get("budget"))
+    try:
+        days = max(1, int(str(inputs.get("days")).strip()))
+        travelers = max(1, int(str(inputs.get("travelers", 1)).strip()))
+    except ValueError:
+        return None
+    travel_cost = estimate_travel_cost(inputs.get("origin", ""), split_destinations(inputs.get("destination", "")))
+    if budget is None or travel_cost is None:
+        return None
+
+    remaining = budget - travel_cost * travelers
+    daily = remaining / (days * travelers)
+    minimum = _round_up(travel_cost * travelers + MIN_DAILY_SPEND * days * travelers)
+    is_feasible = daily >= MIN_DAILY_SPEND * LENIENCY
+
+    if is_feasible:
+        reason = f"Daily spend of {daily:,.0f} INR per person covers the {MIN_DAILY_SPEND} INR minimum."
+        message = f"Good news! Your budget works out to about {daily:,.0f} INR per person per day after travel."
+    else:
+        reason = f"Only {max(daily, 0):,.0f} INR per person per day remains after travel costs."
+        message = f"Your budget is extremely low. Minimum Budget Allowed: {minimum}"
+
+    return {
+        "is_feasible": is_feasible,
+        "reason": reason,
+        "estimated_travel_cost": travel_cost,
+        "daily_spend_per_person": round(daily),
+        "message": message,
+        "minimum_suggested_budget": minimum,
+        "source": "local",
+    }
@@ -0,0 +1,393 @@
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+
+from src.ringmaster_ai.feasibility import DATA_DIR, haversine_km
+from src.ringmaster_ai.plan_cache import normalize_place, split_destinations
+
+EARTH_RADIUS_KM = 6371.0
+# Hotels and activities are expected this close to one of the trip's cities.
+TRIP_RADIUS_KM = float(os.getenv("GAZETTEER_TRIP_RADIUS_KM", "150"))
+# Trigram similarity (0..1) a misspelt name needs to count as a match.
+FUZZY_MIN_SCORE = 0.7
+# LLM coordinates this close to the gazetteer's are left untouched.
+AGREE_KM = 2.0
+# Longest place name, in words, looked for inside a longer text.
+MAX_NAME_WORDS = 6
+
+
+def _unit_vector(lat, lon):
+    lat, lon = math.radians(lat), math.radians(lon)
+    return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+
+
+def _chord(km):
+    return 2 * math.sin(min(km / EARTH_RADIUS_KM, math.pi) / 2)
+
+
+def _arc_km(chord):
+    return 2 * EARTH_RADIUS_KM * math.asin(min(chord / 2, 1.0))
+
+
+class KDTree:
+    """
+    Static 3-d tree over (lat, lon) points.
+
+    Points are stored as unit vectors, so straight-line (chord) distance
+    orders neighbours exactly like great-circle distance and nothing special
+    is needed at the poles or the antimeridian. Results are (km, index) pairs
+    into the list the tree was built from.
+    """
+
+    def __init__(self, coords):
+        self.points = [_unit_vector(lat, lon) for lat, lon in coords]
+        # [point index, split axis, left node, right node]; -1 for no child
+        self._nodes = []
+        self._root = self._build(list(range(len(self.points))), 0)
+
+    def __len__(self):
+        return len(self.points)
+
+    def _build(self, indices, depth):
+        if not indices:
+            return -1
+        axis = depth % 3
+        indices.sort(key=lambda i: self.points[i][axis])
+        mid = len(indices) // 2
+        node = len(self._nodes)
+        self._nodes.append([indices[mid], axis, -1, -1])
+        self._nodes[node][2] = self._build(indices[:mid], depth + 1)
+        self._nodes[node][3] = self._build(indices[mid + 1:], depth + 1)
+        return node
+
+    def _dist2(self, a, b):
+        return (a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2 + (a[2] - b[2]) ** 2
+
+    def nearest(self, lat, lon, k=1, accept=None):
+        """Up to k closest points, nearest first; `accept(index)` can exclude points."""
+        target = _unit_vector(lat, lon)
+        best = []  # max-heap of (-dist2, index)
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node < 0:
+                continue
+            index, axis, left, right = self._nodes[node]
+            if accept is None or accept(index):
+                d2 = self._dist2(target, self.points[index])
+                if len(best) < k:
+                    heapq.heappush(best, (-d2, index))
+                elif d2 < -best[0][0]:
+                    heapq.heapreplace(best, (-d2, index))
+            delta = target[axis] - self.points[index][axis]
+            near, far = (left, right) if delta < 0 else (right, left)
+            # Visit the far side only if the splitting plane is closer than the current kth best
+            if len(best) < k or delta * delta < -best[0][0]:
+                stack.append(far)
+            stack.append(near)
+        return [(_arc_km(math.sqrt(-d2)), index) for d2, index in sorted(best, reverse=True)]
+
+    def within(self, lat, lon, km):
+        """Every point at most `km` away, nearest first."""
+        target = _unit_vector(lat, lon)
+        limit2 = _chord(km) ** 2
+        found = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node < 0:
+                continue
+            index, axis, left, right = self._nodes[node]
+            d2 = self._dist2(target, self.points[index])
+            if d2 <= limit2:
+                found.append((d2, index))
+            delta = target[axis] - self.points[index][axis]
+            if delta <= 0 or delta * delta <= limit2:
+                stack.append(left)
+            if delta >= 0 or delta * delta <= limit2:
+                stack.append(right)
+        return [(_arc_km(math.sqrt(d2)), index) for d2, index in sorted(found)]
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _word_spans(text):
+    """Every run of up to MAX_NAME_WORDS consecutive words, longest first."""
+    words = text.split()
+    spans = []
+    for size in range(min(len(words), MAX_NAME_WORDS), 0, -1):
+        spans.extend(" ".join(words[i:i + size]) for i in range(len(words) - size + 1))
+    return spans
+
+
+def parse_coordinates(value):
+    """[lat, lon] (numbers or numeric strings) -> (lat, lon); None if missing, out of range or [0, 0]."""
+    if isinstance(value, dict):
+        value = (value.get("lat"), value.get("lon", value.get("lng")))
+    elif isinstance(value, str):
+        value = re.findall(r"-?\d+(?:\.\d+)?", value)
+    try:
+        lat, lon = (float(v) for v in value)
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180) or (abs(lat) < 1e-6 and abs(lon) < 1e-6):
+        return None
+    return lat, lon
+
+
+class Gazetteer:
+    """
+    In-memory index over the bundled cities (cities.json) and points of
+    interest (pois.json).
+
+    Names and aliases are looked up exactly, as a whole-word phrase inside a
+    longer text ("Sunrise at Amber Fort"), or fuzzily by trigram overlap
+    ("Hawa Mehal"). A KD-tree answers nearest-neighbour and radius queries,
+    which also scope lookups to the trip so "City Palace" resolves to the one
+    in Udaipur on an Udaipur trip.
+    """
+
+    def __init__(self, cities, pois):
+        self.places = []
+        city_country = {}
+        for city in cities:
+            city_country[city["name"]] = city.get("country")
+            self._add(city, kind="city", city=city["name"], country=city.get("country"))
+        for poi in pois:
+            self._add(poi, kind="poi", city=poi.get("city"), country=city_country.get(poi.get("city")))
+
+        self._by_name = defaultdict(list)
+        self._grams = defaultdict(set)
+        self._gram_counts = {}
+        for index, place in enumerate(self.places):
+            for name in [place["name"]] + place["aliases"]:
+                key = normalize_place(name)
+                if key and index not in self._by_name[key]:
+                    self._by_name[key].append(index)
+                    grams = _trigrams(key)
+                    self._gram_counts[key] = len(grams)
+                    for gram in grams:
+                        self._grams[gram].add(key)
+        self.tree = KDTree([(p["lat"], p["lon"]) for p in self.places])
+
+    def _add(self, record, kind, city, country):
+        self.places.append({
+            "name": record["name"],
+            "kind": kind,
+            "city": city,
+            "country": country,
+            "lat": record["lat"],
+            "lon": record["lon"],
+            "aliases": list(record.get("aliases", [])),
+        })
+
+    def __len__(self):
+        return len(self.places)
+
+    def nearest(self, lat, lon, k=1, kind=None):
+        """[(km, place), ...] for the k closest places (optionally of one kind)."""
+        accept = None if kind is None else (lambda i: self.places[i]["kind"] == kind)
+        return [(km, self.places[i]) for km, i in self.tree.nearest(lat, lon, k, accept)]
+
+    def within(self, lat, lon, km, kind=None):
+        return [(d, self.places[i]) for d, i in self.tree.within(lat, lon, km)
+                if kind is None or self.places[i]["kind"] == kind]
+
+    def _fuzzy(self, text):
+        """(score, key) for every name at least FUZZY_MIN_SCORE similar to `text`."""
+        grams = _trigrams(text)
+        shared = Counter(key for gram in grams for key in self._grams.get(gram, ()))
+        for key, count in shared.items():
+            score = 2.0 * count / (len(grams) + self._gram_counts[key])
+            if score >= FUZZY_MIN_SCORE:
+                yield round(score, 3), key
+
+    def _tiers(self, query):
+        """Candidate names, best first: exact, contained in the text, then misspelt."""
+        spans = _word_spans(query)
+        yield [(1.0, query)] if query in self._by_name else []
+        # Longest phrase first, so "city palace udaipur" beats "city palace"
+        yield [(0.9, span) for span in spans if span != query and span in self._by_name]
+        yield sorted({hit for span in spans if len(span) >= 4 for hit in self._fuzzy(span)},
+                     key=lambda hit: (-hit[0], -len(hit[1])))
+
+    def lookup(self, text, near=(), radius_km=TRIP_RADIUS_KM, kind=None):
+        """
+        Best (place, score) for a name or a phrase containing one, else None.
+
+        Exact names score 1.0, names found inside `text` 0.9 and misspellings
+        their trigram similarity. With `near` ([(lat, lon), ...]) only places
+        within `radius_km` of one of those points are considered; without it
+        a name shared by several places is too ambiguous and gives None.
+        """
+        query = normalize_place(text or "")
+        if not query:
+            return None
+        allowed = None
+        if near:
+            allowed = {i for lat, lon in near for _, i in self.tree.within(lat, lon, radius_km)}
+
+        for tier in self._tiers(query):
+            for score, key in tier:
+                indices = [i for i in self._by_name[key]
+                           if (allowed is None or i in allowed) and (kind is None or self.places[i]["kind"] == kind)]
+                if len(indices) > 1:
+                    if not near:
+                        return None
+                    # Same name near two trip cities: the one whose city the text names, else nearest near[0]
+                    lat, lon = near[0]
+                    indices.sort(key=lambda i: (
+                        f" {normalize_place(self.places[i]['city'])} " not in f" {query} ",
+                        haversine_km(lat, lon, self.places[i]["lat"], self.places[i]["lon"]),
+                    ))
+                if indices:
+                    return self.places[indices[0]], score
+        return None
+
+
+def _load_gazetteer():
+    with open(os.path.join(DATA_DIR, "cities.json"), encoding="utf-8") as f:
+        cities = json.load(f)["cities"]
+    with open(os.path.join(DATA_DIR, "pois.json"), encoding="utf-8") as f:
+        pois = json.load(f)["pois"]
+    return Gazetteer(cities, pois)
+
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer():
+    """Process-wide index, built on first use (a few ms)."""
+    global _gazetteer
+    with _gazetteer_lock:
+        if _gazetteer is None:
+            _gazetteer = _load_gazetteer()
+        return _gazetteer
+
+
+def _distance_to_trip(coords, near):
+    return min(haversine_km(coords[0], coords[1], lat, lon) for lat, lon in near)
+
+
+class _Placer:
+    """Settles one plan's hotels and activities against the gazetteer."""
+
+    def __init__(self, gazetteer, trip_cities):
+        self.gazetteer = gazetteer
+        self.trip_cities = trip_cities
+        self.near = [(c["lat"], c["lon"]) for c in trip_cities]
+        # Fallback for items with nothing better: the city the plan was last in
+        self.current_city = trip_cities[0] if trip_cities else None
+        self.stats = Counter()
+
+    def _near(self):
+        """Trip city points with the current city first, so it wins ties."""
+        if self.current_city is None:
+            return self.near
+        own = (self.current_city["lat"], self.current_city["lon"])
+        return [own] + [p for p in self.near if p != own]
+
+    def _keep(self, item, coords):
+        # Numeric strings and {"lat", "lng"} dicts become the [lat, lon] list the client reads
+        item["coordinates"] = [coords[0], coords[1]]
+        self.stats["kept"] += 1
+        return coords
+
+    def _plausible(self, coords):
+        return coords is not None and (not self.near or _distance_to_trip(coords, self.near) <= TRIP_RADIUS_KM)
+
+    def _settle(self, item, given, place):
+        coords = (round(place["lat"], 4), round(place["lon"], 4))
+        if given is not None and haversine_km(*given, *coords) <= AGREE_KM:
+            return self._keep(item, given)
+        item["coordinates"] = list(coords)
+        self.stats["corrected" if given is not None else "filled"] += 1
+        return coords
+
+    def _follow(self, coords):
+        """Track which trip city the itinerary is in from an item's final coordinates."""
+        if not self.trip_cities:
+            return
+        hits = self.gazetteer.nearest(coords[0], coords[1], k=1, kind="city")
+        if hits and hits[0][0] <= TRIP_RADIUS_KM and hits[0][1] in self.trip_cities:
+            self.current_city = hits[0][1]
+
+    def place(self, item, texts):
+        if not isinstance(item, dict):
+            return
+        texts = [t for t in texts if isinstance(t, str) and t.strip()]
+        given = parse_coordinates(item.get("coordinates"))
+
+        match = None
+        for text in texts:
+            match = self.gazetteer.lookup(text, near=self._near(), kind="poi")
+            if match:
+                break
+        if match:
+            self._follow(self._settle(item, given, match[0]))
+            return
+
+        if self._plausible(given):
+            self._follow(self._keep(item, given))
+            return
+        swapped = (given[1], given[0]) if given and abs(given[1]) <= 90 else None
+        if self.near and self._plausible(swapped):
+            # [lon, lat] instead of [lat, lon]
+            item["coordinates"] = list(swapped)
+            self.stats["corrected"] += 1
+            self._follow(swapped)
+            return
+
+        # A trip city named in the text, else wherever the plan currently is
+        city = None
+        for text in texts:
+            found = self.gazetteer.lookup(text, near=self.near, radius_km=1.0, kind="city")
+            if found:
+                city = found[0]
+                break
+        city = city or self.current_city
+        if city is None:
+            self.stats["unresolved"] += 1
+            return
+        self._settle(item, given, city)
+        self.current_city = city if city in self.trip_cities else self.current_city
+
+
+def fill_coordinates(plan, gazetteer=None):
+    """
+    Fill or correct hotel and activity coordinates in place; returns counts.
+
+    A hotel or activity whose name (or address/description) matches a
+    gazetteer place near the trip gets that place's coordinates. Otherwise
+    coordinates from the LLM are kept if they lie within TRIP_RADIUS_KM of a
+    trip city, and replaced by the centre of the city the itinerary is in
+    when they are missing, [0, 0] or elsewhere. No network, no LLM.
+    """
+    if not isinstance(plan, dict):
+        return {}
+    gazetteer = gazetteer or get_gazetteer()
+    trip_cities = []
+    for name in split_destinations(plan.get("destination") or ""):
+        found = gazetteer.lookup(name, kind="city")
+        if found and found[0] not in trip_cities:
+            trip_cities.append(found[0])
+    placer = _Placer(gazetteer, trip_cities)
+
+    for hotel in plan.get("hotels") or []:
+        if isinstance(hotel, dict):
+            placer.place(hotel, [hotel.get("name"), hotel.get("address")])
+    # Hotels are listed per city; the itinerary starts over in the first one
+    placer.current_city = trip_cities[0] if trip_cities else None
+    for day in plan.get("itinerary") or []:
+        for activity in (day.get("activities") or []) if isinstance(day, dict) else []:
+            if isinstance(activity, dict):
+                placer.place(activity, [activity.get("activity"), activity.get("description")])
+    return dict(placer.stats)
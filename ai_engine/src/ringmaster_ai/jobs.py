@@ -0,0 +1,214 @@
+import json
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from src.ringmaster_ai.admission import (
+    ADMISSION_DISABLED, MAX_CONCURRENCY, RECHECK_SECONDS, AdmissionRejected, get_admission_controller,
+)
+from src.ringmaster_ai.pipeline import STAGES, log_crash
+
+# Finished jobs are kept this long (seconds) so clients can still fetch results.
+JOB_TTL = int(os.getenv("PLAN_JOB_TTL", "3600"))
+
+
+class PlanJob:
+    """State of one queued/running trip plan, plus its ordered event log."""
+
+    def __init__(self, inputs, priority="interactive"):
+        self.id = uuid.uuid4().hex
+        self.inputs = inputs
+        self.priority = priority
+        self.admission = None  # admission controller handle, for cancelling while queued
+        self.status = "queued"  # queued -> running -> completed | failed
+        self.stages = {name: {"status": "pending"} for name in STAGES}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.events = []
+        self._cond = threading.Condition()
+
+    @property
+    def done(self):
+        return self.status in ("completed", "failed")
+
+    def _emit(self, event, data):
+        # Caller holds self._cond
+        self.events.append({"id": len(self.events), "event": event, "data": data})
+        self._cond.notify_all()
+
+    def update_stage(self, stage, status, payload=None):
+        with self._cond:
+            info = self.stages[stage]
+            info["status"] = status
+            now = time.time()
+            if status == "running":
+                info["started_at"] = now
+            elif status in ("completed", "cached"):
+                info["finished_at"] = now
+                if "started_at" in info:
+                    info["duration_s"] = round(now - info["started_at"], 3)
+                info["result"] = payload
+            self._emit("stage", {"stage": stage, "status": status, "result": payload})
+
+    def start(self):
+        with self._cond:
+            self.status = "running"
+            self._emit("status", {"status": "running"})
+
+    def finish(self, result=None, error=None):
+        with self._cond:
+            self.result = result
+            self.error = error
+            self.status = "failed" if error else "completed"
+            self.finished_at = time.time()
+            self._emit("status", {"status": self.status, "result": result, "error": error})
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                "job_id": self.id,
+                "status": self.status,
+                "stages": {k: dict(v) for k, v in self.stages.items()},
+                "result": self.result,
+                "error": self.error,
+                "created_at": self.created_at,
+                "finished_at": self.finished_at,
+            }
+
+    def wait_for_events(self, after, timeout):
+        """Return events with id >= after, blocking up to `timeout` for new ones."""
+        with self._cond:
+            if len(self.events) <= after and not self.done:
+                self._cond.wait(timeout)
+            return self.events[after:]
+
+
+class JobManager:
+    """
+    Runs trip pipelines on a bounded thread pool and tracks them by id.
+
+    Jobs are queued with the admission controller without holding a
+    thread; once one is admitted (by priority, within the live key
+    capacity) it is handed to the pool, which is sized to the most
+    pipelines admission ever allows, so an admitted job never waits for a
+    worker and a job stays "queued" until it is admitted. A dispatcher
+    thread ticks the controller to expire jobs past their queue deadline.
+    With admission disabled the pool has PLAN_TRIP_WORKERS threads and
+    runs jobs in submission order.
+    """
+
+    def __init__(self, runner, max_workers=None):
+        self.runner = runner
+        default_workers = os.getenv("PLAN_TRIP_WORKERS", "2") if ADMISSION_DISABLED else MAX_CONCURRENCY
+        self.max_workers = max_workers or int(default_workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="plan-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._dispatcher = None
+
+    def submit(self, inputs, priority="interactive"):
+        """Queue a plan; raises AdmissionRejected when admission turns it away on arrival."""
+        self._prune()
+        job = PlanJob(inputs, priority)
+        if ADMISSION_DISABLED:
+            with self._lock:
+                self._jobs[job.id] = job
+            self._executor.submit(self._run, job)
+            return job
+        self._start_dispatcher()
+        with self._lock:
+            self._jobs[job.id] = job
+        try:
+            job.admission = get_admission_controller().enqueue(
+                priority, lambda release: self._admitted(job, release), lambda e: job.finish(error=str(e)))
+        except AdmissionRejected:
+            with self._lock:
+                del self._jobs[job.id]
+            raise
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _start_dispatcher(self):
+        with self._lock:
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch, name="plan-job-dispatcher", daemon=True)
+                self._dispatcher.start()
+
+    def _dispatch(self):
+        controller = get_admission_controller()
+        while not self._stopped.wait(RECHECK_SECONDS):
+            controller.tick()
+
+    def _admitted(self, job, release):
+        # Admission callback: runs under the controller's lock, so only hand off
+        try:
+            self._executor.submit(self._run, job, release)
+        except RuntimeError:  # shut down
+            release()
+            job.finish(error="Plan service is shutting down")
+
+    def _run(self, job, release=None):
+        job.start()
+        try:
+            result = self.runner(job.inputs, on_progress=job.update_stage)
+            job.finish(result=result)
+        except Exception as e:
+            error_trace = traceback.format_exc()
+            print(f"Error during TripCrew job {job.id}: {error_trace}")
+            log_crash(job.inputs.get("current_date"), error_trace)
+            job.finish(error=f"TripCrew Execution Error: {str(e)}")
+        finally:
+            if release:
+                release()
+
+    def _prune(self):
+        cutoff = time.time() - JOB_TTL
+        with self._lock:
+            expired = [jid for jid, j in self._jobs.items() if j.finished_at and j.finished_at < cutoff]
+            for jid in expired:
+                del self._jobs[jid]
+
+    def status_counts(self):
+        counts = {"queued": 0, "running": 0, "completed": 0, "failed": 0}
+        with self._lock:
+            for job in self._jobs.values():
+                counts[job.status] += 1
+        return counts
+
+    def shutdown(self):
+        """Stop taking work and fail every job that has not started."""
+        self._stopped.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            queued = [job for job in self._jobs.values() if job.status == "queued"]
+        for job in queued:
+            if job.admission is not None:
+                # False once admitted: the job is then on the executor, cancelled above
+                get_admission_controller().cancel(job.admission)
+            job.finish(error="Plan service shut down before the job started")
+
+
+def sse_stream(job, keepalive=15):
+    """Yield the job's events as Server-Sent Events until it finishes."""
+    sent = 0
+    while True:
+        events = job.wait_for_events(sent, timeout=keepalive)
+        if not events:
+            if job.done and sent >= len(job.events):
+                return
+            yield ": keepalive\n\n"
+            continue
+        for ev in events:
+            yield f"id: {ev['id']}\nevent: {ev['event']}\ndata: {json.dumps(ev['data'])}\n\n"
+        sent += len(events)
+        if job.done and sent >= len(job.events):
+            return
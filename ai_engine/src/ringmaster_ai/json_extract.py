@@ -0,0 +1,246 @@
+import json
+import re
+
+# A whole string literal (skipped in one step) or a character that changes
+# nesting; a lone '"' means the string continues into the next chunk.
+_TOKEN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[{}\[\]",]', re.DOTALL)
+_STRING_STOP = re.compile(r'["\\]')
+_CLOSERS = {"{": "}", "[": "]"}
+_EMPTY_OBJECT = re.compile(r"\{\s*\}")
+# Restarts after a stray '{' in prose swallowed the real object.
+MAX_RESTARTS = 3
+
+
+class JSONExtractionError(ValueError):
+    """No JSON object could be recovered from the text."""
+
+
+def _merge_duplicate_keys(pairs):
+    # LLMs repeat keys (the feasibility schema lists daily_spend_per_person
+    # twice); later values win unless they are empty and an earlier one isn't.
+    obj = {}
+    for key, value in pairs:
+        if key in obj and (value is None or value == "" or value == [] or value == {}):
+            continue
+        obj[key] = value
+    return obj
+
+
+def _loads(text):
+    return json.loads(text, strict=False, object_pairs_hook=_merge_duplicate_keys)
+
+
+class _Scanner:
+    """
+    Resumable one-pass scanner over text that contains JSON objects.
+
+    Only structural characters and whole string literals are visited; the
+    regex jumps over everything else. For every top-level object it records
+    the span and any trailing commas to drop; for an object still open at
+    the end it keeps the last point where the text can be cut and closed,
+    which is how truncated answers are repaired.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.length = 0
+        self.start = None  # index of the '{' opening the current top-level object
+        self.stack = ""  # closers of the open containers, innermost last
+        self.in_string = False
+        self.escape = False  # a backslash ended the previous chunk
+        self.pending_comma = None  # comma that is trailing if a closer follows
+        self.safe = None  # (index, stack) where the open object can be cut
+        self.drops = []
+        self.complete = []  # (start, end, drops) of finished top-level objects
+
+    def text(self):
+        if len(self.chunks) > 1:
+            self.chunks = ["".join(self.chunks)]
+        return self.chunks[0] if self.chunks else ""
+
+    def feed(self, chunk):
+        if not chunk:
+            return
+        offset = self.length
+        self.chunks.append(chunk)
+        self.length += len(chunk)
+        # Hot loop: state lives in locals and is written back at the end
+        stack, pending, safe = self.stack, self.pending_comma, self.safe
+        drops, complete = self.drops, self.complete
+        n = len(chunk)
+        i = 0
+        if self.escape:
+            self.escape = False
+            i = 1
+        while i < n:
+            if self.in_string:
+                m = _STRING_STOP.search(chunk, i)
+                if m is None:
+                    break
+                j = m.start()
+                if chunk[j] == "\\":
+                    if j + 1 >= n:
+                        self.escape = True
+                        break
+                    i = j + 2
+                    continue
+                self.in_string = False
+                i = j + 1
+                continue
+
+            if not stack:
+                j = chunk.find("{", i)
+                if j == -1:
+                    break
+                self.start = offset + j
+                stack = "}"
+                safe = (offset + j + 1, stack)
+                drops = self.drops = []
+                pending = None
+                i = j + 1
+                continue
+
+            m = _TOKEN.search(chunk, i)
+            if m is None:
+                if pending is not None and not chunk[i:].isspace():
+                    pending = None
+                break
+            j = m.start()
+            c = chunk[j]
+            if pending is not None and j > i and not chunk[i:j].isspace():
+                pending = None  # a scalar value followed the comma
+
+            if c == '"':
+                pending = None
+                if m.end() - j == 1:
+                    self.in_string = True
+                i = m.end()
+                continue
+            if c == "{" or c == "[":
+                pending = None
+                stack += _CLOSERS[c]
+                safe = (offset + j + 1, stack)
+            elif c == "}" or c == "]":
+                if pending is not None:
+                    drops.append(pending)
+                    pending = None
+                stack = stack[:-1]
+                if stack:
+                    safe = (offset + j + 1, stack)
+                else:
+                    complete.append((self.start, offset + j + 1, drops))
+                    self.start = safe = None
+            elif pending is not None:  # ",," -> drop the second comma
+                drops.append(offset + j)
+            else:
+                safe = (offset + j, stack)
+                pending = offset + j
+            i = j + 1
+        self.stack, self.pending_comma, self.safe = stack, pending, safe
+
+    def candidates(self):
+        """
+        Repaired JSON strings, longest first. A truncated tail is closed off
+        as it stands (keeping a complete trailing scalar) or, failing that,
+        cut back to the last safe point; a repair that leaves nothing but
+        an empty object is not offered.
+        """
+        text = self.text()
+        spans = [(end - start, start, end, drops, "") for start, end, drops in self.complete]
+        if self.start is not None and self.safe is not None:
+            if not self.in_string:
+                end = len(text)
+                spans.append((end - self.start, self.start, end, list(self.drops), self.stack[::-1]))
+            end, stack = self.safe
+            drops = [d for d in self.drops if d < end]
+            spans.append((end - self.start, self.start, end, drops, stack[::-1]))
+        spans.sort(key=lambda s: s[0], reverse=True)
+        for _, start, end, drops, closers in spans:
+            candidate = _assemble(text, start, end, drops, closers)
+            if closers and _EMPTY_OBJECT.fullmatch(candidate):
+                continue
+            yield candidate
+
+
+def _assemble(text, start, end, drops, closers):
+    pieces = []
+    pos = start
+    for d in drops:
+        pieces.append(text[pos:d])
+        pos = d + 1
+    body = text[pos:end]
+    if closers:
+        body = body.rstrip().rstrip(",")
+    pieces.append(body)
+    return "".join(pieces) + closers
+
+
+def extract_json(text):
+    """
+    The outermost JSON object in an LLM answer, repaired, as a string.
+
+    Handles fenced or bare objects, prose around them, trailing commas,
+    doubled commas and truncated tails (cut back to the last complete
+    value and closed). Raises JSONExtractionError if nothing parses, or
+    if only an empty object survives repair.
+    """
+    return _extract(text)[0]
+
+
+def parse_json(text):
+    """extract_json() parsed into a dict; duplicate keys keep the last non-empty value."""
+    return _extract(text)[1]
+
+
+def _extract(text):
+    text = str(text)
+    base = 0
+    for _ in range(MAX_RESTARTS + 1):
+        scanner = _Scanner()
+        scanner.feed(text[base:] if base else text)
+        for candidate in scanner.candidates():
+            try:
+                return candidate, _loads(candidate)
+            except ValueError:
+                continue
+        # A stray '{' in prose can swallow the real object: retry after it
+        if scanner.start is None:
+            break
+        base += scanner.start + 1
+    raise JSONExtractionError("No JSON object found in LLM output")
+
+
+class StreamingJSONParser:
+    """
+    Incremental extractor for streamed LLM tokens.
+
+    feed() scans only the new chunk, so total work stays linear in the
+    output size. partial() returns the best-effort object so far (open
+    containers closed, unfinished values dropped) for progressive display;
+    result() returns the final object.
+    """
+
+    def __init__(self):
+        self._scanner = _Scanner()
+
+    def feed(self, chunk):
+        """Consume a chunk; True once a complete top-level object has been seen."""
+        self._scanner.feed(chunk)
+        return self.done
+
+    @property
+    def done(self):
+        return bool(self._scanner.complete)
+
+    def partial(self):
+        for candidate in self._scanner.candidates():
+            try:
+                return _loads(candidate)
+            except ValueError:
+                continue
+        return None
+
+    def result(self):
+        # Reuse this scan; only a stray-brace restart needs a fresh pass
+        obj = self.partial()
+        return obj if obj is not None else parse_json(self._scanner.text())
@@ -0,0 +1,304 @@
+import os
+import re
+import threading
+import time
+
+from src.ringmaster_ai.metrics import REGISTRY
+
+# Groq free-tier defaults for llama-3.3-70b-versatile; override per deployment.
+DEFAULT_RPM = int(os.getenv("GROQ_RPM_LIMIT", "30"))
+DEFAULT_TPM = int(os.getenv("GROQ_TPM_LIMIT", "6000"))
+# Cooldown applied after a 429 when the provider gives no retry hint.
+DEFAULT_RETRY_AFTER = float(os.getenv("GROQ_DEFAULT_RETRY_AFTER", "10"))
+# Consecutive failures before a key's breaker opens, and the first open period.
+BREAKER_THRESHOLD = int(os.getenv("GROQ_BREAKER_THRESHOLD", "3"))
+BREAKER_COOLDOWN = float(os.getenv("GROQ_BREAKER_COOLDOWN", "60"))
+BREAKER_MAX_COOLDOWN = 600.0
+
+
+def load_groq_keys():
+    """Collect the distinct Groq keys from GROQ_API_KEY and GROQ_[API_][KEY_]1..20."""
+    keys = []
+    candidates = [os.getenv("GROQ_API_KEY")]
+    for i in range(1, 21):
+        candidates.append(os.getenv(f"GROQ_{i}") or os.getenv(f"GROQ_API_KEY_{i}") or os.getenv(f"GROQ_KEY_{i}"))
+    for key in candidates:
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
+
+class TokenBucket:
+    """Continuously refilling bucket; `tokens` may go negative after reconciliation."""
+
+    def __init__(self, capacity, per_seconds=60.0):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / per_seconds
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def fill_ratio(self):
+        return max(0.0, self.tokens) / self.capacity
+
+    def wait_time(self, amount):
+        """Seconds until `amount` tokens are available (0 if already there)."""
+        amount = min(amount, self.capacity)
+        missing = amount - self.tokens
+        return 0.0 if missing <= 0 else missing / self.rate
+
+    def consume(self, amount):
+        self.tokens -= amount
+
+    def drain(self):
+        self.tokens = min(self.tokens, 0.0)
+
+
+class KeyState:
+    """Budgets, cooldowns and circuit-breaker state for one API key."""
+
+    def __init__(self, index, key, rpm, tpm):
+        self.index = index
+        self.key = key
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.cooldown_until = 0.0
+        self.consecutive_failures = 0
+        self.breaker_open_until = 0.0
+        self.breaker_cooldown = BREAKER_COOLDOWN
+        self.in_flight = 0
+        self.stats = {"calls": 0, "tokens": 0, "rate_limited": 0, "failures": 0}
+
+    def refill(self, now):
+        self.requests.refill(now)
+        self.tokens.refill(now)
+
+    def wait_time(self, tokens, now):
+        return max(
+            self.cooldown_until - now,
+            self.breaker_open_until - now,
+            self.requests.wait_time(1),
+            self.tokens.wait_time(tokens),
+            0.0,
+        )
+
+    def headroom(self):
+        return min(self.requests.fill_ratio(), self.tokens.fill_ratio())
+
+
+class KeyLease:
+    """A key handed out for one LLM call; report back through the scheduler."""
+
+    def __init__(self, state, estimated_tokens):
+        self.state = state
+        self.estimated_tokens = estimated_tokens
+        self.acquired_at = time.monotonic()
+
+    @property
+    def key(self):
+        return self.state.key
+
+    @property
+    def key_id(self):
+        return self.state.index
+
+
+class KeyScheduler:
+    """
+    Hands out Groq keys by remaining RPM/TPM headroom.
+
+    Every key has a request bucket and a token bucket that refill continuously.
+    A call estimates its tokens, takes the ready key with the most headroom and
+    only blocks when no key can serve it yet. 429s drain the key's buckets and
+    honour the provider's retry hint; repeated failures open a per-key circuit
+    breaker that doubles its cooldown each time it re-opens.
+    """
+
+    def __init__(self, keys, rpm=DEFAULT_RPM, tpm=DEFAULT_TPM):
+        if not keys:
+            print("WARNING: No Groq API keys found in environment variables!")
+            # Fallback to empty string to avoid immediate crash, though calls will fail
+            keys = [""]
+        self.states = [KeyState(i + 1, key, rpm, tpm) for i, key in enumerate(keys)]
+        self._cond = threading.Condition()
+
+    @classmethod
+    def from_env(cls):
+        return cls(load_groq_keys())
+
+    def __len__(self):
+        return len(self.states)
+
+    def acquire(self, estimated_tokens=1000, timeout=None):
+        """Block until some key can take a call of `estimated_tokens`, then lease it."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                best, best_wait = None, None
+                for state in self.states:
+                    state.refill(now)
+                    wait = state.wait_time(estimated_tokens, now)
+                    if wait > 0:
+                        best_wait = wait if best_wait is None else min(best_wait, wait)
+                        continue
+                    if best is None or (state.headroom(), -state.in_flight) > (best.headroom(), -best.in_flight):
+                        best = state
+                if best is not None:
+                    best.requests.consume(1)
+                    best.tokens.consume(min(estimated_tokens, best.tokens.capacity))
+                    best.in_flight += 1
+                    return KeyLease(best, estimated_tokens)
+
+                if deadline is not None:
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise TimeoutError("No Groq key became available before the deadline")
+                    best_wait = min(best_wait, remaining)
+                print(f"--- All Groq keys exhausted, waiting {best_wait:.1f}s ---")
+                self._cond.wait(best_wait)
+
+    def release(self, lease, tokens_used=None):
+        """Successful call: reconcile the token estimate and close the breaker."""
+        with self._cond:
+            state = lease.state
+            state.in_flight -= 1
+            if tokens_used is not None:
+                state.tokens.consume(tokens_used - min(lease.estimated_tokens, state.tokens.capacity))
+            state.stats["calls"] += 1
+            state.stats["tokens"] += tokens_used or lease.estimated_tokens
+            state.consecutive_failures = 0
+            state.breaker_cooldown = BREAKER_COOLDOWN
+            self._cond.notify_all()
+
+    def report_rate_limit(self, lease, retry_after=None):
+        """429 on this key: cool it down for the provider's hint and drain its budget."""
+        with self._cond:
+            state = lease.state
+            state.in_flight -= 1
+            now = time.monotonic()
+            state.cooldown_until = max(state.cooldown_until, now + (retry_after or DEFAULT_RETRY_AFTER))
+            state.requests.drain()
+            state.tokens.drain()
+            state.stats["rate_limited"] += 1
+            self._record_failure(state, now)
+            self._cond.notify_all()
+
+    def report_failure(self, lease):
+        """Non-rate-limit error (auth, 5xx, timeout) attributed to the key."""
+        with self._cond:
+            state = lease.state
+            state.in_flight -= 1
+            state.stats["failures"] += 1
+            self._record_failure(state, time.monotonic())
+            self._cond.notify_all()
+
+    def _record_failure(self, state, now):
+        state.consecutive_failures += 1
+        if state.consecutive_failures >= BREAKER_THRESHOLD:
+            state.breaker_open_until = now + state.breaker_cooldown
+            print(f"--- Groq key #{state.index} breaker open for {state.breaker_cooldown:.0f}s ---")
+            state.breaker_cooldown = min(state.breaker_cooldown * 2, BREAKER_MAX_COOLDOWN)
+            # Half-open after the cooldown: one more failure re-opens immediately
+            state.consecutive_failures = BREAKER_THRESHOLD - 1
+
+    def live_keys(self):
+        """Keys not cooling down after a 429 and not behind an open breaker."""
+        with self._cond:
+            now = time.monotonic()
+            return sum(1 for s in self.states if s.cooldown_until <= now and s.breaker_open_until <= now)
+
+    def snapshot(self):
+        """Per-key view for logs and stats endpoints (never includes the key itself)."""
+        with self._cond:
+            now = time.monotonic()
+            out = []
+            for state in self.states:
+                state.refill(now)
+                out.append({
+                    "key_id": state.index,
+                    "request_headroom": round(state.requests.fill_ratio(), 3),
+                    "token_headroom": round(state.tokens.fill_ratio(), 3),
+                    "cooldown_s": round(max(0.0, state.cooldown_until - now), 1),
+                    "breaker_open": state.breaker_open_until > now,
+                    "in_flight": state.in_flight,
+                    **state.stats,
+                })
+            return out
+
+
+_RETRY_IN = re.compile(r"try again in\s+(?:(\d+)m)?\s*([\d.]+)\s*(ms|s)?", re.IGNORECASE)
+
+
+def is_rate_limit_error(exc):
+    if getattr(exc, "status_code", None) == 429 or type(exc).__name__ == "RateLimitError":
+        return True
+    return "rate limit" in str(exc).lower() or "429" in str(exc)
+
+
+def retry_after_from_error(exc):
+    """Best-effort retry hint from a 429: `retry-after` header, then Groq's message text."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for name in ("retry-after", "Retry-After", "x-ratelimit-reset-tokens"):
+        value = headers.get(name) if hasattr(headers, "get") else None
+        if value:
+            try:
+                return float(str(value).rstrip("s"))
+            except ValueError:
+                pass
+    match = _RETRY_IN.search(str(exc))
+    if match:
+        minutes, seconds, unit = match.groups()
+        value = float(seconds) / (1000.0 if unit == "ms" else 1.0)
+        return value + 60.0 * int(minutes or 0)
+    return None
+
+
+def estimate_tokens(messages):
+    """Rough prompt size (~4 characters per token) for budgeting before a call."""
+    if isinstance(messages, str):
+        return len(messages) // 4 + 1
+    total = 0
+    for message in messages or []:
+        content = message.get("content") if isinstance(message, dict) else message
+        total += len(str(content)) // 4 + 4
+    return total
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_key_scheduler():
+    """Process-wide scheduler, built from the environment on first use."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = KeyScheduler.from_env()
+    return _scheduler
+
+
+def _collect_key_metrics():
+    if _scheduler is None:
+        return []
+    keys = _scheduler.snapshot()
+
+    def samples(field):
+        return [({"key_id": str(k["key_id"])}, float(k[field]) if isinstance(k[field], bool) else k[field]) for k in keys]
+    return [
+        ("groq_key_calls_total", "counter", "Successful LLM calls per Groq key.", samples("calls")),
+        ("groq_key_tokens_total", "counter", "Tokens spent per Groq key.", samples("tokens")),
+        ("groq_key_rate_limited_total", "counter", "429 responses per Groq key.", samples("rate_limited")),
+        ("groq_key_failures_total", "counter", "Other failed calls per Groq key.", samples("failures")),
+        ("groq_key_in_flight", "gauge", "Calls currently holding a lease on the key.", samples("in_flight")),
+        ("groq_key_token_headroom", "gauge", "Fraction of the key's token bucket available.", samples("token_headroom")),
+        ("groq_key_breaker_open", "gauge", "1 while the key's circuit breaker is open.", samples("breaker_open")),
+    ]
+
+
+REGISTRY.register_collector(_collect_key_metrics)
@@ -0,0 +1,226 @@
+import functools
+import gzip
+import hashlib
+import json
+import os
+import threading
+
+# passthrough (default): live calls, nothing stored
+# record: live calls, every response saved to LLM_CACHE_DIR
+# replay: saved responses only; a call that was never recorded raises LLMCacheMiss
+LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "passthrough").strip().lower()
+LLM_CACHE_DIR = os.getenv("LLM_CACHE_DIR", os.path.join(os.getcwd(), ".cache", "llm"))
+
+MODES = ("passthrough", "record", "replay")
+
+# Completion params that do not change the answer (credentials, transport,
+# bookkeeping) and are left out of the key, so rotating Groq keys or
+# endpoints still hits the same recording.
+IGNORED_PARAMS = frozenset({
+    "api_key", "api_base", "base_url", "api_version", "organization", "timeout",
+    "request_timeout", "num_retries", "max_retries", "metadata", "callbacks",
+    "litellm_call_id", "litellm_logging_obj", "extra_headers", "headers", "client",
+})
+
+# Response fields kept on disk; ids and timestamps would defeat deduplication.
+STORED_FIELDS = ("model", "choices", "usage")
+
+
+class LLMCacheMiss(LookupError):
+    """Replay mode was asked for a completion that was never recorded."""
+
+
+def _jsonable(value):
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if isinstance(value, type) and hasattr(value, "model_json_schema"):
+        # response_format=SomeModel: key on the schema, not the class repr
+        return value.model_json_schema()
+    if hasattr(value, "model_dump"):
+        return _jsonable(value.model_dump())
+    return str(value)
+
+
+def request_key(params):
+    """sha256 over model, messages and every answer-relevant parameter."""
+    relevant = {k: v for k, v in params.items() if k not in IGNORED_PARAMS and v is not None}
+    blob = json.dumps(_jsonable(relevant), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Content-addressed store of completion responses.
+
+    A request key (see request_key) points at a blob named by the sha256 of
+    the gzipped response body, so identical answers to different prompts
+    are stored once:
+
+        <root>/keys/ab/ab12...      -> blob digest (one line)
+        <root>/blobs/cd/cd34....gz  -> {"model", "choices", "usage"}
+
+    Files are written to a temp name and renamed, so concurrent recorders
+    never leave a half-written entry behind.
+    """
+
+    def __init__(self, root=LLM_CACHE_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "recorded": 0, "blobs_written": 0}
+
+    def _path(self, kind, digest, suffix=""):
+        return os.path.join(self.root, kind, digest[:2], digest + suffix)
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def get(self, key):
+        """Stored response dict for `key`, or None."""
+        try:
+            with open(self._path("keys", key), "r", encoding="utf-8") as f:
+                digest = f.read().strip()
+            with gzip.open(self._path("blobs", digest, ".gz"), "rt", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            self._count("misses")
+            return None
+        self._count("hits")
+        return data
+
+    def put(self, key, response):
+        data = {field: _jsonable(response.get(field)) for field in STORED_FIELDS}
+        body = gzip.compress(json.dumps(data, sort_keys=True).encode("utf-8"), mtime=0)
+        digest = hashlib.sha256(body).hexdigest()
+        blob_path = self._path("blobs", digest, ".gz")
+        if not os.path.exists(blob_path):
+            self._write(blob_path, body)
+            self._count("blobs_written")
+        self._write(self._path("keys", key), digest.encode("ascii"))
+        self._count("recorded")
+
+    def _write(self, path, content):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+
+def _as_dict(response):
+    if hasattr(response, "model_dump"):
+        return response.model_dump()
+    return dict(response)
+
+
+def _restore(data):
+    import litellm
+
+    return litellm.ModelResponse(**data)
+
+
+_mode = "passthrough"
+_cache = None
+_originals = {}
+_install_lock = threading.Lock()
+
+
+def cache_mode():
+    return _mode
+
+
+def is_replaying():
+    """True when completions are served from disk (no keys or quota needed)."""
+    return _mode == "replay"
+
+
+def get_llm_cache():
+    return _cache
+
+
+def _lookup(params):
+    """(key, cached response or None); replay mode raises on a miss."""
+    key = request_key(params)
+    if _mode == "record":
+        return key, None
+    data = _cache.get(key)
+    if data is None:
+        raise LLMCacheMiss(
+            f"No recorded {params.get('model')} completion for key {key[:12]} in {_cache.root} "
+            f"(run with LLM_CACHE_MODE=record to capture it)"
+        )
+    return key, _restore(data)
+
+
+def _wrap_sync(original):
+    @functools.wraps(original)
+    def completion(*args, **params):
+        if args or params.get("stream"):
+            # Streams are not recorded; replay cannot answer them
+            if _mode == "replay":
+                raise LLMCacheMiss("streaming completions are not cached")
+            return original(*args, **params)
+        key, cached = _lookup(params)
+        if cached is not None:
+            return cached
+        response = original(**params)
+        _cache.put(key, _as_dict(response))
+        return response
+    return completion
+
+
+def _wrap_async(original):
+    @functools.wraps(original)
+    async def acompletion(*args, **params):
+        if args or params.get("stream"):
+            if _mode == "replay":
+                raise LLMCacheMiss("streaming completions are not cached")
+            return await original(*args, **params)
+        key, cached = _lookup(params)
+        if cached is not None:
+            return cached
+        response = await original(**params)
+        _cache.put(key, _as_dict(response))
+        return response
+    return acompletion
+
+
+def install_llm_cache(mode=None, root=None):
+    """
+    Route litellm.completion/acompletion through the cache in `mode`
+    (default LLM_CACHE_MODE). Safe to call repeatedly; passthrough restores
+    the original functions. Returns the active LLMCache, or None.
+
+    crewai's LLM calls litellm through the module attribute, so every
+    litellm-backed crewai.LLM (including ScheduledLLM) is covered.
+    """
+    global _mode, _cache
+    mode = (mode or LLM_CACHE_MODE).strip().lower()
+    if mode not in MODES:
+        raise ValueError(f"LLM_CACHE_MODE must be one of {', '.join(MODES)}, got '{mode}'")
+    with _install_lock:
+        if mode == "passthrough" and not _originals:
+            # Nothing was ever wrapped; don't pay for importing litellm
+            _mode, _cache = mode, None
+            return None
+        import litellm
+
+        if not _originals:
+            _originals["completion"] = litellm.completion
+            _originals["acompletion"] = litellm.acompletion
+        if mode == "passthrough":
+            litellm.completion = _originals["completion"]
+            litellm.acompletion = _originals["acompletion"]
+            _mode, _cache = mode, None
+            return None
+        if _cache is None or (root and _cache.root != root) or _mode != mode:
+            _cache = LLMCache(root or LLM_CACHE_DIR)
+            print(f"LLM cache: {mode} mode, {_cache.root}")
+        _mode = mode
+        litellm.completion = _wrap_sync(_originals["completion"])
+        litellm.acompletion = _wrap_async(_originals["acompletion"])
+        return _cache
@@ -0,0 +1,211 @@
+import re
+from typing import Annotated, Dict, List, Optional
+
+from pydantic import BaseModel, BeforeValidator, ValidationError
+
+from src.ringmaster_ai.json_extract import JSONExtractionError, parse_json
+
+# Activity descriptions are cut to this many words in the budget hand-off.
+HANDOFF_DESCRIPTION_WORDS = 12
+
+# logistics_crew task name -> IR section
+TASK_SECTIONS = {
+    "identify_optimal_route_task": "route",
+    "plan_multi_city_itinerary_task": "itinerary",
+    "enrichment_task": "enrichment",
+    "hotel_task": "hotels",
+    "flight_task": "flights",
+}
+
+
+def _to_text(value):
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (list, tuple)):
+        return ", ".join(str(v) for v in value)
+    return str(value)
+
+
+def _to_number(value):
+    """First integer in `value` ("5 days" -> 5, "3" -> 3), or None."""
+    match = re.search(r"\d+", str(value)) if value is not None else None
+    return int(match.group()) if match else None
+
+
+def _to_list(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [v.strip() for v in value.split(",") if v.strip()]
+    return [str(v) for v in value]
+
+
+# LLMs mix numbers, strings and lists for the same field; normalise to text.
+Text = Annotated[Optional[str], BeforeValidator(_to_text)]
+TextList = Annotated[List[str], BeforeValidator(_to_list)]
+
+
+class RoutePlan(BaseModel):
+    order: TextList = []
+    nights: Dict[str, int] = {}
+    rationale: Text = None
+
+
+class Activity(BaseModel):
+    time: Text = None
+    name: Text = None
+    place: Text = None
+    description: Text = None
+
+
+class DayPlan(BaseModel):
+    day: Annotated[int, BeforeValidator(_to_number)]
+    city: Text = None
+    theme: Text = None
+    transport: Text = None
+    activities: List[Activity] = []
+
+
+class HotelOption(BaseModel):
+    name: Text = None
+    city: Text = None
+    address: Text = None
+    rating: Text = None
+    price_per_night: Text = None
+    amenities: TextList = []
+
+
+class FlightOption(BaseModel):
+    route: Text = None
+    airlines: TextList = []
+    price_estimate: Text = None
+    duration: Text = None
+
+
+def _short(text, words=HANDOFF_DESCRIPTION_WORDS):
+    parts = (text or "").split()
+    return " ".join(parts[:words]) + (" ..." if len(parts) > words else "")
+
+
+def _join(*parts, sep=" "):
+    return sep.join(p for p in parts if p)
+
+
+class LogisticsIR(BaseModel):
+    """
+    Typed result of the logistics stage, built from its five task outputs.
+
+    Sections whose output is not the requested JSON keep their raw text in
+    `unparsed`, so nothing the agents produced is lost; to_handoff() renders
+    the minimal text the budget task needs.
+    """
+
+    route: RoutePlan = RoutePlan()
+    days: List[DayPlan] = []
+    hotels: List[HotelOption] = []
+    flights: List[FlightOption] = []
+    unparsed: Dict[str, str] = {}
+
+    @classmethod
+    def from_task_outputs(cls, outputs):
+        """`outputs` maps logistics task names to their raw text."""
+        sections = {TASK_SECTIONS.get(name, name): raw for name, raw in outputs.items()}
+        ir = cls()
+        parsers = {
+            "route": lambda d: setattr(ir, "route", RoutePlan.model_validate(d)),
+            "itinerary": lambda d: setattr(ir, "days", [DayPlan.model_validate(x) for x in d["days"]]),
+            "hotels": lambda d: setattr(ir, "hotels", [HotelOption.model_validate(x) for x in d["hotels"]]),
+            "flights": lambda d: setattr(ir, "flights", [FlightOption.model_validate(x) for x in d["flights"]]),
+        }
+        # Enrichment refines the itinerary skeleton, so it is applied last
+        parsers["enrichment"] = parsers["itinerary"]
+        parsed = set()
+        for section in ("route", "itinerary", "enrichment", "hotels", "flights"):
+            raw = sections.get(section)
+            if not raw:
+                continue
+            try:
+                parsers[section](parse_json(raw))
+                parsed.add(section)
+            except (JSONExtractionError, ValidationError, KeyError, TypeError) as e:
+                print(f"Logistics IR: could not parse {section} output ({type(e).__name__}); passing it through raw.")
+                ir.unparsed[section] = raw.strip()
+        if "enrichment" in parsed:
+            # The skeleton is superseded once enrichment parsed
+            ir.unparsed.pop("itinerary", None)
+        return ir
+
+    @classmethod
+    def from_tasks_output(cls, tasks_output):
+        return cls.from_task_outputs({t.name: t.raw for t in tasks_output})
+
+    def fill_itinerary(self, plan, days):
+        """
+        Add the days the final plan's itinerary lacks (of 1..`days`) from
+        self.days, in the budget task's schema with costs left open, and keep
+        the itinerary sorted. `days` and the plan's day numbers may be text
+        ("5 days", "3"). Returns the day numbers added.
+        """
+        itinerary = plan.get("itinerary")
+        total = _to_number(days)
+        if not isinstance(itinerary, list) or total is None:
+            return []
+        present = {_to_number(item.get("day")) for item in itinerary if isinstance(item, dict)}
+        known = {day.day: day for day in self.days}
+        added = []
+        for number in range(1, total + 1):
+            if number in present or number not in known:
+                continue
+            day = known[number]
+            itinerary.append({
+                "day": number,
+                "theme": day.theme or _join("Day in", day.city),
+                "activities": [
+                    {
+                        "time": a.time or "",
+                        "activity": a.name or a.place or "",
+                        "description": a.description or "",
+                        "cost_estimate": "Not estimated",
+                        "image_url": "LEAVE_EMPTY_FOR_BACKEND",
+                        "coordinates": [0, 0],
+                        "details": {},
+                    }
+                    for a in day.activities
+                ],
+            })
+            added.append(number)
+        if added:
+            itinerary.sort(key=lambda item: (_to_number(item.get("day")) or 0) if isinstance(item, dict) else 0)
+        return added
+
+    def to_handoff(self):
+        """Compact, line-per-item summary used as the budget task's {trip_details}."""
+        lines = []
+        if self.route.order:
+            stops = [f"{c}({self.route.nights[c]}n)" if c in self.route.nights else c for c in self.route.order]
+            lines.append(_join("ROUTE:", " > ".join(stops), f"| why: {self.route.rationale}" if self.route.rationale else ""))
+        if self.days:
+            lines.append("DAYS:")
+            for day in sorted(self.days, key=lambda d: d.day):
+                acts = "; ".join(
+                    _join(a.time, a.name, f"@{a.place}" if a.place and a.place != a.name else "",
+                          f"- {_short(a.description)}" if a.description else "")
+                    for a in day.activities
+                )
+                head = _join(f"D{day.day}", day.city, f"[{day.theme}]" if day.theme else "",
+                             f"(via {day.transport})" if day.transport else "")
+                lines.append(f"{head}: {acts}" if acts else head)
+        if self.hotels:
+            lines.append("HOTELS:")
+            for h in self.hotels:
+                extras = _join(h.city, h.rating, f"~{h.price_per_night}/night" if h.price_per_night else "",
+                               h.address, "/".join(h.amenities), sep=", ")
+                lines.append(_join(h.name, f"({extras})" if extras else ""))
+        if self.flights:
+            lines.append("FLIGHTS:")
+            for f in self.flights:
+                lines.append(_join(f.route, "/".join(f.airlines), f"~{f.price_estimate}" if f.price_estimate else "",
+                                   f.duration, sep=" | "))
+        for section, raw in self.unparsed.items():
+            lines.append(f"{section.upper()} (raw):\n{raw}")
+        return "\n".join(lines)
@@ -1,17 +1,16 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from crewai.flow import Flow
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# Import your crews here
-# from .crews.trip_crew.trip_crew import TripCrew
-# from .crews.expense_crew.expense_crew import ExpenseCrew
+# crewai/litellm are imported lazily (see pipeline.py) and warmed on a
+# background thread, so the worker accepts connections within a second.
 
 app = FastAPI()
 
-from typing import Union
+from typing import Literal, Union
 
 class TripRequest(BaseModel):
     destination: str
@@ -26,167 +25,121 @@ class TripRequest(BaseModel):
 def read_root():
     return {"message": "Ringmaster AI Engine is running"}
 
-from src.ringmaster_ai.crews.trip_crew.trip_crew import TripCrew
+from src.ringmaster_ai.pipeline import build_inputs, log_crash, run_trip_pipeline
+from src.ringmaster_ai.coalesce import SharedFlightError, plan_once
+from src.ringmaster_ai.admission import ADMISSION_DISABLED, AdmissionRejected, admitted, get_admission_controller
+from src.ringmaster_ai.jobs import JobManager, sse_stream
+from src.ringmaster_ai import metrics
+from src.ringmaster_ai.plan_cache import get_plan_cache
+from src.ringmaster_ai.warmup import WARMUP_ON_STARTUP, Warmup
+
+# Background jobs share one bounded pool so long plans never pin request threads
+job_manager = JobManager(run_trip_pipeline)
+warmup = Warmup()
+
+def _collect_job_metrics():
+    samples = [({"status": status}, count) for status, count in job_manager.status_counts().items()]
+    return [("plan_jobs", "gauge", "Background plan jobs currently tracked, by status.", samples)]
+
+metrics.REGISTRY.register_collector(_collect_job_metrics)
+
+@app.on_event("startup")
+def start_warmup():
+    if WARMUP_ON_STARTUP:
+        warmup.start()
+    else:
+        # Requests build the registry lazily; nothing to wait for
+        warmup.skip()
+
+@app.on_event("shutdown")
+def shutdown_jobs():
+    job_manager.shutdown()
+
+@app.get("/ready")
+def ready():
+    # Liveness is "/"; readiness waits for the crew registry to be warm
+    return JSONResponse(warmup.snapshot(), status_code=200 if warmup.ready else 503)
+
+Priority = Literal["interactive", "batch"]
+
+def _too_busy(rejected):
+    return HTTPException(status_code=429, detail=str(rejected), headers={"Retry-After": str(rejected.retry_after)})
 
 @app.post("/plan-trip")
-def plan_trip(request: TripRequest):
-    inputs = {
-        'destination': request.destination,
-        'destinations': request.destination,
-        'origin': request.origin,
-        'days': str(request.days),
-        'travel_style': request.travel_style,
-        'budget': request.budget,
-        'travelers': str(request.travelers),
-        'current_date': request.current_date
-    }
-    
+def plan_trip(request: TripRequest, priority: Priority = "interactive"):
+    inputs = build_inputs(request)
+
+    def run_admitted(inputs):
+        # Only the request that runs the pipeline takes a slot; joiners just wait for it
+        with admitted(priority):
+            return run_trip_pipeline(inputs)
+
     import traceback
-    import time
+    metrics.PLAN_TRIP_IN_FLIGHT.inc()
     try:
-        # STAGE 1: Feasibility Check
-        print(f"--- Starting Feasibility Check for {inputs['destination']} ---")
-        feasibility_result = TripCrew().feasibility_crew().kickoff(inputs=inputs)
-        
-        # Parse Feasibility Result
-        fe_output = feasibility_result.raw if hasattr(feasibility_result, 'raw') else str(feasibility_result)
-        
-        import json
-        import re
-        
-        # Helper to extract JSON
-        def extract_json(text):
-            match = re.search(r'```json\s*(\{.*?\})\s*```', text, re.DOTALL)
-            if match: return match.group(1)
-            start = text.find('{')
-            end = text.rfind('}') + 1
-            if start != -1 and end != -1: return text[start:end]
-            return text
-
-        try:
-            fe_json = json.loads(extract_json(fe_output))
-            
-            # CHECK FEASIBILITY
-            if fe_json.get("is_feasible") is False:
-                print(f"--- Trip Rejected: {fe_json.get('message')} ---")
-                return fe_json # Return early
-                
-        except json.JSONDecodeError:
-            print("Warning: Could not parse feasibility result. Proceeding with caution.")
-            
-        # STAGE 2: Logistics (Route, Itinerary, Enrichment, Hotels, Flights)
-        print("--- Feasibility Passed. Starting Logistics Planning... ---")
-        time.sleep(2) # Rate Limit Buffer
-        
-        logistics_result = TripCrew().logistics_crew().kickoff(inputs=inputs)
-        logistics_output = logistics_result.raw if hasattr(logistics_result, 'raw') else str(logistics_result)
-        
-        # STAGE 3: Budget Finalization (With Rate Limit Delay)
-        print("--- Logistics Planned. Cooling down for 60s to avoid Rate Limits... ---")
-        time.sleep(60) # Critical delay for Groq TPM reset (Safe buffer)
-        
-        print("--- Starting Budget Finalization... ---")
-        # Reuse original inputs but add 'trip_details'
-        budget_inputs = {
-            'destination': inputs['destination'],
-            'origin': inputs['origin'],
-            'days': inputs['days'],
-            'budget': inputs['budget'],
-            'travelers': inputs['travelers'],
-            'travel_style': inputs['travel_style'],
-            'current_date': inputs.get('current_date', '2025-01-01'),
-            'trip_details': logistics_output
-        }
-        
-        result = TripCrew().budget_crew().kickoff(inputs=budget_inputs)
-        
+        # Identical requests already in flight share that pipeline's result
+        result, shared = plan_once(inputs, run_admitted)
+        if shared:
+            print(f"--- Plan for {request.destination} shared with an identical in-flight request ---")
+        return result
+    except AdmissionRejected as e:
+        raise _too_busy(e)
+    except SharedFlightError as e:
+        if isinstance(e.__cause__, AdmissionRejected):
+            raise _too_busy(e.__cause__)
+        # The request that ran the pipeline has already logged the crash
+        raise HTTPException(status_code=500, detail=f"TripCrew Execution Error: {str(e)}")
     except Exception as e:
         error_trace = traceback.format_exc()
         print(f"Error during TripCrew execution: {error_trace}")
-        
+
         # Log to file
-        import os
-        log_path = os.path.join(os.getcwd(), "crash.log")
-        with open(log_path, "a") as f:
-            f.write(f"\n--- Error at {request.current_date} ---\n")
-            f.write(error_trace)
-            f.write("\n-----------------------------------\n")
-            
-        from fastapi import HTTPException
+        log_crash(request.current_date, error_trace)
         raise HTTPException(status_code=500, detail=f"TripCrew Execution Error: {str(e)}")
-    
-    # Check if result is a raw string or json and format it
-    output = result.raw if hasattr(result, 'raw') else str(result)
-    
-    # Attempt to parse JSON if it looks like a string
-    import json
-    import re
-    
+    finally:
+        metrics.PLAN_TRIP_IN_FLIGHT.dec()
+
+@app.get("/metrics")
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/plan-trip/cache/stats")
+def plan_cache_stats():
+    return get_plan_cache().stats()
+
+@app.get("/plan-trip/admission")
+def admission_stats():
+    return {"disabled": True} if ADMISSION_DISABLED else get_admission_controller().snapshot()
+
+@app.post("/plan-trip/jobs", status_code=202)
+def create_plan_job(request: TripRequest, priority: Priority = "interactive"):
     try:
-        # robust extraction of JSON
-        import re
-        json_match = re.search(r'```json\s*(\{.*?\})\s*```', output, re.DOTALL)
-        if json_match:
-            cleaned_output = json_match.group(1)
-        else:
-            # Fallback: try to find the outer-most JSON object manually
-            start = output.find('{')
-            end = output.rfind('}') + 1
-            if start != -1 and end != -1:
-                cleaned_output = output[start:end]
-            else:
-                cleaned_output = output
-
-        parsed_json = json.loads(cleaned_output)
-        
-        # Post-processing: Fetch images if missing
-        import requests
-        import os
-        
-        serper_key = os.getenv("SERPER_API_KEY")
-        
-        def fetch_image_from_serper(query):
-            if not serper_key:
-                return None
-            try:
-                url = "https://google.serper.dev/images"
-                payload = json.dumps({"q": query, "num": 1})
-                headers = {
-                    'X-API-KEY': serper_key,
-                    'Content-Type': 'application/json'
-                }
-                response = requests.request("POST", url, headers=headers, data=payload)
-                data = response.json()
-                if "images" in data and len(data["images"]) > 0:
-                    return data["images"][0]["imageUrl"]
-            except Exception as e:
-                print(f"Error fetching image for {query}: {str(e)}")
-            return None
-
-        # 1. Update Hotels
-        if "hotels" in parsed_json:
-            for hotel in parsed_json["hotels"]:
-                if not hotel.get("image_url") or "LEAVE_EMPTY" in hotel.get("image_url", ""):
-                    # Search query: Hotel Name + Destination + "hotel"
-                    query = f'{hotel.get("name")} {parsed_json.get("destination")} hotel property'
-                    img = fetch_image_from_serper(query)
-                    if img:
-                        hotel["image_url"] = img
-
-        # 2. Update Itinerary Activities
-        if "itinerary" in parsed_json:
-            for day in parsed_json["itinerary"]:
-                if "activities" in day:
-                    for activity in day["activities"]:
-                        if not activity.get("image_url") or "LEAVE_EMPTY" in activity.get("image_url", ""):
-                            # Search query: Activity Name + Destination
-                            query = f'{activity.get("activity")} {parsed_json.get("destination")}'
-                            img = fetch_image_from_serper(query)
-                            if img:
-                                activity["image_url"] = img
-
-        return parsed_json
-    except json.JSONDecodeError:
-        print("Failed to parse JSON directly. Returning raw output.")
-        return {"raw_output": output, "error": "Failed to parse JSON"}
+        # Turned away now rather than failed after a long queue
+        job = job_manager.submit(build_inputs(request), priority)
+    except AdmissionRejected as e:
+        raise _too_busy(e)
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/plan-trip/jobs/{job.id}",
+        "events_url": f"/plan-trip/jobs/{job.id}/events"
+    }
+
+def _get_job_or_404(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+@app.get("/plan-trip/jobs/{job_id}")
+def get_plan_job(job_id: str):
+    return _get_job_or_404(job_id).snapshot()
 
+@app.get("/plan-trip/jobs/{job_id}/events")
+def stream_plan_job(job_id: str):
+    job = _get_job_or_404(job_id)
+    return StreamingResponse(
+        sse_stream(job),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
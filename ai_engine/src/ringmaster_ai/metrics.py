@@ -0,0 +1,270 @@
+import bisect
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; wide enough for both tool calls (ms) and whole stages (minutes).
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels_text(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {labels}")
+        return tuple(str(v) for v in labels)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_labels_text(self.labelnames, k)} {_number(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels, value):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, *labels, value):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # Per-bucket (non-cumulative) counts; summed up at render time
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def time(self, *labels):
+        return _Timer(self, labels)
+
+    def render(self):
+        with self._lock:
+            items = sorted((k, (list(counts), total)) for k, (counts, total) in self._values.items())
+        lines = self.header()
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{_number(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_labels_text(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels_text(self.labelnames, key)} {_number(round(total, 6))}")
+            lines.append(f"{self.name}_count{_labels_text(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(*self.labels, value=time.perf_counter() - self.started)
+
+
+class Registry:
+    """
+    Minimal Prometheus registry: metrics updated in place, plus collectors.
+
+    Updates are a dict lookup under a per-metric lock, so instrumenting hot
+    paths is cheap. Collectors are called only at scrape time and turn state
+    the engine already keeps (key scheduler, caches, job table) into samples,
+    each returning [(name, kind, help, [(labels_dict, value), ...]), ...].
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._add(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._add(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collect):
+        with self._lock:
+            self._collectors.append(collect)
+
+    def render(self):
+        with self._lock:
+            metrics, collectors = list(self._metrics), list(self._collectors)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for collect in collectors:
+            try:
+                families = collect()
+            except Exception as e:
+                print(f"Metrics collector {getattr(collect, '__name__', collect)} failed: {e}")
+                continue
+            for name, kind, documentation, samples in families:
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels_text(labels.keys(), labels.values())} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_DURATION = REGISTRY.histogram(
+    "plan_stage_duration_seconds", "Wall time of each trip pipeline stage.", ("stage",))
+STAGE_OUTCOMES = REGISTRY.counter(
+    "plan_stage_total", "Pipeline stages by final status (completed, skipped, cached).", ("stage", "status"))
+PLAN_TRIP_IN_FLIGHT = REGISTRY.gauge(
+    "plan_trip_in_flight", "Synchronous /plan-trip requests currently running.")
+PLAN_TRIP_IN_FLIGHT.set(value=0)
+PLAN_ADMISSION_WAIT = REGISTRY.histogram(
+    "plan_admission_wait_seconds", "Time plan pipelines spent queued for admission, by priority.", ("priority",))
+PLAN_ADMISSION_REJECTED = REGISTRY.counter(
+    "plan_admission_rejected_total", "Plan requests turned away by admission control, by priority and reason.",
+    ("priority", "reason"))
+PLAN_COALESCED = REGISTRY.counter(
+    "plan_coalesced_requests_total", "/plan-trip requests answered by an identical in-flight pipeline, by outcome.",
+    ("outcome",))
+PLAN_COALESCED_LLM_CALLS_SAVED = REGISTRY.counter(
+    "plan_coalesced_llm_calls_saved_total", "LLM calls not made because requests joined an in-flight pipeline.")
+
+LLM_CALL_DURATION = REGISTRY.histogram(
+    "llm_call_duration_seconds", "LLM call latency per agent and task, including key waits and 429 retries.",
+    ("agent", "task", "model"))
+LLM_CALLS = REGISTRY.counter(
+    "llm_calls_total", "LLM calls per agent and task by outcome.", ("agent", "task", "outcome"))
+LLM_PROMPT_TOKENS = REGISTRY.counter(
+    "llm_prompt_tokens_total", "Prompt tokens reported by the provider.", ("agent", "task"))
+LLM_COMPLETION_TOKENS = REGISTRY.counter(
+    "llm_completion_tokens_total", "Completion tokens reported by the provider.", ("agent", "task"))
+
+LLM_TIER_CALL_DURATION = REGISTRY.histogram(
+    "llm_tier_call_duration_seconds", "Latency of each routed attempt per model tier and task.", ("tier", "task"))
+LLM_TIER_CALLS = REGISTRY.counter(
+    "llm_tier_calls_total", "Routed attempts per model tier and task by outcome (valid, invalid, error).",
+    ("tier", "task", "outcome"))
+LLM_ESCALATIONS = REGISTRY.counter(
+    "llm_escalations_total", "Calls re-run on the large tier because the small tier's answer failed.",
+    ("task", "reason"))
+
+# Tally of the block running count_llm_calls(); task graph workers inherit the context.
+_call_tally = contextvars.ContextVar("llm_call_tally", default=None)
+
+
+class CallTally:
+    def __init__(self):
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def add(self):
+        with self._lock:
+            self.calls += 1
+
+
+@contextmanager
+def count_llm_calls():
+    """Count the LLM calls made inside the block, including those of worker threads it starts."""
+    tally = CallTally()
+    token = _call_tally.set(tally)
+    try:
+        yield tally
+    finally:
+        _call_tally.reset(token)
+
+
+def count_llm_call():
+    tally = _call_tally.get()
+    if tally is not None:
+        tally.add()
+
+
+TOOL_CALL_DURATION = REGISTRY.histogram(
+    "tool_call_duration_seconds", "Tool latency, split by whether the tool cache answered.", ("tool", "cache"))
+
+
+def observe_progress(on_progress):
+    """Wrap a pipeline progress callback so stage transitions feed STAGE_DURATION."""
+    started = {}
+
+    def progress(stage, status, payload=None):
+        if status == "running":
+            started[stage] = time.perf_counter()
+        elif status in ("completed", "skipped", "cached"):
+            if stage in started:
+                STAGE_DURATION.observe(stage, value=time.perf_counter() - started.pop(stage))
+            STAGE_OUTCOMES.inc(stage, status)
+        on_progress(stage, status, payload)
+    return progress
+
+
+def render():
+    return REGISTRY.render()
@@ -0,0 +1,117 @@
+import os
+import time
+from typing import Dict
+
+from pydantic import ValidationError
+
+from src.ringmaster_ai.json_extract import JSONExtractionError, parse_json
+from src.ringmaster_ai.logistics_ir import DayPlan, FlightOption, HotelOption, RoutePlan
+from src.ringmaster_ai.metrics import LLM_ESCALATIONS, LLM_TIER_CALL_DURATION, LLM_TIER_CALLS
+from src.ringmaster_ai.scheduled_llm import ScheduledLLM, _call_labels
+
+# Send every call to the large tier, e.g. to compare against routed runs.
+MODEL_ROUTER_DISABLED = os.getenv("MODEL_ROUTER_DISABLED", "").lower() in ("1", "true", "yes")
+
+TIERS = ("small", "large")
+
+
+def _route(data):
+    if not RoutePlan.model_validate(data).order:
+        raise ValueError("route without an order")
+
+
+def _days(data):
+    days = [DayPlan.model_validate(d) for d in data["days"]]
+    if not days or not all(d.activities for d in days):
+        raise ValueError("no days, or a day without activities")
+
+
+def _items(key, model):
+    def check(data):
+        if not [model.model_validate(item) for item in data[key]]:
+            raise ValueError(f"no {key}")
+    return check
+
+
+# Output checks for tasks a small model may answer; the shapes are the
+# logistics IR's, so an answer that passes here also parses downstream.
+TASK_SCHEMAS = {
+    "identify_optimal_route_task": _route,
+    "plan_multi_city_itinerary_task": _days,
+    "enrichment_task": _days,
+    "city_days_task": _days,
+    "hotel_task": _items("hotels", HotelOption),
+    "flight_task": _items("flights", FlightOption),
+}
+
+
+def schema_error(task, text):
+    """Why `text` is not a usable answer to `task` ("unparseable" or "schema"), or None."""
+    check = TASK_SCHEMAS.get(task)
+    if check is None:
+        return None
+    try:
+        data = parse_json(text)
+    except JSONExtractionError:
+        return "unparseable"
+    if isinstance(data, dict) and data.get("is_feasible") is False:
+        # Tasks pass an infeasible trip's error JSON through unchanged
+        return None
+    try:
+        check(data)
+    except (ValidationError, KeyError, TypeError, ValueError):
+        return "schema"
+    return None
+
+
+class RoutedLLM(ScheduledLLM):
+    """
+    ScheduledLLM that picks a model tier per task, as configured in agents.yaml.
+
+    An agent's `tier` applies to all its tasks unless `task_tiers` names
+    another one. Small-tier answers to tasks in TASK_SCHEMAS are validated,
+    and a call that fails or whose answer does not match is re-run once on
+    the large tier. Every attempt lands in the llm_tier_* metrics and every
+    re-run in llm_escalations_total, which is what the routing table is
+    tuned from.
+    """
+
+    tier_models: Dict[str, str] = {}
+    tier: str = "large"
+    task_tiers: Dict[str, str] = {}
+
+    def tier_for(self, task):
+        if MODEL_ROUTER_DISABLED:
+            return "large"
+        return self.task_tiers.get(task, self.tier)
+
+    def _attempt(self, tier, task, messages, args, kwargs):
+        """(answer, schema_error) of one call on `tier`."""
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = self._call_model(self.tier_models.get(tier, self.model), messages, args, kwargs)
+            # Tool calls come back as lists; only text answers are checked
+            reason = schema_error(task, result) if isinstance(result, str) else None
+            outcome = "invalid" if reason else "valid"
+            return result, reason
+        finally:
+            LLM_TIER_CALL_DURATION.observe(tier, task, value=time.perf_counter() - started)
+            LLM_TIER_CALLS.inc(tier, task, outcome)
+
+    def call(self, messages, *args, **kwargs):
+        _, task = _call_labels(args, kwargs)
+        tier = self.tier_for(task)
+        if tier == "large":
+            return self._attempt("large", task, messages, args, kwargs)[0]
+        try:
+            result, reason = self._attempt(tier, task, messages, args, kwargs)
+        except Exception as e:
+            result, reason = None, "error"
+            print(f"Model router: {tier} tier failed on {task} ({type(e).__name__}); escalating.")
+        if reason is None:
+            return result
+        if reason != "error":
+            print(f"Model router: {tier} tier answer to {task} is {reason}; escalating.")
+        LLM_ESCALATIONS.inc(task, reason)
+        return self._attempt("large", task, messages, args, kwargs)[0]
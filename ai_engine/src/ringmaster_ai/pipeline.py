@@ -0,0 +1,278 @@
+import os
+import re
+
+from src.ringmaster_ai.fanout import (
+    chunked_ir, collect_days, missing_days, plan_windows, repair_windows, window_inputs,
+)
+from src.ringmaster_ai.feasibility import evaluate_feasibility
+from src.ringmaster_ai.gazetteer import fill_coordinates
+from src.ringmaster_ai.json_extract import JSONExtractionError, parse_json
+from src.ringmaster_ai.key_scheduler import estimate_tokens
+from src.ringmaster_ai.logistics_ir import LogisticsIR
+from src.ringmaster_ai.metrics import STAGE_DURATION, observe_progress
+from src.ringmaster_ai.plan_cache import get_plan_cache, split_destinations
+from src.ringmaster_ai.tools.image_resolver import enrich_plan_images
+from src.ringmaster_ai.tools.weather import format_trip_weather, get_weather_service, parse_trip_date
+
+# Stage names, in execution order. Progress callbacks receive one of these.
+STAGES = ("feasibility", "logistics", "budget")
+
+
+def build_inputs(request):
+    """Flatten a TripRequest into the inputs dict the crews interpolate."""
+    return {
+        'destination': request.destination,
+        'destinations': request.destination,
+        'origin': request.origin,
+        'days': str(request.days),
+        'travel_style': request.travel_style,
+        'budget': request.budget,
+        'travelers': str(request.travelers),
+        'current_date': request.current_date
+    }
+
+
+def log_crash(current_date, error_trace):
+    """Append a traceback to crash.log in the working directory."""
+    log_path = os.path.join(os.getcwd(), "crash.log")
+    with open(log_path, "a") as f:
+        f.write(f"\n--- Error at {current_date} ---\n")
+        f.write(error_trace)
+        f.write("\n-----------------------------------\n")
+
+
+def trip_weather_text(inputs):
+    """Weather for every destination over the trip dates, one line per city."""
+    match = re.search(r"\d+", str(inputs.get("days", "")))
+    try:
+        report = get_weather_service().trip_weather(
+            split_destinations(inputs["destination"]), inputs.get("current_date"), int(match.group()) if match else 1)
+        return format_trip_weather(report) or "Not available; assume typical weather for the season."
+    except Exception as e:
+        print(f"Weather lookup failed ({e}); the enrichment agent will assume seasonal weather.")
+        return "Not available; assume typical weather for the season."
+
+
+def plan_route(inputs):
+    """Visiting order optimised locally instead of by the LLM; `text` is what the agents see."""
+    # Imported here: numpy adds ~120ms to importing main
+    from src.ringmaster_ai.route_optimizer import format_route, optimize_route
+
+    destinations = inputs.get("destinations") or inputs["destination"]
+    try:
+        route = optimize_route(destinations, inputs.get("origin"))
+    except Exception as e:
+        print(f"Route optimisation failed ({e}); keeping the requested order.")
+        route = {"order": split_destinations(destinations), "origin": None, "method": "as_requested",
+                 "weight": None, "km": None, "cost": None}
+    route["text"] = format_route(route)
+    print(f"--- Route ({route['method']}): {route['text']} ---")
+    return route
+
+
+def trip_facts(inputs, cities):
+    """Curated facts on `cities` matching the travel style and trip month, for the agents' prompts."""
+    # Imported here for numpy, as in plan_route()
+    from src.ringmaster_ai.retrieval import NO_FACTS, local_facts
+
+    try:
+        month = parse_trip_date(inputs.get("current_date"))
+        return local_facts(cities, f"{inputs.get('travel_style', '')} {month:%B %b %Y}")
+    except Exception as e:
+        print(f"Fact retrieval failed ({e}); the agents will rely on their own knowledge.")
+        return NO_FACTS
+
+
+def logistics_inputs(inputs, route=None):
+    """Request inputs plus what the logistics tasks need precomputed: weather, route order, local facts."""
+    route = route or plan_route(inputs)
+    return dict(inputs, weather=trip_weather_text(inputs), route_order=route["text"],
+                local_facts=trip_facts(inputs, route["order"]))
+
+
+def _window_weather(window):
+    return trip_weather_text({"destination": window["city"], "current_date": window["start_date"],
+                              "days": window["days"]})
+
+
+def _window_inputs(window, inputs, previous_place=None):
+    """window_inputs() plus the window's own weather and facts on its city alone."""
+    return dict(window_inputs(window, _window_weather(window), previous_place),
+                local_facts=trip_facts(dict(inputs, current_date=window["start_date"]), [window["city"]]))
+
+
+def run_logistics(trip_crew, inputs):
+    """
+    Run the logistics stage and return (tasks_output, LogisticsIR).
+
+    Multi-city and long trips are planned in day windows: the days are split
+    over the cities in route order and into windows of a few days, and every
+    window is written by its own sub-crew, concurrently with the hotel and
+    flight tasks. The only context a window shares is its city and where the
+    day before it ends. Days a window failed to produce are regenerated on
+    their own (not the whole trip) before the windows are assembled with
+    transit stitched in. Other trips run the route -> itinerary -> enrichment
+    chain.
+    """
+    route = plan_route(inputs)
+    shared = logistics_inputs(inputs, route)
+    windows = plan_windows(route, inputs)
+    if not windows:
+        result = trip_crew.logistics_graph().kickoff(inputs=shared)
+        return result.tasks_output, LogisticsIR.from_tasks_output(result.tasks_output)
+
+    split = ", ".join(f"{w['city']} D{w['first_day']}-{w['last_day']}" for w in windows)
+    print(f"--- Chunked plan: {len(windows)} day windows in parallel ({split}) ---")
+    per_window = [_window_inputs(w, inputs) for w in windows]
+    result = trip_crew.logistics_windows_graph(len(windows)).kickoff(
+        inputs=shared, task_inputs=per_window + [None, None])
+    tasks_output = list(result.tasks_output)
+    planned = collect_days(windows, [t.raw for t in tasks_output[:len(windows)]])
+
+    missing = missing_days(windows, planned)
+    if missing:
+        repairs = repair_windows(windows, missing, planned)
+        print(f"--- Chunked plan: regenerating {len(missing)} missing days in {len(repairs)} windows ---")
+        retry = trip_crew.logistics_windows_graph(len(repairs), with_shared_tasks=False).kickoff(
+            inputs=shared, task_inputs=[_window_inputs(w, inputs, w["previous_place"]) for w in repairs])
+        collect_days(repairs, [t.raw for t in retry.tasks_output], planned)
+        tasks_output += retry.tasks_output
+        still = missing_days(windows, planned)
+        if still:
+            print(f"--- Chunked plan: days {still} still missing; they are left open ---")
+
+    return tasks_output, chunked_ir(route, windows, planned, result.tasks_output[len(windows):])
+
+
+def _raw(result):
+    return result.raw if hasattr(result, 'raw') else str(result)
+
+
+def _noop_progress(stage, status, payload=None):
+    pass
+
+
+def run_trip_pipeline(inputs, on_progress=None):
+    """
+    Run feasibility -> logistics -> budget for one trip and return the final dict.
+
+    `on_progress(stage, status, payload)` is called as each stage starts
+    ("running") and finishes ("completed" with the stage's partial result, or
+    "skipped" when an earlier stage short-circuits the trip, or "cached" when
+    the plan cache answers for it). Exceptions from the crews propagate to the
+    caller.
+    """
+    # Imported here so importing this module (and main) stays free of crewai
+    from src.ringmaster_ai.crews.trip_crew.trip_crew import TripCrew
+
+    progress = observe_progress(on_progress or _noop_progress)
+
+    # STAGE 1: Feasibility Check
+    print(f"--- Starting Feasibility Check for {inputs['destination']} ---")
+    progress("feasibility", "running")
+    # Plain arithmetic over bundled fare/distance tables; the LLM crew is only
+    # needed when a place can't be resolved locally
+    fe_json = evaluate_feasibility(inputs)
+    if fe_json is None:
+        print("--- Destination not in local tables. Running Feasibility Crew... ---")
+        feasibility_result = TripCrew().feasibility_crew().kickoff(inputs=inputs)
+
+        # Parse Feasibility Result
+        fe_output = _raw(feasibility_result)
+        try:
+            fe_json = parse_json(fe_output)
+        except JSONExtractionError:
+            print("Warning: Could not parse feasibility result. Proceeding with caution.")
+            fe_json = {"raw_output": fe_output}
+
+    # CHECK FEASIBILITY
+    if fe_json.get("is_feasible") is False:
+        print(f"--- Trip Rejected: {fe_json.get('message')} ---")
+        progress("feasibility", "completed", fe_json)
+        progress("logistics", "skipped")
+        progress("budget", "skipped")
+        return fe_json # Return early
+    progress("feasibility", "completed", fe_json)
+
+    # Feasibility above used the exact budget; only now may a shared plan be reused
+    plan_cache = get_plan_cache()
+    cached_plan = plan_cache.get(inputs)
+    if cached_plan is not None:
+        print(f"--- Plan cache hit for {inputs['destination']}. Skipping Logistics and Budget. ---")
+        progress("logistics", "cached")
+        progress("budget", "cached", cached_plan)
+        return cached_plan
+
+    # STAGE 2: Logistics (Route, Itinerary, Enrichment, Hotels, Flights)
+    print("--- Feasibility Passed. Starting Logistics Planning... ---")
+    progress("logistics", "running")
+
+    # Weather and the visiting order are resolved locally, so the agents only write around them
+    tasks_output, logistics_ir = run_logistics(TripCrew(), inputs)
+    # Only a compact rendering of the typed result goes on to the budget agent,
+    # instead of every logistics agent's prose
+    logistics_output = logistics_ir.to_handoff()
+    # Same ~4 chars/token estimate the key scheduler budgets with
+    handoff_tokens = {
+        "raw": estimate_tokens("\n\n".join(t.raw for t in tasks_output)),
+        "compact": estimate_tokens(logistics_output),
+    }
+    print(f"--- Budget hand-off: ~{handoff_tokens['raw']} tokens of logistics output -> ~{handoff_tokens['compact']} tokens ---")
+    progress("logistics", "completed", {"logistics": logistics_ir.model_dump(exclude_defaults=True), "handoff_tokens": handoff_tokens})
+
+    # STAGE 3: Budget Finalization
+    # No cooldown: the key scheduler only waits when every Groq key is out of budget
+    progress("budget", "running")
+    print("--- Logistics Planned. Starting Budget Finalization... ---")
+    # Reuse original inputs but add 'trip_details'
+    budget_inputs = {
+        'destination': inputs['destination'],
+        'origin': inputs['origin'],
+        'days': inputs['days'],
+        'budget': inputs['budget'],
+        'travelers': inputs['travelers'],
+        'travel_style': inputs['travel_style'],
+        'current_date': inputs.get('current_date', '2025-01-01'),
+        'trip_details': logistics_output
+    }
+
+    result = TripCrew().budget_crew().kickoff(inputs=budget_inputs)
+    usage = getattr(result, "token_usage", None)
+    if usage is not None:
+        print(f"--- Budget stage used {usage.prompt_tokens} prompt / {usage.completion_tokens} completion tokens ---")
+    final = finalize_output(_raw(result), logistics_ir, inputs['days'])
+    plan_cache.put(inputs, final)
+    progress("budget", "completed", final)
+    return final
+
+
+def finalize_output(output, logistics_ir=None, days=None):
+    """
+    Parse the budget crew's answer and back-fill missing days (from the
+    logistics plan), coordinates and missing images.
+    """
+    try:
+        parsed_json = parse_json(output)
+    except JSONExtractionError:
+        print("Failed to parse JSON directly. Returning raw output.")
+        return {"raw_output": output, "error": "Failed to parse JSON"}
+
+    # Post-processing: days the budget agent dropped come from the logistics plan, not a re-run
+    if logistics_ir is not None and days is not None:
+        filled = logistics_ir.fill_itinerary(parsed_json, days)
+        if filled:
+            print(f"--- Itinerary: days {filled} missing from the budget output, filled from the logistics plan ---")
+
+    # Post-processing: coordinates from the bundled gazetteer instead of the LLM's guesses
+    with STAGE_DURATION.time("coordinates"):
+        placed = fill_coordinates(parsed_json)
+    if placed:
+        print(f"--- Coordinates: {placed.get('filled', 0)} filled, {placed.get('corrected', 0)} corrected, "
+              f"{placed.get('kept', 0)} kept, {placed.get('unresolved', 0)} unresolved ---")
+
+    # Post-processing: Fetch images if missing (one deduplicated, concurrent batch)
+    with STAGE_DURATION.time("image_enrichment"):
+        enrich_plan_images(parsed_json)
+
+    return parsed_json
+
@@ -0,0 +1,160 @@
+import copy
+import math
+import os
+import re
+import threading
+import unicodedata
+from datetime import datetime
+
+from src.ringmaster_ai.metrics import REGISTRY
+from src.ringmaster_ai.tools.cache import MISS, ToolCache, cache_key, cache_metric_families
+
+PLAN_CACHE_PATH = os.getenv("PLAN_CACHE_PATH", os.path.join(os.getcwd(), ".cache", "plan_cache.sqlite3"))
+PLAN_CACHE_TTL = int(os.getenv("PLAN_CACHE_TTL", str(24 * 3600)))
+PLAN_CACHE_MAX_ENTRIES = int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "2000"))
+PLAN_CACHE_MEMORY_ITEMS = int(os.getenv("PLAN_CACHE_MEMORY_ITEMS", "200"))
+PLAN_CACHE_DISABLED = os.getenv("PLAN_CACHE_DISABLED", "").lower() in ("1", "true", "yes")
+# Budgets within one geometric step (x1.25, i.e. roughly +/-12%) share a plan.
+BUDGET_BUCKET_RATIO = 1.25
+
+NAMESPACE = "plan"
+
+
+def normalize_place(name):
+    """'  São Paulo ' -> 'sao paulo'."""
+    text = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode("ascii")
+    return " ".join(re.sub(r"[^\w\s-]", " ", text.lower()).split())
+
+
+def split_destinations(destination):
+    """'Jaipur, Udaipur and Jodhpur' -> ['Jaipur', 'Udaipur', 'Jodhpur'] (order kept)."""
+    parts = re.split(r",|;|/|->|\band\b|&", str(destination), flags=re.IGNORECASE)
+    return [p.strip() for p in parts if p.strip()]
+
+
+def normalize_destinations(destination):
+    """Multi-city destination as a sorted tuple of normalised city names."""
+    return tuple(sorted({normalize_place(p) for p in split_destinations(destination) if normalize_place(p)}))
+
+
+def parse_amount(value):
+    """'50,000 INR' / '50k' / 50000 -> 50000.0 (None if there is no number)."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).lower().replace(",", "")
+    match = re.search(r"(\d+(?:\.\d+)?)\s*(k|l|lakh|lakhs)?\b", text)
+    if not match:
+        return None
+    amount = float(match.group(1))
+    unit = match.group(2)
+    if unit == "k":
+        amount *= 1_000
+    elif unit:
+        amount *= 100_000
+    return amount
+
+
+def budget_bucket(budget):
+    """Index of the geometric budget range the amount falls into."""
+    amount = parse_amount(budget)
+    if not amount or amount <= 0:
+        return None
+    return int(math.floor(math.log(amount) / math.log(BUDGET_BUCKET_RATIO)))
+
+
+def travel_month(current_date):
+    for fmt in ("%Y-%m-%d", "%Y-%m-%dT%H:%M:%S", "%d-%m-%Y", "%Y/%m/%d"):
+        try:
+            return datetime.strptime(str(current_date)[:19], fmt).strftime("%Y-%m")
+        except ValueError:
+            continue
+    return str(current_date)[:7]
+
+
+def canonical_request(inputs):
+    """The fields that decide whether two trip requests can share one plan."""
+    return {
+        "destinations": list(normalize_destinations(inputs.get("destination", ""))),
+        "origin": normalize_place(inputs.get("origin", "")),
+        "budget_bucket": budget_bucket(inputs.get("budget")),
+        "travelers": str(inputs.get("travelers", "1")).strip(),
+        "days": str(inputs.get("days", "")).strip(),
+        "travel_style": normalize_place(inputs.get("travel_style", "")),
+        "month": travel_month(inputs.get("current_date", "")),
+    }
+
+
+def exact_request(inputs):
+    """
+    canonical_request() without the sharing tolerances: the exact budget and
+    date and the cities in the order given, i.e. requests whose pipelines
+    would do the same work.
+    """
+    request = canonical_request(inputs)
+    del request["budget_bucket"], request["month"]
+    request.update(
+        destinations=[normalize_place(p) for p in split_destinations(inputs.get("destination", ""))],
+        budget=parse_amount(inputs.get("budget")) or str(inputs.get("budget", "")).strip().lower(),
+        current_date=str(inputs.get("current_date", "")).strip(),
+    )
+    return request
+
+
+def is_cacheable_plan(plan):
+    return isinstance(plan, dict) and "error" not in plan and "raw_output" not in plan and bool(plan.get("itinerary"))
+
+
+class PlanCache:
+    """
+    Final itineraries keyed by canonical_request().
+
+    Only the fully post-processed plan is stored. Feasibility is not part of
+    the key: the pipeline still checks the exact budget before consulting the
+    cache, so a cached plan is never served to a trip that would be rejected.
+    """
+
+    def __init__(self, path=PLAN_CACHE_PATH, ttl=PLAN_CACHE_TTL, max_entries=PLAN_CACHE_MAX_ENTRIES,
+                 memory_items=PLAN_CACHE_MEMORY_ITEMS):
+        self.ttl = ttl
+        self.store = ToolCache(path, memory_items=memory_items, disk_items=max_entries)
+
+    def key(self, inputs):
+        return cache_key(canonical_request(inputs))
+
+    def get(self, inputs):
+        if PLAN_CACHE_DISABLED:
+            return None
+        plan = self.store.get(NAMESPACE, self.key(inputs))
+        # Callers mutate plans (images, coordinates); never hand out the stored object
+        return None if plan is MISS else copy.deepcopy(plan)
+
+    def put(self, inputs, plan):
+        if PLAN_CACHE_DISABLED or not is_cacheable_plan(plan):
+            return False
+        self.store.set(NAMESPACE, self.key(inputs), copy.deepcopy(plan), self.ttl)
+        return True
+
+    def stats(self):
+        stats = self.store.stats().get(NAMESPACE, {"hits": 0, "misses": 0, "writes": 0, "hit_rate": 0.0})
+        return dict(stats, ttl_s=self.ttl, max_entries=self.store.disk_items, memory_entries=len(self.store))
+
+
+_plan_cache = None
+_plan_cache_lock = threading.Lock()
+
+
+def get_plan_cache():
+    global _plan_cache
+    with _plan_cache_lock:
+        if _plan_cache is None:
+            _plan_cache = PlanCache()
+        return _plan_cache
+
+
+def _collect_plan_cache():
+    if _plan_cache is None:
+        return []
+    return cache_metric_families("plan_cache", {NAMESPACE: _plan_cache.store.stats().get(NAMESPACE, {})})
+
+
+REGISTRY.register_collector(_collect_plan_cache)
@@ -0,0 +1,302 @@
+"""
+Offline BM25 index over curated destination facts, for grounding the agents.
+
+Build it from exported ExploreTrip documents (the editorial crew's per-city
+records: famous_for, trending_reason, weather, events), e.g.
+
+    python -m src.ringmaster_ai.retrieval --from explore_trips.json
+    python -m src.ringmaster_ai.retrieval --from-url http://localhost:5000/api/explore/trending --embeddings
+
+Every record becomes a few one-line facts. The index is a directory of
+.npy arrays (CSR postings, document lengths, per-city ranges and, with
+--embeddings, hashed character-trigram vectors) that is memory-mapped at
+startup, so loading costs nothing and workers share the pages.
+"""
+import argparse
+import json
+import math
+import os
+import re
+import threading
+import time
+import zlib
+from datetime import datetime
+
+import numpy as np
+
+from src.ringmaster_ai.plan_cache import normalize_place
+
+RETRIEVAL_INDEX_DIR = os.getenv("RETRIEVAL_INDEX_DIR", os.path.join(os.getcwd(), ".cache", "retrieval_index"))
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "4"))
+RETRIEVAL_DISABLED = os.getenv("RETRIEVAL_DISABLED", "").lower() in ("1", "true", "yes")
+# Okapi BM25 parameters.
+BM25_K1, BM25_B = 1.2, 0.75
+# Hashed character-trigram vectors: dimension, and their weight next to the
+# max-normalised BM25 score. They catch spelling variants BM25 misses.
+EMBEDDING_DIM = 256
+EMBEDDING_WEIGHT = 0.3
+FACT_MAX_CHARS = 180
+
+NO_FACTS = "None available; rely on your own knowledge."
+
+_STOPWORDS = frozenset("a an and are as at be by for from in into is it its of on or the to with".split())
+_ARRAYS = ("offsets", "doc_ids", "tfs", "doc_len", "text_offsets")
+
+
+def tokenize(text):
+    """Lowercase ASCII words without stopwords, crude plural folding ('forts' -> 'fort')."""
+    words = re.findall(r"[a-z0-9]+", normalize_place(text))
+    return [w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w
+            for w in words if w not in _STOPWORDS]
+
+
+def _date_text(value):
+    """'2026-02-25' -> '25 Feb 2026'; other formats pass through."""
+    try:
+        return datetime.strptime(str(value)[:10], "%Y-%m-%d").strftime("%d %b %Y").lstrip("0")
+    except ValueError:
+        return str(value)
+
+
+def record_facts(record):
+    """[(city key, fact), ...] for one exported ExploreTrip / editorial record."""
+    city = (record.get("destination") or "").strip()
+    if not city:
+        return []
+    month = record.get("month")
+    facts = []
+    if record.get("famous_for"):
+        # Not qualified by location/category: one record per category repeats it
+        facts.append(f"{city} is famous for {record['famous_for']}.")
+    if record.get("trending_reason"):
+        kind = f" for {record['category'].lower()}" if record.get("category") not in (None, "Other") else ""
+        where = f" ({record['location']})" if record.get("location") else ""
+        facts.append(f"{city}{where} is trending{kind}{' in ' + month if month else ''}: {record['trending_reason']}.")
+    weather = record.get("weather") or {}
+    if weather.get("temp") or weather.get("condition"):
+        facts.append(f"{city} weather{' in ' + month if month else ''}: "
+                     + ", ".join(str(v) for v in (weather.get("temp"), weather.get("condition")) if v) + ".")
+    for event in record.get("events") or []:
+        if not event.get("name"):
+            continue
+        kind = f" ({event['type']})" if event.get("type") else ""
+        when = f" on {_date_text(event['date'])}" if event.get("date") else ""
+        facts.append(f"{city} event: {event['name']}{kind}{when}.")
+    key = normalize_place(city)
+    return [(key, " ".join(f.split())[:FACT_MAX_CHARS]) for f in facts]
+
+
+def _hash_vectors(texts):
+    """L2-normalised hashed character-trigram counts, float16 (len(texts), EMBEDDING_DIM)."""
+    out = np.zeros((len(texts), EMBEDDING_DIM), dtype=np.float32)
+    for row, text in enumerate(texts):
+        padded = f" {normalize_place(text)} "
+        for i in range(len(padded) - 2):
+            out[row, zlib.crc32(padded[i:i + 3].encode()) % EMBEDDING_DIM] += 1.0
+    norms = np.linalg.norm(out, axis=1, keepdims=True)
+    return (out / np.maximum(norms, 1e-9)).astype(np.float16)
+
+
+def build_index(records, out_dir=RETRIEVAL_INDEX_DIR, embeddings=False, sources=()):
+    """Write the index for `records` to `out_dir`; returns its meta dict."""
+    seen, facts = set(), []
+    for record in records:
+        for key, text in record_facts(record):
+            if (key, text.lower()) not in seen:
+                seen.add((key, text.lower()))
+                facts.append((key, text))
+    # Sorted by city (stable, so each city keeps famous_for/trending first): a city is one slice
+    facts.sort(key=lambda f: f[0])
+    cities = {}
+    for i, (key, _) in enumerate(facts):
+        cities.setdefault(key, [i, i])[1] = i + 1
+
+    vocab, postings = {}, {}
+    doc_len = np.zeros(len(facts), dtype=np.float32)
+    for doc, (_, text) in enumerate(facts):
+        words = tokenize(text)
+        doc_len[doc] = len(words)
+        for word in words:
+            counts = postings.setdefault(vocab.setdefault(word, len(vocab)), {})
+            counts[doc] = counts.get(doc, 0) + 1
+    offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+    doc_ids, tfs = [], []
+    for term in range(len(vocab)):
+        docs = sorted(postings[term].items())
+        doc_ids.extend(d for d, _ in docs)
+        tfs.extend(tf for _, tf in docs)
+        offsets[term + 1] = len(doc_ids)
+
+    blob = "".join(text for _, text in facts).encode("utf-8")
+    text_offsets = np.zeros(len(facts) + 1, dtype=np.int64)
+    text_offsets[1:] = np.cumsum([len(text.encode("utf-8")) for _, text in facts])
+
+    os.makedirs(out_dir, exist_ok=True)
+    arrays = {
+        "offsets": offsets,
+        "doc_ids": np.asarray(doc_ids, dtype=np.int32),
+        "tfs": np.asarray(tfs, dtype=np.float32),
+        "doc_len": doc_len,
+        "text_offsets": text_offsets,
+    }
+    if embeddings:
+        arrays["vectors"] = _hash_vectors([text for _, text in facts])
+    for name, array in arrays.items():
+        _replace(os.path.join(out_dir, f"{name}.npy"), lambda f, a=array: np.save(f, a))
+    _replace(os.path.join(out_dir, "facts.bin"), lambda f: f.write(blob))
+    meta = {
+        "built_at": time.time(),
+        "sources": list(sources),
+        "facts": len(facts),
+        "avgdl": float(doc_len.mean()) if len(facts) else 0.0,
+        "vocab": vocab,
+        "cities": cities,
+        "embeddings": bool(embeddings),
+    }
+    # Written last: a reader never sees new metadata over old arrays
+    _replace(os.path.join(out_dir, "meta.json"), lambda f: f.write(json.dumps(meta).encode("utf-8")))
+    return meta
+
+
+def _replace(path, write):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+class RetrievalIndex:
+    """Read side of build_index(): memory-mapped arrays, BM25 (+ optional vector) search."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.vocab, self.cities, self.size, self.avgdl = {}, {}, 0, 0.0
+        self.vectors = None
+        if path is None:
+            return
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.vocab, self.cities = meta["vocab"], meta["cities"]
+        self.size, self.avgdl = meta["facts"], meta["avgdl"]
+        for name in _ARRAYS:
+            setattr(self, name, np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r"))
+        if meta.get("embeddings"):
+            self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        self._text = np.memmap(os.path.join(path, "facts.bin"), dtype=np.uint8, mode="r") if self.size else None
+
+    @classmethod
+    def load(cls, path=RETRIEVAL_INDEX_DIR):
+        """The index at `path`, or an empty one if none has been built."""
+        if not os.path.exists(os.path.join(path, "meta.json")):
+            return cls()
+        return cls(path)
+
+    def fact(self, doc):
+        return bytes(self._text[self.text_offsets[doc]:self.text_offsets[doc + 1]]).decode("utf-8")
+
+    def _bm25(self, terms):
+        scores = np.zeros(self.size, dtype=np.float32)
+        for term in terms:
+            lo, hi = self.offsets[term], self.offsets[term + 1]
+            docs, tf = self.doc_ids[lo:hi], self.tfs[lo:hi]
+            idf = math.log(1 + (self.size - (hi - lo) + 0.5) / ((hi - lo) + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len[docs] / self.avgdl)
+            # A term lists each document once, so plain fancy-index addition is safe
+            scores[docs] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return scores
+
+    def search(self, query, k=RETRIEVAL_TOP_K, city=None):
+        """
+        Top `k` (score, fact) for `query`. With `city`, only that city's facts
+        are ranked and all of them are candidates (its best-matching facts
+        first); without, only facts sharing a term with the query are.
+        """
+        if not self.size or k <= 0:
+            return []
+        lo, hi = 0, self.size
+        if city is not None:
+            span = self.cities.get(normalize_place(city))
+            if span is None:
+                return []
+            lo, hi = span
+        terms = {self.vocab[w] for w in tokenize(query) if w in self.vocab}
+        scores = self._bm25(terms)[lo:hi]
+        if self.vectors is not None and len(scores):
+            top = float(scores.max())
+            scores = (scores / top if top > 0 else scores) + EMBEDDING_WEIGHT * (
+                np.asarray(self.vectors[lo:hi], dtype=np.float32) @ _hash_vectors([query])[0].astype(np.float32))
+        order = np.lexsort((np.arange(len(scores)), -scores))[:k]
+        if city is None:
+            order = [i for i in order if scores[i] > 0]
+        return [(round(float(scores[i]), 3), self.fact(lo + int(i))) for i in order]
+
+
+def local_facts(cities, context="", k=RETRIEVAL_TOP_K):
+    """Up to `k` curated facts per city as '- fact' lines for a prompt, or NO_FACTS."""
+    if RETRIEVAL_DISABLED:
+        return NO_FACTS
+    index = get_retrieval_index()
+    lines = []
+    for city in cities:
+        lines.extend(f"- {fact}" for _, fact in index.search(f"{city} {context}", k, city=city))
+    return "\n".join(lines) or NO_FACTS
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_retrieval_index():
+    """Process-wide index, mapped on first use (warm-up does that at startup)."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            started = time.perf_counter()
+            _index = RetrievalIndex.load()
+            if _index.size:
+                print(f"Retrieval index: {_index.size} facts on {len(_index.cities)} cities "
+                      f"mapped in {time.perf_counter() - started:.3f}s")
+        return _index
+
+
+def _read_records(path):
+    """ExploreTrip exports: a JSON array (mongoexport --jsonArray, API dump) or JSON lines."""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    try:
+        data = json.loads(text)
+        return data if isinstance(data, list) else [data]
+    except json.JSONDecodeError:
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the curated destination fact index.")
+    parser.add_argument("--from", dest="paths", action="append", default=[],
+                        help="exported ExploreTrip records (JSON array or JSONL); repeatable")
+    parser.add_argument("--from-url", action="append", default=[],
+                        help="endpoint returning ExploreTrip records, e.g. /api/explore/trending")
+    parser.add_argument("--out", default=RETRIEVAL_INDEX_DIR)
+    parser.add_argument("--embeddings", action="store_true", help="also store hashed trigram vectors")
+    parser.add_argument("--query", help="search the built index instead of only building it")
+    parser.add_argument("--city")
+    args = parser.parse_args()
+
+    if args.paths or args.from_url:
+        records = [r for path in args.paths for r in _read_records(path)]
+        if args.from_url:
+            import requests  # only the builder talks to the backend
+
+            for url in args.from_url:
+                response = requests.get(url, timeout=30)
+                response.raise_for_status()
+                records.extend(response.json())
+        meta = build_index(records, args.out, args.embeddings, args.paths + args.from_url)
+        print(f"Indexed {meta['facts']} facts on {len(meta['cities'])} cities from {len(records)} records -> {args.out}")
+    if args.query:
+        for score, fact in RetrievalIndex.load(args.out).search(args.query, city=args.city):
+            print(f"{score:7.3f}  {fact}")
+
+
+if __name__ == "__main__":
+    main()
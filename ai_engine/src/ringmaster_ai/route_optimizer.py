@@ -0,0 +1,221 @@
+import os
+
+import numpy as np
+
+from src.ringmaster_ai.feasibility import (
+    FARES, FLIGHT_BASE, FLIGHT_PER_KM, GROUND_BASE, GROUND_MAX_KM, GROUND_PER_KM,
+)
+from src.ringmaster_ai.gazetteer import EARTH_RADIUS_KM, get_gazetteer
+from src.ringmaster_ai.plan_cache import normalize_place, split_destinations
+
+# "fare": minimise estimated transit cost (fares.json, else the distance
+# formula feasibility uses); "km": minimise great-circle distance.
+ROUTE_WEIGHT = os.getenv("ROUTE_WEIGHT", "fare").strip().lower()
+# Held-Karp is exact but O(2^n * n^2) in time and memory; beyond this many cities use 2-opt/Or-opt.
+EXACT_MAX_CITIES = int(os.getenv("ROUTE_EXACT_MAX_CITIES", "12"))
+# Or-opt moves runs of up to this many consecutive cities.
+OR_OPT_MAX_SEGMENT = 3
+
+WEIGHTS = ("fare", "km")
+
+
+def distance_matrix(lats, lons):
+    """Pairwise great-circle distances in km (haversine, vectorised)."""
+    lat = np.radians(np.asarray(lats, dtype=float))
+    lon = np.radians(np.asarray(lons, dtype=float))
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def fare_matrix(names, km):
+    """One-way fare per leg: half the fares.json round trip where listed, else the distance formula."""
+    fares = np.where(km <= GROUND_MAX_KM, GROUND_BASE + km * GROUND_PER_KM, FLIGHT_BASE + km * FLIGHT_PER_KM)
+    keys = [normalize_place(n) for n in names]
+    for i in range(len(keys)):
+        for j in range(i + 1, len(keys)):
+            fare = FARES.get(frozenset((keys[i], keys[j])))
+            if fare is not None:
+                fares[i, j] = fares[j, i] = fare / 2
+    np.fill_diagonal(fares, 0.0)
+    return fares
+
+
+def tour_cost(cost, tour):
+    """Cost of the closed tour (node indices; the last node returns to the first)."""
+    tour = np.asarray(tour)
+    return float(cost[tour, np.roll(tour, -1)].sum())
+
+
+def held_karp(cost):
+    """
+    Exact cheapest closed tour starting at node 0.
+
+    dp[mask, j] is the cheapest path from 0 through the cities in `mask`
+    ending at j. All masks with the same number of cities are relaxed in one
+    numpy step, so the Python loop runs once per tour length, not per subset.
+    """
+    n = cost.shape[0]
+    if n <= 2:
+        return list(range(n))
+    m = n - 1  # cities 1..n-1 are bits 0..m-1
+    bits = 1 << np.arange(m)
+    masks = np.arange(1 << m)
+    sizes = ((masks[:, None] & bits) != 0).sum(axis=1)
+    dp = np.full((1 << m, m), np.inf)
+    parent = np.full((1 << m, m), -1, dtype=np.int64)
+    dp[bits, np.arange(m)] = cost[0, 1:]
+    arrive = cost[1:, 1:].T  # arrive[j, i]: cost of city i -> city j
+    for size in range(2, m + 1):
+        layer = masks[sizes == size]
+        # candidates[l, j, i]: finish layer[l] at j, coming from i (inf unless i is in the mask)
+        candidates = dp[layer[:, None] ^ bits] + arrive
+        best_prev = np.argmin(candidates, axis=2)
+        best = np.take_along_axis(candidates, best_prev[..., None], axis=2)[..., 0]
+        has_j = (layer[:, None] & bits) != 0
+        dp[layer] = np.where(has_j, best, np.inf)
+        parent[layer] = np.where(has_j, best_prev, -1)
+
+    full = (1 << m) - 1
+    last = int(np.argmin(dp[full] + cost[1:, 0]))
+    order, mask = [], full
+    while last >= 0:
+        order.append(last + 1)
+        prev = int(parent[mask, last])
+        mask &= ~(1 << last)
+        last = prev
+    return [0] + order[::-1]
+
+
+def _nearest_neighbour(cost):
+    n = cost.shape[0]
+    tour, left = [0], set(range(1, n))
+    while left:
+        here = tour[-1]
+        nxt = min(left, key=lambda j: cost[here, j])
+        tour.append(nxt)
+        left.remove(nxt)
+    return tour
+
+
+def two_opt(cost, tour):
+    """Apply the best improving 2-opt move (all moves scored at once) until none is left."""
+    tour = np.asarray(tour)
+    n = len(tour)
+    if n < 4:
+        return tour.tolist()
+    i_idx, j_idx = np.triu_indices(n, k=2)
+    # Reversing tour[1:n] wholesale is the same tour; skip the (0, n-1) pair
+    keep = ~((i_idx == 0) & (j_idx == n - 1))
+    i_idx, j_idx = i_idx[keep], j_idx[keep]
+    while True:
+        a, b = tour[i_idx], tour[i_idx + 1]
+        c, d = tour[j_idx], tour[(j_idx + 1) % n]
+        delta = cost[a, c] + cost[b, d] - cost[a, b] - cost[c, d]
+        k = int(np.argmin(delta))
+        if delta[k] >= -1e-9:
+            return tour.tolist()
+        i, j = i_idx[k], j_idx[k]
+        tour[i + 1:j + 1] = tour[i + 1:j + 1][::-1]
+
+
+def or_opt(cost, tour):
+    """Move runs of 1..OR_OPT_MAX_SEGMENT cities elsewhere (either direction) while that helps."""
+    tour = list(tour)
+    n = len(tour)
+    improved = True
+    while improved:
+        improved = False
+        for size in range(1, min(OR_OPT_MAX_SEGMENT, n - 2) + 1):
+            # Node 0 stays first, so segments start at 1 or later
+            for start in range(1, n - size + 1):
+                seg = tour[start:start + size]
+                prev, nxt = tour[start - 1], tour[(start + size) % n]
+                removed = cost[prev, seg[0]] + cost[seg[-1], nxt] - cost[prev, nxt]
+                rest = tour[:start] + tour[start + size:]
+                best = None
+                for pos in range(len(rest)):
+                    a, b = rest[pos], rest[(pos + 1) % len(rest)]
+                    for piece in (seg, seg[::-1]):
+                        added = cost[a, piece[0]] + cost[piece[-1], b] - cost[a, b]
+                        if added - removed < -1e-9 and (best is None or added < best[0]):
+                            best = (added, pos, piece)
+                if best is not None:
+                    _, pos, piece = best
+                    tour = rest[:pos + 1] + list(piece) + rest[pos + 1:]
+                    improved = True
+                    break
+            if improved:
+                break
+    return tour
+
+
+def solve_tour(cost):
+    """(tour from node 0, "exact" | "heuristic") for a square cost matrix."""
+    cities = cost.shape[0] - 1
+    if cities <= EXACT_MAX_CITIES:
+        return held_karp(cost), "exact"
+    tour = two_opt(cost, _nearest_neighbour(cost))
+    # Or-opt can open new 2-opt moves; alternate until neither helps
+    while True:
+        moved = or_opt(cost, tour)
+        if tour_cost(cost, moved) >= tour_cost(cost, tour) - 1e-9:
+            return tour, "heuristic"
+        tour = two_opt(cost, moved)
+
+
+def optimize_route(destinations, origin=None, weight=ROUTE_WEIGHT):
+    """
+    Cheapest order to visit `destinations` (a list or 'A, B and C').
+
+    With a known origin the trip is a closed loop origin -> cities ->
+    origin, as in feasibility's cost estimate; otherwise the path may start
+    and end anywhere. Places are resolved through the gazetteer; if any
+    cannot be, the requested order is returned unchanged (method
+    "as_requested"). Returns {"order", "origin", "method", "weight", "km", "cost"}.
+    """
+    if weight not in WEIGHTS:
+        raise ValueError(f"route weight must be one of {', '.join(WEIGHTS)}, got '{weight}'")
+    if isinstance(destinations, str):
+        destinations = split_destinations(destinations)
+    names = list(dict.fromkeys(d.strip() for d in destinations if d and d.strip()))
+    result = {"order": names, "origin": None, "method": "as_requested", "weight": weight, "km": None, "cost": None}
+    if len(names) < 2:
+        return result
+
+    gazetteer = get_gazetteer()
+    stops = [gazetteer.lookup(name, kind="city") for name in names]
+    if any(stop is None for stop in stops):
+        return result
+    home = gazetteer.lookup(origin, kind="city") if origin else None
+    # Node 0 is the origin, or a free start (zero-cost edges) when there is none
+    points = [home[0] if home else stops[0][0]] + [stop[0] for stop in stops]
+    km = distance_matrix([p["lat"] for p in points], [p["lon"] for p in points])
+    cost = fare_matrix([p["name"] for p in points], km) if weight == "fare" else km.copy()
+    if home is None:
+        km[0, :] = km[:, 0] = 0.0
+        cost[0, :] = cost[:, 0] = 0.0
+
+    tour, method = solve_tour(cost)
+    result.update(
+        order=[names[i - 1] for i in tour[1:]],
+        origin=origin if home else None,
+        method=method,
+        km=round(tour_cost(km, tour)),
+        cost=round(tour_cost(cost, tour)),
+    )
+    return result
+
+
+def format_route(route):
+    """'Delhi -> Jaipur -> Udaipur -> Delhi (about 1,240 km; ~5,450 INR per person in transit)'."""
+    stops = list(route["order"])
+    if route["method"] == "as_requested":
+        return " -> ".join(stops) + " (as requested)"
+    if route["origin"]:
+        stops = [route["origin"]] + stops + [route["origin"]]
+    text = " -> ".join(stops) + f" (about {route['km']:,} km"
+    if route["weight"] == "fare":
+        text += f"; ~{route['cost']:,} INR per person in transit"
+    return text + ")"
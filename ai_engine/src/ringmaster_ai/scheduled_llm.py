@@ -0,0 +1,116 @@
+import contextvars
+import time
+
+from crewai import LLM
+from crewai.types.usage_metrics import UsageMetrics
+
+from src.ringmaster_ai.key_scheduler import (
+    estimate_tokens,
+    get_key_scheduler,
+    is_rate_limit_error,
+    retry_after_from_error,
+)
+from src.ringmaster_ai.llm_cache import install_llm_cache, is_replaying
+from src.ringmaster_ai.metrics import (
+    LLM_CALL_DURATION,
+    LLM_CALLS,
+    LLM_COMPLETION_TOKENS,
+    LLM_PROMPT_TOKENS,
+    count_llm_call,
+)
+
+# Honour LLM_CACHE_MODE for every crew built on this client
+install_llm_cache()
+
+# Completion budget assumed when the LLM has no max_tokens of its own.
+DEFAULT_COMPLETION_TOKENS = 1024
+# How many 429s a single call absorbs (each on a fresh key) before giving up.
+MAX_RATE_LIMIT_RETRIES = 4
+
+# Lease, model, token tally and metric labels of the call running in this thread/context.
+_current_call = contextvars.ContextVar("scheduled_llm_call", default=None)
+
+
+def _call_labels(args, kwargs):
+    """(agent role, task name) for metrics; crewai passes from_task/from_agent to LLM.call."""
+    task = kwargs.get("from_task", args[3] if len(args) > 3 else None)
+    agent = kwargs.get("from_agent", args[4] if len(args) > 4 else None)
+    task_name = getattr(task, "name", None) or "unknown"
+    agent_role = " ".join(str(getattr(agent, "role", None) or "unknown").split())[:60]
+    return agent_role, task_name
+
+
+class ScheduledLLM(LLM):
+    """
+    crewai LLM whose Groq key is leased from the KeyScheduler on every call.
+
+    The leased key (and the model, when a router picks one per call) lives
+    in a context variable and is injected into the completion params, so
+    neither attribute is ever mutated and one instance can be shared by
+    agents of concurrent requests. 429s are reported back to the
+    scheduler and the call is retried on whichever key has headroom next.
+    """
+
+    def call(self, messages, *args, **kwargs):
+        return self._call_model(self.model, messages, args, kwargs)
+
+    def _call_model(self, model, messages, args, kwargs):
+        """One call on `model`, which may differ from self.model (see model_router)."""
+        agent, task = _call_labels(args, kwargs)
+        state = {"key": None, "tokens": 0, "labels": (agent, task), "model": model}
+        count_llm_call()
+        token = _current_call.set(state)
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            if is_replaying():
+                # Served from disk: no key, no quota
+                result = super().call(messages, *args, **kwargs)
+            else:
+                result = self._scheduled_call(state, messages, args, kwargs)
+            outcome = "ok"
+            return result
+        finally:
+            _current_call.reset(token)
+            LLM_CALL_DURATION.observe(agent, task, model, value=time.perf_counter() - started)
+            LLM_CALLS.inc(agent, task, outcome)
+
+    def _scheduled_call(self, state, messages, args, kwargs):
+        scheduler = get_key_scheduler()
+        estimate = estimate_tokens(messages) + int(self.max_tokens or DEFAULT_COMPLETION_TOKENS)
+        attempt = 0
+        while True:
+            lease = scheduler.acquire(estimate)
+            state["key"], state["tokens"] = lease.key, 0
+            try:
+                result = super().call(messages, *args, **kwargs)
+            except Exception as e:
+                if is_rate_limit_error(e):
+                    scheduler.report_rate_limit(lease, retry_after_from_error(e))
+                    attempt += 1
+                    if attempt <= MAX_RATE_LIMIT_RETRIES:
+                        continue
+                else:
+                    scheduler.report_failure(lease)
+                raise
+            tokens = state["tokens"] or estimate_tokens(messages) + len(str(result)) // 4
+            scheduler.release(lease, tokens)
+            return result
+
+    def _prepare_completion_params(self, *args, **kwargs):
+        params = super()._prepare_completion_params(*args, **kwargs)
+        state = _current_call.get()
+        if state is not None and state["key"] is not None:
+            params["api_key"] = state["key"]
+        if state is not None and state["model"] != self.model:
+            params["model"] = state["model"]
+        return params
+
+    def _track_token_usage_internal(self, usage_data):
+        super()._track_token_usage_internal(usage_data)
+        state = _current_call.get()
+        metrics = UsageMetrics.from_provider_dict(usage_data) if state is not None else None
+        if metrics is not None:
+            state["tokens"] += metrics.total_tokens
+            LLM_PROMPT_TOKENS.inc(*state["labels"], amount=metrics.prompt_tokens)
+            LLM_COMPLETION_TOKENS.inc(*state["labels"], amount=metrics.completion_tokens)
@@ -0,0 +1,238 @@
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from src.ringmaster_ai.metrics import REGISTRY, TOOL_CALL_DURATION
+
+TOOL_CACHE_PATH = os.getenv("TOOL_CACHE_PATH", os.path.join(os.getcwd(), ".cache", "tool_cache.sqlite3"))
+# Entries kept in the in-process LRU, and rows kept on disk before eviction.
+TOOL_CACHE_MEMORY_ITEMS = int(os.getenv("TOOL_CACHE_MEMORY_ITEMS", "2048"))
+TOOL_CACHE_DISK_ITEMS = int(os.getenv("TOOL_CACHE_DISK_ITEMS", "50000"))
+# Set TOOL_CACHE_DISABLED=1 to bypass caching entirely (e.g. while debugging tools).
+TOOL_CACHE_DISABLED = os.getenv("TOOL_CACHE_DISABLED", "").lower() in ("1", "true", "yes")
+
+# Returned by ToolCache.get when nothing usable is stored (None is a valid cached value).
+MISS = object()
+
+_ERROR_PREFIXES = ("Error", "HTTP Error", "An error occurred")
+
+
+def cache_key(*parts):
+    """Stable digest of arbitrary JSON-able arguments; strings are case/space-normalised."""
+    def norm(value):
+        if isinstance(value, str):
+            return " ".join(value.lower().split())
+        if isinstance(value, dict):
+            return {k: norm(v) for k, v in sorted(value.items())}
+        if isinstance(value, (list, tuple)):
+            return [norm(v) for v in value]
+        return value
+    blob = json.dumps(norm(list(parts)), sort_keys=True, default=str)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+
+class ToolCache:
+    """
+    Two-level cache for external lookups: an in-process LRU in front of SQLite.
+
+    Entries live in namespaces (one per tool) with their own TTLs. A value can
+    be stored as negative ("looked it up, nothing there") so repeated misses
+    stay cheap without being confused with real hits. Both levels are
+    size-bounded: the LRU drops least-recently used entries, the SQLite store
+    drops expired rows first and then the least recently accessed ones.
+    """
+
+    def __init__(self, path=TOOL_CACHE_PATH, memory_items=TOOL_CACHE_MEMORY_ITEMS,
+                 disk_items=TOOL_CACHE_DISK_ITEMS):
+        self.path = path
+        self.memory_items = memory_items
+        self.disk_items = disk_items
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._writes = 0
+        self._db = None
+        if path:
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS entries ("
+                    " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT,"
+                    " negative INTEGER NOT NULL DEFAULT 0, expires_at REAL NOT NULL,"
+                    " accessed_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"Tool cache: disk store unavailable ({e}), using memory only")
+                self._db = None
+
+    def _count(self, namespace, field):
+        stats = self._stats.setdefault(namespace, {"hits": 0, "negative_hits": 0, "misses": 0, "disk_hits": 0, "writes": 0})
+        stats[field] += 1
+
+    def get(self, namespace, key):
+        if TOOL_CACHE_DISABLED:
+            return MISS
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get((namespace, key))
+            if entry is not None and entry[0] <= now:
+                del self._memory[(namespace, key)]
+                entry = None
+            if entry is None and self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, negative, expires_at FROM entries WHERE namespace=? AND key=? AND expires_at>?",
+                    (namespace, key, now),
+                ).fetchone()
+                if row is not None:
+                    entry = (row[2], json.loads(row[0]), bool(row[1]))
+                    self._remember((namespace, key), entry)
+                    self._db.execute("UPDATE entries SET accessed_at=? WHERE namespace=? AND key=?", (now, namespace, key))
+                    self._db.commit()
+                    self._count(namespace, "disk_hits")
+            if entry is None:
+                self._count(namespace, "misses")
+                return MISS
+            self._memory.move_to_end((namespace, key))
+            self._count(namespace, "negative_hits" if entry[2] else "hits")
+            return entry[1]
+
+    def set(self, namespace, key, value, ttl, negative=False):
+        if TOOL_CACHE_DISABLED or ttl <= 0:
+            return
+        now = time.time()
+        entry = (now + ttl, value, negative)
+        with self._lock:
+            self._remember((namespace, key), entry)
+            self._count(namespace, "writes")
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO entries (namespace, key, value, negative, expires_at, accessed_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (namespace, key, json.dumps(value, default=str), int(negative), entry[0], now),
+                )
+                self._writes += 1
+                if self._writes % 100 == 0:
+                    self._evict_disk(now)
+                self._db.commit()
+
+    def _remember(self, mkey, entry):
+        # Caller holds self._lock
+        self._memory[mkey] = entry
+        self._memory.move_to_end(mkey)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self, now):
+        # Caller holds self._lock
+        self._db.execute("DELETE FROM entries WHERE expires_at<=?", (now,))
+        (count,) = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()
+        if count > self.disk_items:
+            self._db.execute(
+                "DELETE FROM entries WHERE rowid IN (SELECT rowid FROM entries ORDER BY accessed_at LIMIT ?)",
+                (count - self.disk_items,),
+            )
+
+    def clear(self, namespace=None):
+        with self._lock:
+            if namespace is None:
+                self._memory.clear()
+            else:
+                for mkey in [k for k in self._memory if k[0] == namespace]:
+                    del self._memory[mkey]
+            if self._db is not None:
+                if namespace is None:
+                    self._db.execute("DELETE FROM entries")
+                else:
+                    self._db.execute("DELETE FROM entries WHERE namespace=?", (namespace,))
+                self._db.commit()
+
+    def stats(self):
+        """Per-namespace counters plus a hit rate (negative hits count as hits)."""
+        with self._lock:
+            out = {}
+            for namespace, stats in self._stats.items():
+                lookups = stats["hits"] + stats["negative_hits"] + stats["misses"]
+                hit_rate = (stats["hits"] + stats["negative_hits"]) / lookups if lookups else 0.0
+                out[namespace] = dict(stats, hit_rate=round(hit_rate, 3))
+            return out
+
+    def __len__(self):
+        return len(self._memory)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_tool_cache():
+    """Process-wide cache shared by every tool."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ToolCache()
+        return _cache
+
+
+def cache_metric_families(prefix, stats):
+    """Prometheus families for ToolCache.stats() output (see metrics.Registry)."""
+    lookups, ratios = [], []
+    for namespace, counts in sorted(stats.items()):
+        for result in ("hits", "negative_hits", "misses", "disk_hits", "writes"):
+            lookups.append(({"namespace": namespace, "result": result}, counts.get(result, 0)))
+        ratios.append(({"namespace": namespace}, counts.get("hit_rate", 0.0)))
+    return [
+        (f"{prefix}_operations_total", "counter", "Cache lookups by result, and writes.", lookups),
+        (f"{prefix}_hit_ratio", "gauge", "Share of lookups answered from the cache (negative hits included).", ratios),
+    ]
+
+
+def _collect_tool_cache():
+    return cache_metric_families("tool_cache", _cache.stats()) if _cache is not None else []
+
+
+REGISTRY.register_collector(_collect_tool_cache)
+
+
+def is_error_result(result):
+    return isinstance(result, str) and result.startswith(_ERROR_PREFIXES)
+
+
+def cached_tool(namespace=None, ttl=24 * 3600, negative_ttl=3600, is_negative=None):
+    """
+    Class decorator that caches a BaseTool's `_run` results.
+
+    Results are keyed by the normalised call arguments. Error strings are never
+    stored; results for which `is_negative(result)` is true (default: None) are
+    kept for `negative_ttl` instead of `ttl`.
+    """
+    def decorate(cls):
+        original = cls._run
+        ns = namespace or cls.__name__
+
+        @functools.wraps(original)
+        def _run(self, *args, **kwargs):
+            started = time.perf_counter()
+            cache = get_tool_cache()
+            key = cache_key(args, kwargs)
+            cached = cache.get(ns, key)
+            if cached is not MISS:
+                TOOL_CALL_DURATION.observe(ns, "hit", value=time.perf_counter() - started)
+                return cached
+            result = original(self, *args, **kwargs)
+            TOOL_CALL_DURATION.observe(ns, "miss", value=time.perf_counter() - started)
+            if not is_error_result(result):
+                negative = is_negative(result) if is_negative else result is None
+                cache.set(ns, key, result, negative_ttl if negative else ttl, negative=negative)
+            return result
+
+        cls._run = _run
+        return cls
+    return decorate
@@ -0,0 +1,165 @@
+import asyncio
+import os
+import threading
+import time
+
+from src.ringmaster_ai.metrics import TOOL_CALL_DURATION
+from src.ringmaster_ai.tools.cache import MISS, get_tool_cache
+
+SERPER_IMAGES_URL = os.getenv("SERPER_IMAGES_URL", "https://google.serper.dev/images")
+# Per-request timeout and the deadline for a whole batch, in seconds.
+IMAGE_LOOKUP_TIMEOUT = float(os.getenv("IMAGE_LOOKUP_TIMEOUT", "5"))
+IMAGE_LOOKUP_DEADLINE = float(os.getenv("IMAGE_LOOKUP_DEADLINE", "12"))
+IMAGE_LOOKUP_CONCURRENCY = int(os.getenv("IMAGE_LOOKUP_CONCURRENCY", "8"))
+# Landmark images rarely change; "no image" answers are retried sooner.
+IMAGE_CACHE_TTL = 7 * 24 * 3600
+IMAGE_CACHE_NEGATIVE_TTL = 24 * 3600
+CACHE_NAMESPACE = "serper_images"
+
+
+def serper_api_key():
+    # Check specific key first, then fallback to standard
+    return os.getenv("SERPER_API_KEY") or os.getenv("SERPER_API_KEY2")
+
+
+def needs_image(item):
+    return not item.get("image_url") or "LEAVE_EMPTY" in item.get("image_url", "")
+
+
+class ImageResolver:
+    """
+    Resolves image search queries against Serper, many at a time.
+
+    Queries are de-duplicated, then fetched concurrently over one pooled
+    httpx.AsyncClient that lives on a private event-loop thread, so keep-alive
+    connections survive between batches and callers can be sync code on any
+    thread. Each request has its own timeout and a batch stops waiting at the
+    deadline; anything unfinished resolves to None. Answers (including "no
+    image") go through the shared tool cache; failures and timeouts do not.
+    """
+
+    def __init__(self, api_key=None, url=SERPER_IMAGES_URL, timeout=IMAGE_LOOKUP_TIMEOUT,
+                 deadline=IMAGE_LOOKUP_DEADLINE, concurrency=IMAGE_LOOKUP_CONCURRENCY):
+        self.api_key = api_key
+        self.url = url
+        self.timeout = timeout
+        self.deadline = deadline
+        self.concurrency = concurrency
+        self._loop = None
+        self._client = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._start_lock:
+            if self._loop is None:
+                import httpx  # deferred: pulls in ~150ms of modules at import
+
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="image-resolver", daemon=True).start()
+                self._client = httpx.AsyncClient(
+                    timeout=self.timeout,
+                    limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+                )
+                self._loop = loop
+        return self._loop
+
+    async def _fetch(self, query, api_key, semaphore):
+        """(image_url or None, answered) - answered is False on errors/timeouts."""
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await self._client.post(
+                    self.url,
+                    json={"q": query, "num": 1},
+                    headers={'X-API-KEY': api_key, 'Content-Type': 'application/json'},
+                )
+                response.raise_for_status()
+                TOOL_CALL_DURATION.observe(CACHE_NAMESPACE, "miss", value=time.perf_counter() - started)
+                data = response.json()
+                if "images" in data and len(data["images"]) > 0:
+                    return data["images"][0]["imageUrl"], True
+                return None, True
+            except Exception as e:
+                print(f"Error fetching image for {query}: {str(e)}")
+            return None, False
+
+    async def _resolve_batch(self, queries, api_key):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = {q: asyncio.ensure_future(self._fetch(q, api_key, semaphore)) for q in queries}
+        done, pending = await asyncio.wait(tasks.values(), timeout=self.deadline)
+        for task in pending:
+            task.cancel()
+        if pending:
+            print(f"Image lookup deadline hit: {len(pending)}/{len(tasks)} queries unresolved")
+        return {q: (t.result() if t in done else (None, False)) for q, t in tasks.items()}
+
+    def resolve(self, queries):
+        """Map each distinct query to an image URL (or None)."""
+        unique = list(dict.fromkeys(q for q in queries if q))
+        api_key = self.api_key or serper_api_key()
+        if not unique or not api_key:
+            return {q: None for q in unique}
+
+        cache = get_tool_cache()
+        images, missing = {}, []
+        for query in unique:
+            cached = cache.get(CACHE_NAMESPACE, query)
+            if cached is MISS:
+                missing.append(query)
+            else:
+                images[query] = cached
+        if not missing:
+            return images
+
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(self._resolve_batch(missing, api_key), loop)
+        for query, (url, answered) in future.result(self.deadline + self.timeout).items():
+            images[query] = url
+            if answered:
+                ttl = IMAGE_CACHE_TTL if url else IMAGE_CACHE_NEGATIVE_TTL
+                cache.set(CACHE_NAMESPACE, query, url, ttl, negative=url is None)
+        return images
+
+    def resolve_one(self, query):
+        return self.resolve([query]).get(query)
+
+
+_resolver = None
+_resolver_lock = threading.Lock()
+
+
+def get_image_resolver():
+    """Process-wide resolver sharing one connection pool."""
+    global _resolver
+    with _resolver_lock:
+        if _resolver is None:
+            _resolver = ImageResolver()
+        return _resolver
+
+
+def collect_image_targets(plan):
+    """(item, query) pairs for every hotel and activity still missing an image."""
+    targets = []
+    destination = plan.get("destination")
+    for hotel in plan.get("hotels") or []:
+        if isinstance(hotel, dict) and needs_image(hotel):
+            # Search query: Hotel Name + Destination + "hotel"
+            targets.append((hotel, f'{hotel.get("name")} {destination} hotel property'))
+    for day in plan.get("itinerary") or []:
+        for activity in (day.get("activities") or []) if isinstance(day, dict) else []:
+            if isinstance(activity, dict) and needs_image(activity):
+                # Search query: Activity Name + Destination
+                targets.append((activity, f'{activity.get("activity")} {destination}'))
+    return targets
+
+
+def enrich_plan_images(plan, resolver=None):
+    """Fill missing hotel/activity images in place with one batched lookup."""
+    targets = collect_image_targets(plan)
+    if not targets:
+        return plan
+    images = (resolver or get_image_resolver()).resolve([query for _, query in targets])
+    for item, query in targets:
+        if images.get(query):
+            item["image_url"] = images[query]
+    return plan
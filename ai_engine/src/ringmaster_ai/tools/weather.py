@@ -0,0 +1,244 @@
+import json
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+
+from src.ringmaster_ai.feasibility import CITIES, DATA_DIR, haversine_km, resolve_city
+from src.ringmaster_ai.metrics import TOOL_CALL_DURATION
+from src.ringmaster_ai.plan_cache import normalize_place
+from src.ringmaster_ai.tools.cache import MISS, cache_key, get_tool_cache
+
+OPENWEATHER_FORECAST_URL = os.getenv("OPENWEATHER_FORECAST_URL", "https://api.openweathermap.org/data/2.5/forecast")
+# The free 5 day / 3 hour forecast; later trip days fall back to climatology.
+FORECAST_DAYS = int(os.getenv("WEATHER_FORECAST_DAYS", "5"))
+# Forecasts are re-issued every few hours; a (city, day) entry is good this long.
+FORECAST_TTL = int(os.getenv("WEATHER_FORECAST_TTL", str(3 * 3600)))
+UNKNOWN_CITY_TTL = 24 * 3600
+WEATHER_CONCURRENCY = int(os.getenv("WEATHER_CONCURRENCY", "8"))
+WEATHER_TIMEOUT = float(os.getenv("WEATHER_TIMEOUT", "5"))
+# Places without their own climatology use a station at most this far away.
+CLIMATE_STATION_MAX_KM = 400
+# Longest date range one lookup covers.
+MAX_TRIP_DAYS = 60
+
+CACHE_NAMESPACE = "weather_day"
+UNKNOWN_NAMESPACE = "weather_unknown_city"
+_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+def openweather_api_key():
+    return os.getenv("OPENWEATHER_API_KEY")
+
+
+def parse_trip_date(value):
+    """'2025-02-10' (and the other formats trip requests use) -> date; today if unparseable."""
+    if isinstance(value, date):
+        return value
+    for fmt in ("%Y-%m-%d", "%Y-%m-%dT%H:%M:%S", "%d-%m-%Y", "%Y/%m/%d"):
+        try:
+            return datetime.strptime(str(value)[:19], fmt).date()
+        except ValueError:
+            continue
+    return date.today()
+
+
+def _load_climatology():
+    with open(os.path.join(DATA_DIR, "climatology.json"), encoding="utf-8") as f:
+        stations = json.load(f)["stations"]
+    return {normalize_place(name): (name, normals) for name, normals in stations.items()}
+
+
+CLIMATOLOGY = _load_climatology()
+
+
+def climate_station(city):
+    """(station name, normals) for a city: its own entry or the nearest one, else None."""
+    own = CLIMATOLOGY.get(normalize_place(city))
+    if own:
+        return own
+    record = resolve_city(city)
+    if record is None:
+        return None
+    best, best_km = None, CLIMATE_STATION_MAX_KM
+    for key, station in CLIMATOLOGY.items():
+        other = CITIES.get(key)
+        if other is None:
+            continue
+        km = haversine_km(record["lat"], record["lon"], other["lat"], other["lon"])
+        if km <= best_km:
+            best, best_km = station, km
+    return best
+
+
+def climatology_day(city, day):
+    station = climate_station(city)
+    if station is None:
+        return {"date": day.isoformat(), "source": "unknown"}
+    name, normals = station
+    month = day.month - 1
+    rain_days = normals["rain_days"][month]
+    return {
+        "date": day.isoformat(),
+        "source": "climatology",
+        "station": name,
+        "temp_max": normals["high"][month],
+        "temp_min": normals["low"][month],
+        # Share of days in the month with rain, as a rough daily chance
+        "rain_chance": round(rain_days / 30.0, 2),
+    }
+
+
+def summarise_forecast(entries, utc_offset=0):
+    """Collapse OpenWeather 3-hour entries into {iso_date: day dict} in the city's local time."""
+    by_day = {}
+    for entry in entries:
+        day = datetime.fromtimestamp(entry["dt"] + utc_offset, timezone.utc).date().isoformat()
+        by_day.setdefault(day, []).append(entry)
+    out = {}
+    for day, items in by_day.items():
+        conditions = Counter(i["weather"][0]["description"] for i in items if i.get("weather"))
+        out[day] = {
+            "date": day,
+            "source": "forecast",
+            "temp_max": round(max(i["main"]["temp_max"] for i in items)),
+            "temp_min": round(min(i["main"]["temp_min"] for i in items)),
+            "rain_chance": round(max(i.get("pop", 0.0) for i in items), 2),
+            "conditions": conditions.most_common(1)[0][0] if conditions else None,
+        }
+    return out
+
+
+class WeatherService:
+    """
+    Weather for every (city, day) of a trip in one call.
+
+    Days inside the forecast window come from OpenWeather's 5-day forecast:
+    each city needs at most one request, the requests for all cities run
+    concurrently over one pooled session, and every day they return is
+    cached on its own for FORECAST_TTL. Days beyond the window (or when the
+    API is unavailable) use the bundled monthly climatology table.
+    """
+
+    def __init__(self, api_key=None, url=OPENWEATHER_FORECAST_URL, concurrency=WEATHER_CONCURRENCY,
+                 timeout=WEATHER_TIMEOUT):
+        self.api_key = api_key
+        self.url = url
+        self.timeout = timeout
+        import requests  # deferred: keeps it out of the app's import path
+        from requests.adapters import HTTPAdapter
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="weather")
+
+    def _fetch_forecast(self, city, api_key):
+        """{iso_date: day dict} for the forecast window; {} if unavailable."""
+        started = time.perf_counter()
+        try:
+            response = self.session.get(
+                self.url, params={"q": city, "appid": api_key, "units": "metric"}, timeout=self.timeout)
+            if response.status_code == 404:
+                get_tool_cache().set(UNKNOWN_NAMESPACE, cache_key(city), True, UNKNOWN_CITY_TTL)
+                return {}
+            response.raise_for_status()
+            TOOL_CALL_DURATION.observe("openweather_forecast", "miss", value=time.perf_counter() - started)
+            data = response.json()
+            return summarise_forecast(data.get("list", []), (data.get("city") or {}).get("timezone", 0))
+        except Exception as e:
+            print(f"Weather forecast for {city} failed ({e}); using climatology.")
+            return {}
+
+    def trip_weather(self, cities, start_date, days):
+        """{city: [day dict, ...]} for `days` days from `start_date` (date or string)."""
+        start = parse_trip_date(start_date)
+        dates = [start + timedelta(days=i) for i in range(max(1, min(int(days), MAX_TRIP_DAYS)))]
+        today = date.today()
+        in_window = [d for d in dates if today <= d < today + timedelta(days=FORECAST_DAYS)]
+        cities = list(dict.fromkeys(c.strip() for c in cities if c and c.strip()))
+        api_key = self.api_key or openweather_api_key()
+
+        cache = get_tool_cache()
+        report = {city: {} for city in cities}
+        to_fetch = []
+        if in_window and api_key:
+            for city in cities:
+                if cache.get(UNKNOWN_NAMESPACE, cache_key(city)) is not MISS:
+                    continue
+                for d in in_window:
+                    cached = cache.get(CACHE_NAMESPACE, cache_key(city, d.isoformat()))
+                    if cached is not MISS:
+                        report[city][d] = cached
+                if len(report[city]) < len(in_window):
+                    to_fetch.append(city)
+
+        futures = {city: self._pool.submit(self._fetch_forecast, city, api_key) for city in to_fetch}
+        for city, future in futures.items():
+            for iso_day, forecast in future.result().items():
+                cache.set(CACHE_NAMESPACE, cache_key(city, iso_day), forecast, FORECAST_TTL)
+                d = date.fromisoformat(iso_day)
+                if d in in_window:
+                    report[city][d] = forecast
+
+        return {
+            city: [report[city].get(d) or climatology_day(city, d) for d in dates]
+            for city in cities
+        }
+
+    def close(self):
+        self._pool.shutdown(wait=False)
+        self.session.close()
+
+
+def _describe(day):
+    if day["source"] == "unknown":
+        return "no weather data"
+    text = f"{day['temp_min']} to {day['temp_max']}C"
+    if day.get("conditions"):
+        text += f" {day['conditions']}"
+    if day.get("rain_chance", 0) >= 0.3:
+        text += f", rain {int(day['rain_chance'] * 100)}%"
+    return text
+
+
+def _span(first, last):
+    a, b = date.fromisoformat(first), date.fromisoformat(last)
+    if a == b:
+        return f"{_MONTHS[a.month - 1]} {a.day}"
+    if a.month == b.month:
+        return f"{_MONTHS[a.month - 1]} {a.day}-{b.day}"
+    return f"{_MONTHS[a.month - 1]} {a.day}-{_MONTHS[b.month - 1]} {b.day}"
+
+
+def format_trip_weather(report):
+    """One line per city; consecutive days with the same outlook are merged."""
+    lines = []
+    for city, days in report.items():
+        runs = []
+        for day in days:
+            text = _describe(day)
+            label = {"climatology": "avg", "forecast": "forecast"}.get(day["source"], "")
+            if runs and runs[-1][2] == text and runs[-1][3] == label:
+                runs[-1][1] = day["date"]
+            else:
+                runs.append([day["date"], day["date"], text, label])
+        parts = [f"{_span(a, b)} {text}" + (f" ({label})" if label else "") for a, b, text, label in runs]
+        lines.append(f"{city}: " + "; ".join(parts))
+    return "\n".join(lines)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_weather_service():
+    """Process-wide service sharing one connection pool."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = WeatherService()
+        return _service
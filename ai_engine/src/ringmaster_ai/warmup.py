@@ -0,0 +1,78 @@
+import os
+import threading
+import time
+import traceback
+
+# Set to 0 to skip background warm-up; the first request then pays for it.
+WARMUP_ON_STARTUP = os.getenv("AI_ENGINE_WARMUP", "1").lower() not in ("0", "false", "no")
+
+
+def warm_trip_crew():
+    """
+    Import crewai/litellm and build every crew once without calling an LLM.
+
+    Besides the imports this warms the TripCrew registry (configs, pooled
+    clients), crewai's own first-use setup, which costs seconds on the
+    first Crew() of a process, and maps the curated fact index.
+    """
+    from src.ringmaster_ai.crews.trip_crew.registry import get_trip_registry
+    from src.ringmaster_ai.crews.trip_crew.trip_crew import TripCrew
+    from src.ringmaster_ai.retrieval import get_retrieval_index
+
+    get_trip_registry().warm()
+    get_retrieval_index()
+    TripCrew().feasibility_crew()
+    TripCrew().logistics_graph()
+    TripCrew().budget_crew()
+
+
+class Warmup:
+    """Runs a warm-up function once on a daemon thread and reports its state."""
+
+    def __init__(self, target=warm_trip_crew):
+        self.target = target
+        self.status = "pending"  # pending -> warming -> ready | failed, or pending -> skipped
+        self.error = None
+        self.started_at = None
+        self.duration_s = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def start(self):
+        with self._lock:
+            if self.status != "pending":
+                return
+            self.status = "warming"
+            self.started_at = time.time()
+        threading.Thread(target=self._run, name="warmup", daemon=True).start()
+
+    def skip(self):
+        """Mark warm-up as not wanted: ready at once, the first requests pay for it instead."""
+        with self._lock:
+            if self.status != "pending":
+                return
+            self.status = "skipped"
+        self._ready.set()
+
+    def _run(self):
+        try:
+            self.target()
+            self.status = "ready"
+            self._ready.set()
+        except Exception as e:
+            print(f"Warm-up failed: {traceback.format_exc()}")
+            self.error = str(e)
+            self.status = "failed"
+        finally:
+            self.duration_s = round(time.time() - self.started_at, 3)
+            print(f"Warm-up {self.status} in {self.duration_s}s")
+
+    def wait(self, timeout=None):
+        return self._ready.wait(timeout)
+
+    def snapshot(self):
+        return {"status": self.status, "error": self.error, "warmup_s": self.duration_s}
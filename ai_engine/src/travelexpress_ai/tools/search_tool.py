@@ -1,8 +1,15 @@
 import os
 from crewai_tools import SerperDevTool
 
+from src.ringmaster_ai.tools.cache import cached_tool
+
+# Web results for destinations/landmarks barely move within a few hours
+@cached_tool("serper_search", ttl=6 * 3600)
+class CachedSerperDevTool(SerperDevTool):
+    pass
+
 class SearchTool:
     def __init__(self):
-        self.tool = SerperDevTool()
+        self.tool = CachedSerperDevTool()
 
 search_tool = SearchTool().tool
@@ -198,6 +198,10 @@ const createTripPlan = async (req, res) => {
         if (error.response) {
             console.error("AI Engine Error Data:", error.response.data);
             console.error("AI Engine Status:", error.response.status);
+            // 429 from the engine's admission control: pass its back-off hint on
+            if (error.response.headers && error.response.headers["retry-after"]) {
+                res.set("Retry-After", error.response.headers["retry-after"]);
+            }
             return res.status(error.response.status).json({
                 error: "AI Engine Error",
                 message: error.response.data.detail || "Error from AI Engine",
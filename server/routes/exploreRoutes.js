@@ -74,24 +74,20 @@ router.get('/:destination/events', async (req, res) => {
     }
 });
 
-/**
- * @route   POST /api/explore/save-trip
- * @desc    Upsert trip data from AI Agent
- * @access  Private (Internal Utility)
- */
-router.post('/save-trip', async (req, res) => {
-    try {
-        const { destination, region, category, trending_reason, famous_for, events, imageUrl } = req.body;
-
-        // Validation - Basic check
-        if (!destination || !region || !category) {
-            return res.status(400).json({ message: 'Missing required fields' });
-        }
+// Upsert filter/update for one AI record; null if required fields are missing.
+// Upserts are specific to { destination, category, region }, which preserves the
+// library and just updates content if it exists.
+const buildUpsert = (body) => {
+    const { destination, region, category, trending_reason, famous_for, events, imageUrl } = body || {};
+
+    // Validation - Basic check
+    if (!destination || !region || !category) {
+        return null;
+    }
 
-        // Upsert Logic: specific to { destination, category, region }
-        // This preserves the library and just updates content if it exists.
-        const filter = { destination, category, region };
-        const update = {
+    return {
+        filter: { destination, category, region },
+        update: {
             $set: {
                 destination,
                 region,
@@ -102,15 +98,29 @@ router.post('/save-trip', async (req, res) => {
                 imageUrl,
                 createdAt: new Date() // Refresh the TTL
             }
-        };
+        }
+    };
+};
+
+/**
+ * @route   POST /api/explore/save-trip
+ * @desc    Upsert trip data from AI Agent
+ * @access  Private (Internal Utility)
+ */
+router.post('/save-trip', async (req, res) => {
+    try {
+        const upsert = buildUpsert(req.body);
+        if (!upsert) {
+            return res.status(400).json({ message: 'Missing required fields' });
+        }
 
-        const result = await ExploreTrip.findOneAndUpdate(filter, update, {
+        const result = await ExploreTrip.findOneAndUpdate(upsert.filter, upsert.update, {
             upsert: true,
             new: true,
             setDefaultsOnInsert: true
         });
 
-        console.log(`Saved/Updated trip: ${destination} (${category})`);
+        console.log(`Saved/Updated trip: ${upsert.filter.destination} (${upsert.filter.category})`);
         res.json(result);
 
     } catch (error) {
@@ -119,4 +129,52 @@ router.post('/save-trip', async (req, res) => {
     }
 });
 
+/**
+ * @route   POST /api/explore/save-trips
+ * @desc    Upsert a batch of trips from the AI Agent in one bulkWrite
+ * @access  Private (Internal Utility)
+ * @body    { trips: [ { destination, region, category, ... }, ... ] }
+ * @returns { saved, rejected: [ { index, message } ] }
+ */
+router.post('/save-trips', async (req, res) => {
+    try {
+        const trips = Array.isArray(req.body) ? req.body : (req.body && req.body.trips);
+        if (!Array.isArray(trips)) {
+            return res.status(400).json({ message: 'Expected an array of trips' });
+        }
+
+        const operations = [];
+        const rejected = [];
+        trips.forEach((trip, index) => {
+            const upsert = buildUpsert(trip);
+            if (!upsert) {
+                rejected.push({ index, message: 'Missing required fields' });
+                return;
+            }
+            operations.push({ updateOne: { filter: upsert.filter, update: upsert.update, upsert: true } });
+        });
+
+        if (operations.length > 0) {
+            // ordered: false keeps going past a bad document; it then throws a
+            // bulk error carrying the per-operation failures
+            try {
+                await ExploreTrip.bulkWrite(operations, { ordered: false });
+            } catch (error) {
+                if (!error.writeErrors) throw error;
+                const accepted = trips.map((_, index) => index).filter(i => !rejected.some(r => r.index === i));
+                error.writeErrors.forEach(writeError => {
+                    rejected.push({ index: accepted[writeError.index], message: writeError.errmsg });
+                });
+            }
+        }
+
+        console.log(`Saved/Updated ${trips.length - rejected.length}/${trips.length} trips in bulk`);
+        res.json({ saved: trips.length - rejected.length, rejected });
+
+    } catch (error) {
+        console.error('Error saving trips:', error);
+        res.status(500).json({ message: 'Server Error', error: error.message });
+    }
+});
+
 module.exports = router;